@@ -0,0 +1,192 @@
+"""
+Productivity analytics for GTF Command Center
+Tasks (plus any archived ones and recurring occurrences) are projected
+once per data version into NumPy columns; per-day rollups by department
+are built from those columns and cached, so weekly throughput, lead time,
+overdue ageing and the Zoya acceptance rate are array reductions rather
+than loops over task dicts.
+"""
+
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import date
+
+import numpy as np
+
+from due_index import to_ordinal
+
+MISSING = -1
+AGE_BUCKETS = ((1, 2, "1–2 days"), (3, 7, "3–7 days"), (8, 14, "1–2 weeks"),
+               (15, 30, "2–4 weeks"), (31, None, "30+ days"))
+ZOYA_ACCEPTED = ("approved", "chat_now", "in_progress", "completed")
+ZOYA_DENIED = ("denied",)
+
+Columns = namedtuple("Columns", [
+    "departments",      # list of department keys; dept column holds indexes into it
+    "dept", "created", "completed", "due", "done",
+    "zoya_suggested", "zoya_accepted", "zoya_denied",
+])
+
+Rollups = namedtuple("Rollups", ["start", "created", "completed"])  # [dept, day] count matrices
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+CACHE_VERSIONS = 4
+
+
+def _ordinal(value):
+    if not value:
+        return MISSING
+    o = to_ordinal(value)
+    return MISSING if o is None else o
+
+
+def _row(t, dept, created, zoya=True):
+    status = t.get("zoya_status") if zoya else None
+    return (
+        dept,
+        _ordinal(created),
+        _ordinal(t.get("completed_date")) if t.get("done") else MISSING,
+        _ordinal(t.get("due_date")),
+        bool(t.get("done")),
+        bool(zoya and (t.get("zoya_can_help") or status)),
+        status in ZOYA_ACCEPTED,
+        status in ZOYA_DENIED,
+    )
+
+
+def project(tasks, occurrences=()):
+    """Columnar view of task dicts.
+
+    A series template is not a row itself; each occurrence completed in
+    its exceptions is, and so is each undone occurrence passed in (from
+    TaskIndex.occurrences). Occurrence rows count as created on their
+    occurrence date and leave Zoya stats to the series.
+    """
+    departments = []
+    dept_index = {}
+    rows = []
+
+    def dept(t):
+        dk = t.get("department", "quick")
+        if dk not in dept_index:
+            dept_index[dk] = len(departments)
+            departments.append(dk)
+        return dept_index[dk]
+
+    for t in tasks:
+        if not t.get("recurrence"):
+            rows.append(_row(t, dept(t), t.get("created")))
+            continue
+        for ds, exc in (t.get("exceptions") or {}).items():
+            if exc.get("done") and not exc.get("deleted"):
+                occ = {"department": t.get("department", "quick"), "due_date": ds, **exc}
+                occ.setdefault("completed_date", ds)
+                rows.append(_row(occ, dept(occ), ds, zoya=False))
+    for occ in occurrences:
+        if not occ.get("done"):
+            rows.append(_row(occ, dept(occ), occ["occurrence_date"], zoya=False))
+    cols = list(zip(*rows)) if rows else [()] * 8
+    return Columns(
+        departments,
+        np.array(cols[0], dtype=np.int16),
+        np.array(cols[1], dtype=np.int32),
+        np.array(cols[2], dtype=np.int32),
+        np.array(cols[3], dtype=np.int32),
+        np.array(cols[4], dtype=bool),
+        np.array(cols[5], dtype=bool),
+        np.array(cols[6], dtype=bool),
+        np.array(cols[7], dtype=bool),
+    )
+
+
+def _daily(dept, days, n_depts, start, n_days):
+    mask = days != MISSING
+    counts = np.zeros((n_depts, n_days), dtype=np.int32)
+    np.add.at(counts, (dept[mask], days[mask] - start), 1)
+    return counts
+
+
+def rollup(cols):
+    """Per-department, per-day created / completed counts"""
+    known = np.concatenate([cols.created[cols.created != MISSING], cols.completed[cols.completed != MISSING]])
+    if not len(known):
+        return Rollups(date.today().toordinal(), np.zeros((len(cols.departments), 1), np.int32),
+                       np.zeros((len(cols.departments), 1), np.int32))
+    start, end = int(known.min()), int(known.max())
+    n = end - start + 1
+    n_depts = len(cols.departments)
+    return Rollups(start, _daily(cols.dept, cols.created, n_depts, start, n),
+                   _daily(cols.dept, cols.completed, n_depts, start, n))
+
+
+def for_version(version, tasks, occurrences=()):
+    """(columns, rollups) for one data version, computed once per process and day.
+
+    occurrences are the undone recurring occurrences due up to today.
+    """
+    key = (version, date.today())
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    cols = project(tasks, occurrences)
+    result = (cols, rollup(cols))
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > CACHE_VERSIONS:
+            _cache.popitem(last=False)
+    return result
+
+
+def weekly_throughput(cols, rollups, today, weeks=12):
+    """{department: [completions per week]} for the last `weeks` Monday-based weeks, oldest first"""
+    monday = today.toordinal() - today.weekday()
+    first = monday - 7 * (weeks - 1)
+    out = np.zeros((len(cols.departments), 7 * weeks), dtype=np.int32)
+    lo, hi = max(first, rollups.start), min(monday + 7, rollups.start + rollups.completed.shape[1])
+    if lo < hi:
+        out[:, lo - first:hi - first] = rollups.completed[:, lo - rollups.start:hi - rollups.start]
+    per_week = out.reshape(len(cols.departments), weeks, 7).sum(axis=2)
+    labels = [date.fromordinal(first + 7 * w).isoformat() for w in range(weeks)]
+    return labels, {dk: per_week[i].tolist() for i, dk in enumerate(cols.departments)}
+
+
+def lead_times(cols):
+    """{department: (count, median days, p90 days)} from created to completed"""
+    mask = (cols.created != MISSING) & (cols.completed != MISSING)
+    days = (cols.completed - cols.created)[mask].clip(min=0)
+    dept = cols.dept[mask]
+    result = {}
+    for i, dk in enumerate(cols.departments):
+        d = days[dept == i]
+        if len(d):
+            result[dk] = (len(d), float(np.median(d)), float(np.percentile(d, 90)))
+    if len(days):
+        result["all"] = (len(days), float(np.median(days)), float(np.percentile(days, 90)))
+    return result
+
+
+def overdue_ageing(cols, today):
+    """[(label, open tasks that many days overdue)]"""
+    mask = ~cols.done & (cols.due != MISSING) & (cols.due < today.toordinal())
+    ages = today.toordinal() - cols.due[mask]
+    result = []
+    for lo, hi, label in AGE_BUCKETS:
+        hit = ages >= lo if hi is None else (ages >= lo) & (ages <= hi)
+        result.append((label, int(hit.sum())))
+    return result
+
+
+def zoya_acceptance(cols):
+    suggested = int(cols.zoya_suggested.sum())
+    accepted = int((cols.zoya_suggested & cols.zoya_accepted).sum())
+    denied = int((cols.zoya_suggested & cols.zoya_denied).sum())
+    decided = accepted + denied
+    return {
+        "suggested": suggested,
+        "accepted": accepted,
+        "denied": denied,
+        "pending": suggested - decided,
+        "rate": accepted / decided if decided else None,
+    }
@@ -7,9 +7,32 @@ import streamlit as st
 import json
 import requests
 import base64
+import uuid
 from datetime import datetime, date, timedelta
 from pathlib import Path
 from streamlit_sortables import sort_items
+from task_query import (
+    make_query, ZOYA_SUGGESTED, REMINDER_SCHEDULED, REMINDER_TASK, REMINDER_NONE,
+)
+from task_counters import summary
+from due_index import DueIndex
+from task_store import add_task, update_task, delete_task, apply_changes
+from task_rank import plan_board_move, sortable_label
+from task_ids import new_task_id
+from recurrence import REPEAT_PRESETS, split_occurrence_id, end_series
+from calendar_view import (
+    SPANS as CAL_SPANS, CELL_LIMITS, default_anchor, window as cal_window,
+    shift as shift_window, title as cal_title, by_day as tasks_by_day,
+)
+from task_schema import load_document, normalize_document
+from github_shards import GitHubShardStore
+from ui_assets import DEPT_COLORS, style_block
+from shared_store import SharedSnapshot
+from change_history import field_changes
+from memory_watch import MemoryMonitor, state_size
+from local_replica import LocalReplica, SyncLoop
+from zoya_api import start_api, queue_routes, DEFAULT_PORT as DEFAULT_API_PORT
+from zoya_queue import STATUS_FAILED, StatusWriter, WorkQueue
 
 # Cricket live scores - placeholder for now
 def get_live_cricket():
@@ -31,6 +54,7 @@ st.set_page_config(
 )
 
 DATA_FILE = Path(__file__).parent / "tasks.json"
+REPLICA_DIR = Path(__file__).parent / ".cache"
 
 # GitHub backend config
 GITHUB_REPO = "atiqarahman/gtf-tasks"
@@ -43,12 +67,54 @@ def get_github_token():
     except:
         return None
 
+def get_secret(name, default=None):
+    """Optional setting from Streamlit secrets"""
+    try:
+        return st.secrets[name]
+    except:
+        return default
+
+def get_flag(name, default=False):
+    """On / off setting from Streamlit secrets; accepts true/false, yes/no, on/off, 1/0"""
+    value = get_secret(name, default)
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+@st.cache_resource
+def get_shard_store():
+    """Sharded GitHub storage when GITHUB_STORAGE = "sharded", else None"""
+    token = get_github_token()
+    if not token or get_secret("GITHUB_STORAGE", "file") != "sharded":
+        return None
+    return GitHubShardStore(
+        GITHUB_REPO, token,
+        shard_by=get_secret("GITHUB_SHARD_BY", "month"),
+        compress=get_flag("GITHUB_COMPRESS", True),
+    )
+
 def load_from_github():
-    """Load tasks.json from GitHub"""
+    """Load tasks from GitHub - sharded layout if configured, else tasks.json"""
     token = get_github_token()
     if not token:
         return None, None
     
+    store = get_shard_store()
+    if store:
+        try:
+            doc, head = store.load()
+        except Exception:
+            return None, None
+        if doc is not None:
+            get_snapshot().load_issues = normalize_document(doc)
+            return doc, head
+        # No manifest yet: start from tasks.json; the first save writes shards
+        doc, _ = load_github_file(token)
+        return doc, head
+    return load_github_file(token)
+
+def load_github_file(token):
+    """Load the single-file tasks.json through the Contents API"""
     url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{GITHUB_FILE}"
     headers = {"Authorization": f"token {token}", "Accept": "application/vnd.github.v3+json"}
     
@@ -56,26 +122,27 @@ def load_from_github():
         resp = requests.get(url, headers=headers, timeout=10)
         if resp.status_code == 200:
             data = resp.json()
-            content = base64.b64decode(data["content"]).decode("utf-8")
-            return json.loads(content), data["sha"]
+            doc, issues = load_document(base64.b64decode(data["content"]), data["sha"])
+            get_snapshot().load_issues = list(issues)
+            return doc, data["sha"]
     except:
         pass
     return None, None
 
-def save_to_github(data, message="Dashboard update"):
-    """Save tasks.json to GitHub"""
+def save_to_github(data, sha=None, message="Dashboard update"):
+    """Save tasks to GitHub; returns (new blob or head commit SHA, error message)"""
     token = get_github_token()
     if not token:
-        st.error("❌ GitHub token not found - changes won't persist!")
-        return False
+        return None, "GitHub token not found - changes won't persist!"
+    
+    store = get_shard_store()
+    if store:
+        return store.save(data, sha, message)
     
     # Get fresh SHA if we don't have one
-    if not st.session_state.get("github_sha"):
-        _, sha = load_from_github()
-        if sha:
-            st.session_state["github_sha"] = sha
+    if not sha:
+        _, sha = load_github_file(token)
     
-    sha = st.session_state.get("github_sha")
     url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{GITHUB_FILE}"
     headers = {"Authorization": f"token {token}", "Accept": "application/vnd.github.v3+json"}
     
@@ -89,197 +156,354 @@ def save_to_github(data, message="Dashboard update"):
     try:
         resp = requests.put(url, headers=headers, json=payload, timeout=10)
         if resp.status_code in [200, 201]:
-            # Update SHA for next save
-            st.session_state["github_sha"] = resp.json().get("content", {}).get("sha")
-            st.toast("✅ Saved!", icon="💾")
-            return True
-        else:
-            st.error(f"❌ Save failed: {resp.status_code}")
+            # New SHA for the next save
+            return resp.json().get("content", {}).get("sha"), None
+        return None, f"Save failed: {resp.status_code}"
+    except Exception as e:
+        return None, f"Save error: {e}"
+
+def save_local(data):
+    """Save tasks.json next to the app; returns an error message or None"""
+    try:
+        DATA_FILE.write_text(json.dumps(data, indent=2, default=str))
+        return None
     except Exception as e:
-        st.error(f"❌ Save error: {e}")
-    return False
+        return f"Local save failed: {e}"
+
+def make_writer(snapshot, message="Dashboard update", errors=None):
+    """Persistence callback for snapshot.commit(); no UI, so background threads can use it.
+
+    With GitHub configured the commit only goes to the local replica; the
+    sync loop pushes it.
+    """
+    def writer(doc, sha):
+        replica = get_replica()
+        if replica:
+            error = replica.record(snapshot.data, doc)
+            if error is None:
+                get_sync_loop().wake()
+        else:
+            error = save_local(doc)
+        if error and errors is not None:
+            errors.append(error)
+        return error is None, None
+    return writer
+
+def commit_changes(snapshot, changes, source, message, errors=None):
+    """Apply and persist a batch of changes against the latest snapshot (background jobs)"""
+    base = snapshot.data
+    doc = dict(base)
+    apply_changes(doc, changes)
+    return snapshot.commit(doc, base, make_writer(snapshot, message, errors), source=source)
 
 def load_tasks():
-    """Load tasks - GitHub first, then local file"""
-    # Try GitHub first (for cloud deployment)
-    github_data, sha = load_from_github()
-    if github_data:
-        st.session_state["github_sha"] = sha
-        st.session_state["using_github"] = True
-        return github_data
+    """Load tasks - local replica, then GitHub, then the local file; returns (data, sha, using_github)"""
+    replica = get_replica()
+    if replica:
+        doc, sha = replica.load()
+        if doc is not None:
+            get_snapshot().load_issues = list(replica.issues)
+            return doc, sha, True
+        # First start on this machine: wait for GitHub once to seed the replica
+        github_data, sha = load_from_github()
+        if github_data:
+            replica.save(github_data, sha)
+            return github_data, sha, True
     
     # Fall back to local file
-    st.session_state["using_github"] = False
     if DATA_FILE.exists():
-        return json.loads(DATA_FILE.read_text())
-    return {"departments": [], "department_labels": {}, "tasks": []}
+        doc, issues = load_document(DATA_FILE.read_bytes())
+        get_snapshot().load_issues = list(issues)
+        return doc, None, replica is not None
+    return {"departments": [], "department_labels": {}, "tasks": []}, None, replica is not None
+
+@st.cache_resource
+def get_replica():
+    """Local replica of the GitHub document, or None when GitHub isn't configured"""
+    if not get_github_token():
+        return None
+    return LocalReplica(REPLICA_DIR)
+
+@st.cache_resource
+def get_sync_loop():
+    """Background GitHub push/pull for the replica, started once per process"""
+    replica = get_replica()
+    if replica is None:
+        return None
+    return SyncLoop(get_snapshot(), replica, pull=load_from_github, push=save_to_github,
+                    interval=int(get_secret("SYNC_INTERVAL_SECONDS", 30))).start()
+
+@st.cache_resource
+def get_snapshot():
+    """One task snapshot per server process, shared by every session"""
+    return SharedSnapshot()
+
+@st.cache_resource
+def get_zoya_queue():
+    """Process-wide Zoya work queue; its status changes are committed like any other edit,
+    from a background thread so a lease or a metrics read never waits on a save"""
+    snapshot = get_snapshot()
+    
+    def write_status(updates):
+        now = datetime.now().isoformat()
+        changes = [("update", tid, {"zoya_status": status, "zoya_status_at": now})
+                   for tid, status in updates.items()]
+        errors = []
+        if commit_changes(snapshot, changes, source="zoya-queue", message="Zoya queue update",
+                          errors=errors) is None:
+            return errors[0] if errors else "Zoya status save failed"
+        return None
+    
+    return WorkQueue(
+        visibility_timeout=int(get_secret("ZOYA_LEASE_SECONDS", 300)),
+        on_status=StatusWriter(write_status),
+    )
+
+def sync_zoya_queue():
+    """Bring the queue up to the latest snapshot version"""
+    snapshot = get_snapshot()
+    version, doc = snapshot.read()
+    get_zoya_queue().sync(version, snapshot.index(version, doc))
 
-def save_tasks(data):
-    """Save tasks - GitHub if available, otherwise local"""
-    if st.session_state.get("using_github"):
-        return save_to_github(data)
-    # Local file save
+@st.cache_resource
+def get_agent_api():
+    """Local JSON API for Zoya, started once per process (AGENT_API_PORT = 0 disables it)"""
+    port = int(get_secret("AGENT_API_PORT", DEFAULT_API_PORT))
+    if not port:
+        return None
+    routes = queue_routes(get_zoya_queue(), sync_zoya_queue)
     try:
-        DATA_FILE.write_text(json.dumps(data, indent=2, default=str))
-        st.toast("✅ Saved locally!", icon="💾")
-        return True
-    except Exception as e:
-        st.error(f"❌ Local save failed: {e}")
+        return start_api(get_snapshot(), port=port, token=get_secret("AGENT_API_TOKEN"), routes=routes)
+    except OSError:
+        # Port already taken, e.g. by another server process
+        return None
+
+def get_open_due_index(counters, version):
+    """Open-task due buckets as an ordinal index, rebuilt only with the data.
+
+    Across midnight the same index is kept and only its today boundary moves.
+    """
+    cached = st.session_state.get("open_due_index")
+    if cached is None or cached[0] != version:
+        cached = (version, DueIndex.from_counts(counters["due"]))
+        st.session_state["open_due_index"] = cached
+    return cached[1]
+
+# Widget keys that hold per-task state, as f"{prefix}{task_id}"
+TASK_WIDGET_PREFIXES = (
+    "cal_title_", "cal_dept_", "cal_pri_", "cal_notes_", "pop_date_", "ov_notes_",
+    "done_", "sel_", "title_", "dept_", "due_", "pri_", "notes_", "remind_date_", "deps_",
+)
+
+def forget_task_widgets(task_ids):
+    """Drop widget state for these tasks so they re-render from the data"""
+    for key in list(st.session_state.keys()):
+        for prefix in TASK_WIDGET_PREFIXES:
+            # Recurring occurrences ("<series>@<date>") also go with their series
+            tid = key[len(prefix):]
+            if key.startswith(prefix) and (tid in task_ids or split_occurrence_id(tid)[0] in task_ids):
+                del st.session_state[key]
+                break
+
+def prune_stale_widgets(version):
+    """Forget widget state of tasks deleted or finished before today, once per data version"""
+    if st.session_state.get("widgets_pruned_at") == version:
+        return 0
+    st.session_state.widgets_pruned_at = version
+    stale = set()
+    for key in list(st.session_state.keys()):
+        for prefix in TASK_WIDGET_PREFIXES:
+            if key.startswith(prefix):
+                # An occurrence id resolves to the occurrence itself, with its own done state
+                tid = key[len(prefix):]
+                task = task_index.get(tid)
+                # dept_ is also the sidebar department buttons' prefix
+                if task is None and tid not in dept_labels:
+                    stale.add(tid)
+                elif task is not None and task.get("done") and (task.get("completed_date") or "") < today_str:
+                    stale.add(tid)
+                break
+    if not stale:
+        return 0
+    before = len(st.session_state)
+    forget_task_widgets(stale)
+    return before - len(st.session_state)
+
+@st.cache_resource
+def get_memory_monitor():
+    """Process-wide tracemalloc sampling when MEMORY_PROFILE is set, else None"""
+    if not get_flag("MEMORY_PROFILE"):
+        return None
+    return MemoryMonitor(interval=int(get_secret("MEMORY_SAMPLE_SECONDS", 60)))
+
+def render_memory_panel(monitor):
+    """Sidebar memory report; runs last so this session's state is complete"""
+    total, task_keys, sizes = state_size(st.session_state, TASK_WIDGET_PREFIXES)
+    monitor.record_session(session_id, len(sizes), task_keys, total)
+    with st.sidebar.expander("🧠 Memory"):
+        if monitor.samples:
+            latest = monitor.samples[-1]
+            st.caption(f"Traced {latest.current / 2**20:.1f} MB · peak {latest.peak / 2**20:.1f} MB · "
+                       f"{monitor.pruned} stale widget keys pruned")
+        if len(monitor.samples) > 1:
+            st.line_chart({"MB": [s.current / 2**20 for s in monitor.samples]}, height=120)
+        st.markdown("**Sessions**")
+        st.dataframe([{"Session": sid[:8] + (" (you)" if sid == session_id else ""), "Keys": s.keys,
+                       "Task keys": s.task_keys, "KB": round(s.bytes / 1024, 1),
+                       "Seen": datetime.fromtimestamp(s.at).strftime("%H:%M")}
+                      for sid, s in monitor.sessions.items()], hide_index=True)
+        st.caption("Largest keys here: " + ", ".join(f"{k} {b / 1024:.0f} KB" for k, b in sizes[:3]))
+        if st.toggle("Allocation sites", key="mem_sites", help="Walks every traced block - takes a few seconds"):
+            with st.spinner("Reading allocations..."):
+                top, grown = monitor.top_sites(), monitor.growth()
+            st.markdown("**Top now**")
+            for site, kib, blocks in top:
+                st.caption(f"{kib:,.0f} KiB · {blocks:,} blocks · {site}")
+            st.markdown("**Grown since profiling started**")
+            for site, kib, blocks in grown:
+                st.caption(f"+{kib:,.0f} KiB · +{blocks:,} blocks · {site}")
+        if st.button("Collect garbage", key="mem_gc", use_container_width=True):
+            st.toast(f"🧹 {monitor.collect()} objects collected")
+
+def save_tasks(data, action=None):
+    """Save tasks - local replica synced to GitHub, or the local file - and publish to all sessions"""
+    snapshot = get_snapshot()
+    errors = []
+    if snapshot.commit(data, base_data, make_writer(snapshot, errors=errors), source=session_id, action=action) is None:
+        st.error(f"❌ {errors[0] if errors else 'Save failed'}")
         return False
+    st.toast("✅ Saved!" if snapshot.using_github else "✅ Saved locally!", icon="💾")
+    return True
+
+def undo_redo(kind):
+    """Undo this session's latest edit, or redo its latest undo"""
+    history = get_snapshot().history
+    if kind == "undo":
+        version, changes = history.undo_changes(session_id, task_index.get)
+    else:
+        version, changes = history.redo_changes(session_id, task_index.get)
+    if version is None:
+        return
+    apply_changes(data, changes)
+    if save_tasks(data, action=(kind, version)):
+        forget_task_widgets({tid or payload["id"] for _, tid, payload in changes})
+    st.rerun()
+
+def who(source):
+    if source == session_id:
+        return "you"
+    return {"zoya-queue": "Zoya", "remote": "GitHub", None: "app"}.get(source, "another session")
+
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+session_id = st.session_state.session_id
 
-data = load_tasks()
+snapshot = get_snapshot()
+snapshot.load_once(load_tasks)
+sync_loop = get_sync_loop()
+if "change_feed" not in st.session_state:
+    st.session_state.change_feed = snapshot.subscribe(session_id)
+agent_api = get_agent_api()
+zoya_queue = get_zoya_queue()
+
+# Another session or a background job committed - refresh just those tasks' widgets
+for change in st.session_state.change_feed.drain():
+    if change.task_ids == frozenset():
+        continue    # nothing a session shows moved
+    if change.task_ids is not None:
+        forget_task_widgets(change.task_ids)
+    st.toast("🔄 Tasks updated elsewhere")
+
+data_version, base_data = snapshot.read()
+# This run's private copy: task dicts and lists stay shared until a mutation replaces them
+data = dict(base_data)
+counters = data["counters"]
+task_index = snapshot.index(data_version, base_data)
+dep_graph = snapshot.dependencies(data_version, base_data)
+zoya_queue.sync(data_version, task_index)
+open_due = get_open_due_index(counters, data_version)
 tasks = data.get("tasks", [])
 dept_labels = data.get("department_labels", {})
 today = date.today()
 today_str = today.isoformat()
+if open_due.set_today(today):
+    st.toast("🌅 New day - overdue and today lists updated")
+yesterday_str = (today - timedelta(days=1)).isoformat()
+
+memory_monitor = get_memory_monitor()
+pruned = prune_stale_widgets(data_version)
+if memory_monitor:
+    memory_monitor.pruned += pruned
+    memory_monitor.sample()
 
 # Department colors
-dept_colors = {
-    "customers": "#8B5CF6",
-    "customs_shipping": "#0891B2",
-    "brand_outreach": "#059669",
-    "brand_followups": "#10B981",
-    "content": "#EC4899",
-    "legal": "#6366F1",
-    "product": "#3B82F6",
-    "business": "#F59E0B",
-    "fundraising": "#EF4444",
-    "hiring": "#8B5CF6",
-    "finance": "#14B8A6",
-    "quick": "#6B7280"
-}
+dept_colors = DEPT_COLORS
 
 if "show_calendar" not in st.session_state:
     st.session_state.show_calendar = False
-if "selected_dept" not in st.session_state:
-    st.session_state.selected_dept = None
 if "show_file_tools" not in st.session_state:
     st.session_state.show_file_tools = False
+if "show_analytics" not in st.session_state:
+    st.session_state.show_analytics = False
 
 # Styling
-st.markdown("""
-<style>
-    :root {
-        --cream: #FAFAF8;
-        --white: #FFFFFF;
-        --charcoal: #1a1a1a;
-        --gray: #6b6b6b;
-        --light-gray: #e5e5e5;
-        --red: #EF4444;
-    }
-    
-    html, body, [data-testid="stAppViewContainer"], [data-testid="stApp"], .main {
-        background-color: var(--cream) !important;
-    }
-    
-    .main .block-container {
-        background-color: var(--cream) !important;
-        padding: 1.5rem 2rem !important;
-        max-width: 1200px !important;
-    }
-    
-    section[data-testid="stSidebar"], section[data-testid="stSidebar"] > div {
-        background-color: var(--white) !important;
-    }
-    
-    #MainMenu, footer, header, .stDeployButton { display: none !important; }
-    
-    /* Clean popover trigger buttons */
-    [data-testid="stPopover"] > button,
-    button[kind="secondary"] {
-        background: white !important;
-        border: 1px solid #e0e0e0 !important;
-        border-radius: 8px !important;
-        padding: 8px 12px !important;
-        margin-bottom: 6px !important;
-        font-size: 0.8rem !important;
-        color: #333 !important;
-        box-shadow: 0 1px 3px rgba(0,0,0,0.06) !important;
-        transition: all 0.15s ease !important;
-    }
-    
-    [data-testid="stPopover"] > button:hover,
-    button[kind="secondary"]:hover {
-        border-color: #3B82F6 !important;
-        box-shadow: 0 2px 8px rgba(59,130,246,0.15) !important;
-        background: #f8fafc !important;
-    }
-    
-    /* Popover content styling */
-    [data-testid="stPopoverBody"] {
-        padding: 12px !important;
-    }
-    
-    [data-testid="stPopoverBody"] button {
-        margin-top: 4px !important;
-    }
-    
-    .stats-row {
-        display: flex;
-        gap: 1rem;
-        margin-bottom: 1.5rem;
-    }
-    
-    .stat-box {
-        background: var(--white);
-        border: 1px solid var(--light-gray);
-        padding: 1rem 1.5rem;
-        text-align: center;
-        flex: 1;
-    }
-    
-    .stat-num { font-size: 1.75rem; font-weight: 600; color: var(--charcoal); }
-    .stat-num.red { color: var(--red); }
-    .stat-label { font-size: 0.65rem; color: var(--gray); text-transform: uppercase; letter-spacing: 1px; }
-    
-    .section-head {
-        font-size: 0.7rem;
-        font-weight: 600;
-        color: var(--gray);
-        text-transform: uppercase;
-        letter-spacing: 1px;
-        margin: 1.5rem 0 0.75rem 0;
-    }
-    
-    .task-card {
-        background: var(--white);
-        border-radius: 6px;
-        padding: 0.75rem 1rem;
-        margin-bottom: 0.4rem;
-        border-left: 3px solid #ccc;
-    }
-    
-    .day-col {
-        background: var(--white);
-        border: 1px solid var(--light-gray);
-        border-radius: 8px;
-        padding: 0.75rem;
-        min-height: 150px;
-    }
-    
-    .day-title {
-        font-weight: 600;
-        font-size: 0.85rem;
-        margin-bottom: 0.5rem;
-        padding-bottom: 0.5rem;
-        border-bottom: 1px solid var(--light-gray);
-    }
-    
-    .day-title.today { color: var(--red); }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(style_block(), unsafe_allow_html=True)
 
 # Stats
-open_tasks = [t for t in tasks if not t.get("done")]
-done_tasks = [t for t in tasks if t.get("done")]
-today_tasks = [t for t in open_tasks if t.get("due_date") == today_str]
-overdue = [t for t in open_tasks if t.get("due_date") and t.get("due_date") < today_str]
-high_p = [t for t in open_tasks if t.get("priority") == "high"]
+# Recurring occurrences are expanded, not counted; summary adds them to every stat
+stats = summary(counters, open_due, task_index.open_occurrences())
 
-def filter_tasks(task_list):
-    if st.session_state.selected_dept:
-        return [t for t in task_list if t.get("department") == st.session_state.selected_dept]
-    return task_list
+ZOYA_FILTER_LABELS = {
+    ZOYA_SUGGESTED: "Can help",
+    "approved": "Approved",
+    "chat_now": "Chat requested",
+    "completed": "Completed",
+    "denied": "Denied",
+}
+REMINDER_FILTER_LABELS = {
+    REMINDER_SCHEDULED: "Reminder scheduled",
+    REMINDER_TASK: "Is a reminder",
+    REMINDER_NONE: "No reminder",
+}
+FILTER_KEYS = ["filter_depts", "filter_priorities", "filter_due", "filter_zoya", "filter_reminder"]
+
+def query_tasks(status="open", due_from=None, due_to=None, sort="due"):
+    """Tasks matching the sidebar filters, narrowed to a due-date window"""
+    due_range = st.session_state.get("filter_due") or ()
+    if len(due_range) >= 1:
+        f_from = due_range[0].isoformat()
+        due_from = max(due_from, f_from) if due_from else f_from
+    if len(due_range) == 2:
+        f_to = due_range[1].isoformat()
+        due_to = min(due_to, f_to) if due_to else f_to
+    if due_from and due_to and due_from > due_to:
+        return []
+    return task_index.select(make_query(
+        status=status,
+        departments=st.session_state.get("filter_depts"),
+        priorities=st.session_state.get("filter_priorities"),
+        due_from=due_from,
+        due_to=due_to,
+        zoya=st.session_state.get("filter_zoya"),
+        reminder=st.session_state.get("filter_reminder"),
+        sort=sort,
+    ))
+
+def active_filters_text():
+    """Human summary of the active sidebar filters"""
+    parts = []
+    if st.session_state.get("filter_depts"):
+        parts.append(", ".join(dept_labels.get(d, d) for d in st.session_state.filter_depts))
+    if st.session_state.get("filter_priorities"):
+        parts.append("Priority: " + ", ".join(st.session_state.filter_priorities))
+    due_range = st.session_state.get("filter_due") or ()
+    if due_range:
+        parts.append("Due: " + " → ".join(d.strftime("%b %d") for d in due_range))
+    if st.session_state.get("filter_zoya"):
+        parts.append("Zoya: " + ", ".join(ZOYA_FILTER_LABELS.get(z, z) for z in st.session_state.filter_zoya))
+    if st.session_state.get("filter_reminder"):
+        parts.append(", ".join(REMINDER_FILTER_LABELS.get(r, r) for r in st.session_state.filter_reminder))
+    return " · ".join(parts)
 
 # Sidebar
 with st.sidebar:
@@ -288,34 +512,78 @@ with st.sidebar:
         st.image(str(logo_path), width=140)
     
     st.markdown("**Overview**")
-    st.write(f"Open: {len(open_tasks)}")
-    st.write(f"Today: {len(today_tasks)}")
-    st.write(f"Overdue: {len(overdue)}")
+    st.write(f"Open: {stats['open']}")
+    st.write(f"Today: {stats['today']}")
+    st.write(f"Overdue: {stats['overdue']}")
+    st.write(f"Next 7 days: {stats['week']}")
+    
+    undo_col, redo_col = st.columns(2)
+    with undo_col:
+        undo_label = snapshot.history.label(session_id, "undo")
+        if st.button("↩️ Undo", key="undo_btn", disabled=undo_label is None,
+                     help=f"Undo: {undo_label}" if undo_label else None, use_container_width=True):
+            undo_redo("undo")
+    with redo_col:
+        redo_label = snapshot.history.label(session_id, "redo")
+        if st.button("↪️ Redo", key="redo_btn", disabled=redo_label is None,
+                     help=f"Redo: {redo_label}" if redo_label else None, use_container_width=True):
+            undo_redo("redo")
     
     st.markdown("---")
     st.markdown("**Departments**")
     
     if st.button("All Departments", use_container_width=True):
-        st.session_state.selected_dept = None
+        st.session_state.pop("filter_depts", None)
         st.rerun()
     
     for dk, dn in dept_labels.items():
-        c = len([t for t in open_tasks if t.get("department") == dk])
+        c = stats["by_dept"].get(dk, 0)
         if c > 0:
             if st.button(f"{dn} ({c})", key=f"dept_{dk}", use_container_width=True):
-                st.session_state.selected_dept = dk
+                st.session_state.filter_depts = [dk]
                 st.rerun()
     
+    # Multi-criteria filters (rendered after the buttons above, which write filter_depts)
+    with st.expander("🔎 Filters", expanded=bool(active_filters_text())):
+        if st.button("Clear filters", key="clear_filters", use_container_width=True):
+            for k in FILTER_KEYS:
+                st.session_state.pop(k, None)
+            st.rerun()
+        st.multiselect("Departments", list(dept_labels.keys()),
+            format_func=lambda x: dept_labels.get(x, x), key="filter_depts")
+        st.multiselect("Priority", ["high", "medium", "low"], key="filter_priorities")
+        st.date_input("Due between", value=(), key="filter_due")
+        st.multiselect("Zoya", list(ZOYA_FILTER_LABELS.keys()),
+            format_func=lambda x: ZOYA_FILTER_LABELS.get(x, x), key="filter_zoya")
+        st.multiselect("Reminders", list(REMINDER_FILTER_LABELS.keys()),
+            format_func=lambda x: REMINDER_FILTER_LABELS.get(x, x), key="filter_reminder")
+    
     # Zoya suggestions section
     st.markdown("---")
     # Keep suggestions visible until: approved & completed, OR denied, OR explicitly completed in chat
-    zoya_suggestions = [t for t in open_tasks if t.get("zoya_can_help") and t.get("zoya_status") not in ["completed", "denied"]]
-    zoya_in_progress = [t for t in open_tasks if t.get("zoya_status") == "approved"]
+    zoya_suggestions = task_index.select(make_query(zoya=[ZOYA_SUGGESTED], sort=None))
+    zoya_in_progress = zoya_queue.in_flight() + zoya_queue.queued()
     
     if zoya_in_progress:
         st.markdown(f"**🚀 Zoya Working On** ({len(zoya_in_progress)})")
-        for zt in zoya_in_progress[:3]:
-            st.caption(f"⏳ {zt['title'][:30]}...")
+        for item in zoya_in_progress[:3]:
+            icon = "🔄" if item["lease_id"] else "⏳"
+            st.caption(f"{icon} {item['title'][:30]}...")
+        queue_stats = zoya_queue.metrics()
+        latency = queue_stats["latency_p50"]
+        st.caption(
+            f"Queue {queue_stats['depth']} · working {queue_stats['in_flight']} · "
+            f"{queue_stats['throughput_per_min']}/min"
+            + (f" · p50 {latency:.0f}s" if latency is not None else "")
+        )
+    
+    zoya_failed = len(task_index.by_zoya.get(STATUS_FAILED, ()))
+    if zoya_failed:
+        st.caption(f"⚠️ Zoya gave up on {zoya_failed} task(s) after {zoya_queue.max_attempts} tries")
+    status_writer = zoya_queue.on_status
+    if status_writer.last_error:
+        st.warning(f"⚠️ {status_writer.pending_count()} Zoya status change(s) not saved yet, "
+                   f"retrying: {status_writer.last_error}")
     
     if zoya_suggestions:
         st.markdown(f"**✨ Zoya Can Help** ({len(zoya_suggestions)})")
@@ -327,19 +595,13 @@ with st.sidebar:
                 col1, col2 = st.columns(2)
                 with col1:
                     if st.button("✅ Approve", key=f"zoya_approve_{zt['id']}", use_container_width=True):
-                        for t in data["tasks"]:
-                            if t["id"] == zt["id"]:
-                                t["zoya_status"] = "approved"
-                                t["zoya_approved_at"] = datetime.now().isoformat()
+                        update_task(data, zt["id"], zoya_status="approved", zoya_approved_at=datetime.now().isoformat())
                         save_tasks(data)
                         st.rerun()
                 
                 with col2:
                     if st.button("❌ Deny", key=f"zoya_deny_{zt['id']}", use_container_width=True):
-                        for t in data["tasks"]:
-                            if t["id"] == zt["id"]:
-                                t["zoya_can_help"] = False
-                                t["zoya_status"] = "denied"
+                        update_task(data, zt["id"], zoya_can_help=False, zoya_status="denied")
                         save_tasks(data)
                         st.rerun()
                 
@@ -351,9 +613,9 @@ with st.sidebar:
                         # Remind in 2 hours
                         remind_time = datetime.now() + timedelta(hours=2)
                         new_task = {
-                            "id": datetime.now().strftime("%Y%m%d%H%M%S") + zt["id"][:4],
+                            "id": new_task_id(),
                             "title": f"💬 Chat with Zoya about: {zt['title'][:30]}",
-                            "department": zt.get("department", "quick"),
+                            "department": zt["department"],
                             "priority": "high",
                             "due_date": today_str,
                             "notes": f"Discuss Zoya's suggestion: {zt.get('zoya_suggestion', '')}",
@@ -364,11 +626,9 @@ with st.sidebar:
                             "remind_at": remind_time.isoformat(),
                             "remind_sent": False
                         }
-                        data["tasks"].append(new_task)
+                        add_task(data, new_task)
                         # Don't change zoya_status - keep it in suggestions
-                        for t in data["tasks"]:
-                            if t["id"] == zt["id"]:
-                                t["reminder_scheduled"] = remind_time.isoformat()
+                        update_task(data, zt["id"], reminder_scheduled=remind_time.isoformat())
                         save_tasks(data)
                         st.toast(f"⏰ I'll remind you at {remind_time.strftime('%H:%M')}")
                         st.rerun()
@@ -378,9 +638,9 @@ with st.sidebar:
                         # Remind tomorrow at 9am
                         tomorrow_9am = datetime.combine(today + timedelta(days=1), datetime.strptime("09:00", "%H:%M").time())
                         new_task = {
-                            "id": datetime.now().strftime("%Y%m%d%H%M%S") + zt["id"][:4],
+                            "id": new_task_id(),
                             "title": f"💬 Chat with Zoya about: {zt['title'][:30]}",
-                            "department": zt.get("department", "quick"),
+                            "department": zt["department"],
                             "priority": "high",
                             "due_date": (today + timedelta(days=1)).isoformat(),
                             "notes": f"Discuss Zoya's suggestion: {zt.get('zoya_suggestion', '')}",
@@ -391,10 +651,8 @@ with st.sidebar:
                             "remind_at": tomorrow_9am.isoformat(),
                             "remind_sent": False
                         }
-                        data["tasks"].append(new_task)
-                        for t in data["tasks"]:
-                            if t["id"] == zt["id"]:
-                                t["reminder_scheduled"] = tomorrow_9am.isoformat()
+                        add_task(data, new_task)
+                        update_task(data, zt["id"], reminder_scheduled=tomorrow_9am.isoformat())
                         save_tasks(data)
                         st.toast("⏰ I'll remind you tomorrow morning at 9am")
                         st.rerun()
@@ -405,9 +663,9 @@ with st.sidebar:
                         # Remind at 9am on selected date
                         remind_9am = datetime.combine(remind_date, datetime.strptime("09:00", "%H:%M").time())
                         new_task = {
-                            "id": datetime.now().strftime("%Y%m%d%H%M%S") + zt["id"][:4],
+                            "id": new_task_id(),
                             "title": f"💬 Chat with Zoya about: {zt['title'][:30]}",
-                            "department": zt.get("department", "quick"),
+                            "department": zt["department"],
                             "priority": "high",
                             "due_date": remind_date.isoformat(),
                             "notes": f"Discuss Zoya's suggestion: {zt.get('zoya_suggestion', '')}",
@@ -418,20 +676,15 @@ with st.sidebar:
                             "remind_at": remind_9am.isoformat(),
                             "remind_sent": False
                         }
-                        data["tasks"].append(new_task)
-                        for t in data["tasks"]:
-                            if t["id"] == zt["id"]:
-                                t["reminder_scheduled"] = remind_9am.isoformat()
+                        add_task(data, new_task)
+                        update_task(data, zt["id"], reminder_scheduled=remind_9am.isoformat())
                         save_tasks(data)
                         st.toast(f"⏰ I'll remind you on {remind_date.strftime('%b %d')} at 9am")
                         st.rerun()
                 
                 # Chat now button
                 if st.button("💬 Let's Chat Now", key=f"zoya_chat_{zt['id']}", use_container_width=True):
-                    for t in data["tasks"]:
-                        if t["id"] == zt["id"]:
-                            t["zoya_status"] = "chat_now"
-                            t["zoya_chat_requested_at"] = datetime.now().isoformat()
+                    update_task(data, zt["id"], zoya_status="chat_now", zoya_chat_requested_at=datetime.now().isoformat())
                     save_tasks(data)
                     st.rerun()
     
@@ -460,6 +713,9 @@ with st.sidebar:
     if st.button("📄 CSV → Shopify", key="file_tools_btn", use_container_width=True):
         st.session_state.show_file_tools = True
         st.rerun()
+    if st.button("📈 Analytics", key="analytics_btn", use_container_width=True):
+        st.session_state.show_analytics = True
+        st.rerun()
     
     st.markdown("---")
     
@@ -493,6 +749,25 @@ with st.sidebar:
     
     st.markdown("---")
     st.caption("Text Zoya to manage tasks")
+    if agent_api:
+        host, port = agent_api.server_address[:2]
+        st.caption(f"🔌 Agent API: http://{host}:{port}/changes?since={data_version}")
+    if sync_loop:
+        st.caption(sync_loop.status())
+    if dep_graph.cycles():
+        st.warning(f"⛓️ {len(dep_graph.cycles())} tasks wait on each other in a loop")
+    if snapshot.load_issues:
+        with st.expander(f"⚠️ {len(snapshot.load_issues)} task record issue(s) on load"):
+            for issue in snapshot.load_issues[:20]:
+                st.caption(issue)
+
+    # Keep an idle session current: other sessions' commits, and past midnight
+    if hasattr(st, "fragment"):
+        @st.fragment(run_every=5)
+        def watch_for_updates():
+            if st.session_state.change_feed.pending() or date.today() != today:
+                st.rerun()
+        watch_for_updates()
 
 # Header
 col1, col2, col3 = st.columns([2, 1, 1])
@@ -507,11 +782,13 @@ with col2:
         new_priority = st.selectbox("Priority", ["high", "medium", "low"], index=1, key="new_task_priority")
         new_due = st.date_input("Due date", value=today, key="new_task_due")
         new_notes = st.text_input("Notes (optional)", key="new_task_notes")
+        new_repeat = st.selectbox("Repeat", ["never"] + list(REPEAT_PRESETS),
+            format_func=lambda x: x.capitalize(), key="new_task_repeat")
         
         if st.button("✅ Create Task", key="create_task_btn", use_container_width=True):
             if new_title.strip():
                 new_task = {
-                    "id": datetime.now().strftime("%Y%m%d%H%M%S"),
+                    "id": new_task_id(),
                     "title": new_title.strip(),
                     "department": new_dept,
                     "priority": new_priority,
@@ -520,7 +797,9 @@ with col2:
                     "done": False,
                     "created": datetime.now().isoformat()
                 }
-                data["tasks"].append(new_task)
+                if new_repeat != "never":
+                    new_task["recurrence"] = dict(REPEAT_PRESETS[new_repeat])
+                add_task(data, new_task)
                 save_tasks(data)
                 st.rerun()
             else:
@@ -533,15 +812,15 @@ with col3:
 # Stats
 st.markdown(f"""
 <div class="stats-row">
-    <div class="stat-box"><div class="stat-num">{len(open_tasks)}</div><div class="stat-label">Open</div></div>
-    <div class="stat-box"><div class="stat-num">{len(today_tasks)}</div><div class="stat-label">Today</div></div>
-    <div class="stat-box"><div class="stat-num {'red' if overdue else ''}">{len(overdue)}</div><div class="stat-label">Overdue</div></div>
-    <div class="stat-box"><div class="stat-num">{len(high_p)}</div><div class="stat-label">Priority</div></div>
+    <div class="stat-box"><div class="stat-num">{stats['open']}</div><div class="stat-label">Open</div></div>
+    <div class="stat-box"><div class="stat-num">{stats['today']}</div><div class="stat-label">Today</div></div>
+    <div class="stat-box"><div class="stat-num {'red' if stats['overdue'] else ''}">{stats['overdue']}</div><div class="stat-label">Overdue</div></div>
+    <div class="stat-box"><div class="stat-num">{stats['high']}</div><div class="stat-label">Priority</div></div>
 </div>
 """, unsafe_allow_html=True)
 
-if st.session_state.selected_dept:
-    st.info(f"Filtered: {dept_labels.get(st.session_state.selected_dept, '')}")
+if active_filters_text():
+    st.info(f"Filtered: {active_filters_text()}")
 
 # File Tools Dialog
 if st.session_state.get("show_file_tools"):
@@ -559,196 +838,54 @@ if st.session_state.get("show_file_tools"):
     
     uploaded_file = st.file_uploader("Choose CSV file", type=["csv"], key="csv_upload")
     vendor_name = st.text_input("Brand/Vendor Name", value="", placeholder="e.g. Try On Dress")
+    check_images = st.checkbox("Check image links", value=False, key="check_image_links",
+                               help="Fetch every image URL (Drive share links become direct links) before export")
+    fill_attributes = st.checkbox("Fill GTF attributes", value=True, key="fill_gtf_attributes",
+                                  help="Silhouette, neckline, vibe, occasion... parsed from titles and descriptions")
     
     if uploaded_file and vendor_name:
         if st.button("🔄 Convert to Shopify Format", use_container_width=True, type="primary"):
-            import csv
-            import re
-            import io
-            
-            # Official Shopify columns (2024 format) - 57 columns
-            SHOPIFY_COLUMNS = [
-                "Title", "URL handle", "Description", "Vendor", "Product category", "Type", "Tags",
-                "Published on online store", "Status", "SKU", "Barcode", "Option1 name", "Option1 value",
-                "Option1 Linked To", "Option2 name", "Option2 value", "Option2 Linked To", "Option3 name",
-                "Option3 value", "Option3 Linked To", "Price", "Compare-at price", "Cost per item",
-                "Charge tax", "Tax code", "Unit price total measure", "Unit price total measure unit",
-                "Unit price base measure", "Unit price base measure unit", "Inventory tracker",
-                "Inventory quantity", "Continue selling when out of stock", "Weight value (grams)",
-                "Weight unit for display", "Requires shipping", "Fulfillment service", "Product image URL",
-                "Image position", "Image alt text", "Variant image URL", "Gift card", "SEO title",
-                "SEO description", "Color (product.metafields.shopify.color-pattern)",
-                "Google Shopping / Google product category", "Google Shopping / Gender",
-                "Google Shopping / Age group", "Google Shopping / Manufacturer part number (MPN)",
-                "Google Shopping / Ad group name", "Google Shopping / Ads labels",
-                "Google Shopping / Condition", "Google Shopping / Custom product",
-                "Google Shopping / Custom label 0", "Google Shopping / Custom label 1",
-                "Google Shopping / Custom label 2", "Google Shopping / Custom label 3",
-                "Google Shopping / Custom label 4",
-            ]
-            
-            # GTF Attribute Schema v2 columns - 32 columns
-            GTF_ATTRIBUTE_COLUMNS = [
-                # Hard attributes (factual)
-                "gtf_category", "gtf_primary_color", "gtf_secondary_color", "gtf_silhouette",
-                "gtf_length", "gtf_neckline", "gtf_sleeve_length", "gtf_pattern",
-                # Soft attributes (subjective/vibe)
-                "gtf_vibe", "gtf_occasion", "gtf_style_references", "gtf_destination",
-                "gtf_style_persona", "gtf_pinterest_aesthetic", "gtf_event_suitability",
-                "gtf_shopper_mindset", "gtf_key_selling_point",
-                # Celebrity reference
-                "gtf_celebrity_detected", "gtf_celebrity_name", "gtf_celebrity_type",
-                "gtf_celebrity_style_context",
-                # Search intent
-                "gtf_primary_piece", "gtf_secondary_pieces", "gtf_overall_aesthetic",
-                "gtf_color_palette", "gtf_key_attributes_to_match",
-                # Meta
-                "gtf_extraction_mode", "gtf_confidence", "gtf_extraction_notes",
-                # Additional useful
-                "gtf_google_drive_link", "gtf_hs_code", "gtf_care_instructions",
-            ]
-            
-            ALL_COLUMNS = SHOPIFY_COLUMNS + GTF_ATTRIBUTE_COLUMNS
+            from shopify_converter import convert, to_csv
             
             # Read uploaded file
             content = uploaded_file.read().decode('utf-8-sig')
-            reader = csv.DictReader(io.StringIO(content))
-            rows = list(reader)
-            
-            shopify_rows = []
-            products = {}
+            shopify_rows, products = convert(content, vendor_name)
             
-            for row in rows:
-                sku = (row.get('SKU Code') or row.get('SKU') or row.get('Style Code') or '').strip()
-                if not sku:
-                    continue
+            if shopify_rows:
+                st.success(f"✅ Converted {len(products)} products ({len(shopify_rows)} variants)")
+                st.info(f"📊 89 columns: 57 Shopify + 32 GTF attributes (Schema v2)")
                 
-                title = (row.get('Dress Name') or row.get('Product Name') or row.get('Title') or '').strip()
-                color = (row.get('Colour') or row.get('Color') or '').strip().title()
-                size = (row.get('Size') or '').strip()
-                length = (row.get('Lenght') or row.get('Length') or '').strip()
-                material = (row.get('Material') or row.get('Fabric') or '').replace('-', ' ').replace('100 ', '100% ').title()
-                price = row.get('Final Price') or row.get('Price') or '0'
-                category = (row.get('Category') or row.get('Type') or 'Clothing').strip()
-                wash_care = (row.get('Wash care') or row.get('Care Instructions') or '').strip()
-                weight_raw = (row.get('Average Weight (kg)') or row.get('Weight (kg)') or '').strip()
-                hs_code = (row.get('HS Code') or row.get('Hs Code') or '').strip()
-                image_link = (row.get('Product Link (Google Drive/Shopify)') or row.get('Image URL') or row.get('Google Drive Link') or '').strip()
+                if fill_attributes:
+                    from gtf_enrichment import enrich
+                    extracted, cached = enrich(products)
+                    st.caption(f"🏷️ GTF attributes: {extracted} products extracted, {cached} from cache")
                 
-                # Parse weight
-                try:
-                    if 'kg' in weight_raw.lower():
-                        weight = int(float(re.sub(r'[^0-9.]', '', weight_raw)) * 1000)
+                if check_images:
+                    from image_links import validate_rows
+                    with st.spinner("Checking image links..."):
+                        broken, checks = validate_rows(shopify_rows)
+                    if broken:
+                        st.warning(f"⚠️ {len(broken)} of {len(checks)} image links are broken (noted in gtf_extraction_notes)")
+                        st.dataframe([{"Row": n, "SKU": sku, "URL": url, "Problem": error}
+                                      for n, sku, url, error in broken], hide_index=True)
                     else:
-                        weight = int(float(weight_raw or 0) * 1000) if weight_raw else 500
-                except:
-                    weight = 500
-                
-                handle = re.sub(r'[^a-z0-9]+', '-', f"{title}-{color}".lower()).strip('-')
-                product_key = f"{title}|{color}"
-                option2_value = length.title() if length and length.lower() not in ['', 'nan', 'none'] else ''
-                
-                # Description
-                desc_parts = []
-                if material:
-                    desc_parts.append(f"<p><strong>Material:</strong> {material}</p>")
-                if wash_care and wash_care.lower() != 'nan':
-                    desc_parts.append(f"<p><strong>Care:</strong><br>{wash_care.replace(';', '<br>')}</p>")
-                description = '\n'.join(desc_parts)
+                        st.success(f"🖼️ All {len(checks)} image links load")
+                    thumbs = [c.thumbnail for c in checks.values() if c.thumbnail][:12]
+                    if thumbs:
+                        st.image(thumbs, width=80)
                 
-                tags = [t for t in [category, color] if t and t.lower() != 'nan']
-                product_category = f"Apparel & Accessories > Clothing > {category}" if category else "Apparel & Accessories > Clothing"
-                
-                is_first = product_key not in products
-                shopify_row = {col: "" for col in ALL_COLUMNS}
-                
-                if is_first:
-                    products[product_key] = True
-                    shopify_row.update({
-                        "Title": f"{title} - {color}",
-                        "URL handle": handle,
-                        "Description": description,
-                        "Vendor": vendor_name,
-                        "Product category": product_category,
-                        "Type": category,
-                        "Tags": ', '.join(tags),
-                        "Published on online store": "TRUE",
-                        "Status": "Draft",
-                        "SKU": sku,
-                        "Option1 name": "Size",
-                        "Option1 value": size,
-                        "Option2 name": "Length" if option2_value else "",
-                        "Option2 value": option2_value,
-                        "Price": price,
-                        "Charge tax": "TRUE",
-                        "Inventory tracker": "shopify",
-                        "Inventory quantity": "1",
-                        "Continue selling when out of stock": "DENY",
-                        "Weight value (grams)": weight,
-                        "Weight unit for display": "g",
-                        "Requires shipping": "TRUE",
-                        "Fulfillment service": "manual",
-                        "Product image URL": image_link,
-                        "Image position": "1",
-                        "Image alt text": f"{title} {color}",
-                        "Gift card": "FALSE",
-                        "SEO title": f"{title} - {color} | {vendor_name}",
-                        "SEO description": f"Shop {title} in {color}.",
-                        "Color (product.metafields.shopify.color-pattern)": color.lower(),
-                        "Google Shopping / Google product category": product_category,
-                        "Google Shopping / Gender": "Female",
-                        "Google Shopping / Age group": "Adult",
-                        "Google Shopping / Manufacturer part number (MPN)": sku,
-                        "Google Shopping / Condition": "New",
-                        "Google Shopping / Custom product": "FALSE",
-                        "Google Shopping / Custom label 0": hs_code,
-                        # Pre-fill GTF attributes (Schema v2)
-                        "gtf_category": category.lower(),
-                        "gtf_primary_color": color.lower(),
-                        "gtf_secondary_color": "",
-                        "gtf_silhouette": "",
-                        "gtf_length": option2_value.lower() if option2_value else "",
-                        "gtf_neckline": "",
-                        "gtf_sleeve_length": "",
-                        "gtf_pattern": "",
-                        "gtf_primary_piece": category.lower(),
-                        "gtf_color_palette": color.lower(),
-                        "gtf_extraction_mode": "catalog",
-                        "gtf_google_drive_link": image_link,
-                        "gtf_hs_code": hs_code,
-                        "gtf_care_instructions": wash_care,
-                    })
-                else:
-                    shopify_row.update({
-                        "URL handle": handle,
-                        "SKU": sku,
-                        "Option1 value": size,
-                        "Option2 value": option2_value,
-                        "Price": price,
-                        "Charge tax": "TRUE",
-                        "Inventory tracker": "shopify",
-                        "Inventory quantity": "1",
-                        "Continue selling when out of stock": "DENY",
-                        "Weight value (grams)": weight,
-                        "Weight unit for display": "g",
-                        "Requires shipping": "TRUE",
-                        "Fulfillment service": "manual",
-                    })
-                
-                shopify_rows.append(shopify_row)
-            
-            if shopify_rows:
-                output = io.StringIO()
-                writer = csv.DictWriter(output, fieldnames=ALL_COLUMNS)
-                writer.writeheader()
-                writer.writerows(shopify_rows)
-                
-                st.success(f"✅ Converted {len(products)} products ({len(shopify_rows)} variants)")
-                st.info(f"📊 89 columns: 57 Shopify + 32 GTF attributes (Schema v2)")
+                from shopify_validator import validate
+                issues = list(validate(shopify_rows))
+                errors = [i for i in issues if i.severity == "error"]
+                if issues:
+                    (st.error if errors else st.warning)(
+                        f"{len(errors)} error(s), {len(issues) - len(errors)} warning(s) Shopify may reject")
+                    st.dataframe([{"Row": i.row, "Column": i.column, "Problem": i.message, "Level": i.severity}
+                                  for i in issues[:500]], hide_index=True)
                 
                 st.download_button(
                     label="📥 Download Shopify CSV",
-                    data=output.getvalue(),
+                    data=to_csv(shopify_rows),
                     file_name=f"{vendor_name.replace(' ', '_')}_shopify.csv",
                     mime="text/csv",
                     use_container_width=True
@@ -758,9 +895,80 @@ if st.session_state.get("show_file_tools"):
     
     st.markdown("---")
 
+# Analytics
+if st.session_state.show_analytics:
+    import pandas as pd
+    from analytics import for_version, weekly_throughput, lead_times, overdue_ageing, zoya_acceptance
+    
+    an_col1, an_col2 = st.columns([3, 1])
+    with an_col1:
+        st.markdown("### 📈 Analytics")
+    with an_col2:
+        if st.button("✕ Close", key="close_analytics"):
+            st.session_state.show_analytics = False
+            st.rerun()
+    
+    # Archived tasks, if any, count towards history too; so do recurring occurrences
+    cols, rollups = for_version(data_version, base_data.get("tasks", []) + base_data.get("archive", []),
+                                task_index.occurrences(due_to=today_str))
+    weeks = st.select_slider("Weeks", [4, 8, 12, 26, 52], value=12, key="analytics_weeks")
+    
+    week_labels, per_dept = weekly_throughput(cols, rollups, today, weeks)
+    st.markdown("**Completed per week**")
+    st.bar_chart(pd.DataFrame({dept_labels.get(k, k): v for k, v in per_dept.items()}, index=week_labels))
+    
+    lt_col, age_col, z_col = st.columns(3)
+    with lt_col:
+        st.markdown("**Lead time (days)**")
+        lt = lead_times(cols)
+        if lt:
+            st.dataframe(pd.DataFrame(
+                [(dept_labels.get(k, "All" if k == "all" else k), n, med, p90) for k, (n, med, p90) in lt.items()],
+                columns=["Department", "Done", "Median", "P90"]), hide_index=True)
+        else:
+            st.caption("No completed tasks with a created date yet")
+    with age_col:
+        st.markdown("**Overdue ageing**")
+        ageing = overdue_ageing(cols, today)
+        st.bar_chart(pd.DataFrame({"Open tasks": [n for _, n in ageing]}, index=[label for label, _ in ageing]))
+    with z_col:
+        st.markdown("**Zoya suggestions**")
+        z = zoya_acceptance(cols)
+        st.metric("Accepted", f"{z['rate']:.0%}" if z["rate"] is not None else "—")
+        st.caption(f"{z['accepted']} accepted · {z['denied']} denied · {z['pending']} pending of {z['suggested']}")
+    
+    st.markdown("---")
+
 if st.session_state.show_calendar:
     # Calendar view with clickable colored task cards
-    days = [(today + timedelta(days=i-1)) for i in range(7)]
+    def move_calendar(step):
+        span = st.session_state.get("cal_span", "Week")
+        anchor = st.session_state.get("cal_anchor") or default_anchor(span, today)
+        st.session_state.cal_anchor = None if step == 0 else shift_window(span, anchor, step)
+        st.session_state.cal_show_all_day = None
+    
+    def open_week(d):
+        st.session_state.cal_span = "Week"
+        st.session_state.cal_anchor = d
+        st.session_state.cal_show_all_day = d.isoformat()
+    
+    nav_span, nav_prev, nav_today, nav_next, nav_title = st.columns([2, 0.5, 0.7, 0.5, 2])
+    with nav_span:
+        span = st.radio("Calendar span", CAL_SPANS, horizontal=True, key="cal_span", label_visibility="collapsed")
+    with nav_prev:
+        st.button("◀", key="cal_prev", on_click=move_calendar, args=(-1,), use_container_width=True)
+    with nav_today:
+        st.button("Today", key="cal_today", on_click=move_calendar, args=(0,), use_container_width=True)
+    with nav_next:
+        st.button("▶", key="cal_next", on_click=move_calendar, args=(1,), use_container_width=True)
+    rows = cal_window(span, st.session_state.get("cal_anchor") or default_anchor(span, today))
+    days = [d for row in rows for d in row]
+    with nav_title:
+        st.markdown(f"**{cal_title(span, rows)}**")
+    
+    # One due-range query for the whole window, bucketed by day
+    window_tasks = tasks_by_day(query_tasks(due_from=days[0].isoformat(), due_to=days[-1].isoformat(), sort="board"))
+    cell_limit = CELL_LIMITS[span]
     
     # Initialize selected task state
     if "selected_task" not in st.session_state:
@@ -768,35 +976,28 @@ if st.session_state.show_calendar:
     
     # If a task is selected, show action bar at top
     if st.session_state.selected_task:
-        sel_task = next((t for t in tasks if t["id"] == st.session_state.selected_task), None)
+        sel_task = task_index.get(st.session_state.selected_task)
         if sel_task:
             st.markdown(f"**Selected:** {sel_task['title'][:50]}")
             ac1, ac2, ac3, ac4, ac5 = st.columns([1, 1, 1, 2, 1])
             
             with ac1:
                 if st.button("✅ Done", use_container_width=True, key="action_done"):
-                    for t in data["tasks"]:
-                        if t["id"] == st.session_state.selected_task:
-                            t["done"] = True
-                            t["completed_date"] = today_str
+                    update_task(data, st.session_state.selected_task, done=True, completed_date=today_str)
                     save_tasks(data)
                     st.session_state.selected_task = None
                     st.rerun()
             
             with ac2:
                 if st.button("→ Tomorrow", use_container_width=True, key="action_tomorrow"):
-                    for t in data["tasks"]:
-                        if t["id"] == st.session_state.selected_task:
-                            t["due_date"] = (today + timedelta(days=1)).isoformat()
+                    update_task(data, st.session_state.selected_task, due_date=(today + timedelta(days=1)).isoformat())
                     save_tasks(data)
                     st.session_state.selected_task = None
                     st.rerun()
             
             with ac3:
                 if st.button("→ Today", use_container_width=True, key="action_today"):
-                    for t in data["tasks"]:
-                        if t["id"] == st.session_state.selected_task:
-                            t["due_date"] = today_str
+                    update_task(data, st.session_state.selected_task, due_date=today_str)
                     save_tasks(data)
                     st.session_state.selected_task = None
                     st.rerun()
@@ -806,9 +1007,7 @@ if st.session_state.show_calendar:
                 
             with ac5:
                 if st.button("Move", use_container_width=True, key="action_move"):
-                    for t in data["tasks"]:
-                        if t["id"] == st.session_state.selected_task:
-                            t["due_date"] = move_to.isoformat()
+                    update_task(data, st.session_state.selected_task, due_date=move_to.isoformat())
                     save_tasks(data)
                     st.session_state.selected_task = None
                     st.rerun()
@@ -819,122 +1018,213 @@ if st.session_state.show_calendar:
             
             st.markdown("---")
     
-    # Render day columns with clickable task cards
-    cols = st.columns(7)
-    
-    for i, d in enumerate(days):
-        d_str = d.isoformat()
-        day_tasks = [t for t in filter_tasks(open_tasks) if t.get("due_date") == d_str]
-        day_tasks = sorted(day_tasks, key=lambda x: (x.get("order", 999), x.get("priority") != "high"))
-        
-        day_name = d.strftime("%a")
+    def day_heading(d):
         if d == today:
-            day_name = "📍 TODAY"
+            return "📍 TODAY"
         elif d == today - timedelta(days=1):
-            day_name = "Yesterday"
+            return "Yesterday"
         elif d == today + timedelta(days=1):
-            day_name = "Tomorrow"
-        else:
-            day_name = f"{d.strftime('%a')}"
+            return "Tomorrow"
+        return d.strftime("%a")
+    
+    def render_reorder_board(days):
+        """Drag within a day to reorder, across days to reschedule"""
+        old_board = []
+        containers = []
+        label_to_id = {}
+        tasks_by_id = {}
+        for d in days:
+            d_str = d.isoformat()
+            ids = []
+            items = []
+            for t in query_tasks(due_from=d_str, due_to=d_str, sort="board"):
+                title = t["title"][:40] + "..." if len(t["title"]) > 40 else t["title"]
+                label = sortable_label(title, len(label_to_id))
+                label_to_id[label] = t["id"]
+                tasks_by_id[t["id"]] = t
+                ids.append(t["id"])
+                items.append(label)
+            old_board.append((d_str, ids))
+            containers.append({"header": f"{day_heading(d)} {d.day}", "items": items})
         
-        with cols[i]:
-            title_class = "day-title today" if d == today else "day-title"
-            st.markdown(f'<div class="{title_class}">{day_name}<br><span style="font-size:1.3rem; font-weight:700;">{d.day}</span></div>', unsafe_allow_html=True)
+        sorted_containers = sort_items(containers, multi_containers=True, key="cal_sortable")
+        returned = [label for c in sorted_containers for label in c["items"]]
+        if len(returned) != len(label_to_id) or set(returned) != label_to_id.keys():
+            return      # the component answered for an earlier render
+        new_board = [
+            (day, [label_to_id[label] for label in c["items"]])
+            for (day, _), c in zip(old_board, sorted_containers)
+        ]
+        changes = plan_board_move(old_board, new_board, tasks_by_id)
+        if changes:
+            apply_changes(data, changes)
+            save_tasks(data)
+            st.rerun()
+    
+    def render_compact_cell(d):
+        """Month / two-week cell: a few light cards, the rest behind +N more"""
+        d_str = d.isoformat()
+        day_tasks = window_tasks.get(d_str, [])
+        marker = "📍 " if d == today else ""
+        dim = "" if span != "Month" or d.month == rows[1][0].month else " style='opacity:0.4'"
+        title_class = "day-title today" if d == today else "day-title"
+        st.markdown(f'<div class="{title_class}"{dim}>{marker}{d.day}</div>', unsafe_allow_html=True)
+        for t in day_tasks[:cell_limit]:
+            label = t["title"][:22] + "…" if len(t["title"]) > 22 else t["title"]
+            if t.get("series_id"):
+                label = "🔁 " + label
+            with st.popover(label, use_container_width=True):
+                st.markdown(f"**{t['title']}**")
+                st.caption(f"{dept_labels.get(t['department'], 'Quick')} · {t['priority']}")
+                if t["notes"]:
+                    st.caption(f"📝 {t['notes']}")
+                if st.button("✅ Done", key=f"mc_done_{t['id']}", use_container_width=True):
+                    update_task(data, t["id"], done=True, completed_date=today_str)
+                    save_tasks(data)
+                    st.rerun()
+                if st.button("→ Next day", key=f"mc_next_{t['id']}", use_container_width=True):
+                    update_task(data, t["id"], due_date=(d + timedelta(days=1)).isoformat())
+                    save_tasks(data)
+                    st.rerun()
+        if len(day_tasks) > cell_limit:
+            st.button(f"+{len(day_tasks) - cell_limit} more", key=f"cal_more_{d_str}",
+                on_click=open_week, args=(d,), use_container_width=True)
+    
+    reorder = span == "Week" and st.toggle("↕️ Drag to reorder", key="cal_reorder")
+    
+    if reorder:
+        render_reorder_board(days)
+    elif span != "Week":
+        # Weekday header, then one row of cells per week
+        for c, name in zip(st.columns(7), ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]):
+            c.caption(name)
+        for row in rows:
+            for c, d in zip(st.columns(7), row):
+                with c:
+                    render_compact_cell(d)
+    else:
+        # Render day columns with clickable task cards
+        cols = st.columns(7)
+    
+        for i, d in enumerate(days):
+            d_str = d.isoformat()
+            day_tasks = window_tasks.get(d_str, [])
+            if d_str != st.session_state.get("cal_show_all_day"):
+                hidden = len(day_tasks) - cell_limit
+                day_tasks = day_tasks[:cell_limit]
+            else:
+                hidden = 0
+        
+            day_name = day_heading(d)
+        
+            with cols[i]:
+                title_class = "day-title today" if d == today else "day-title"
+                st.markdown(f'<div class="{title_class}">{day_name}<br><span style="font-size:1.3rem; font-weight:700;">{d.day}</span></div>', unsafe_allow_html=True)
             
-            if day_tasks:
-                for t in day_tasks:
-                    dk = t.get("department", "quick")
-                    color = dept_colors.get(dk, "#6B7280")
-                    label = t["title"][:40] + "..." if len(t["title"]) > 40 else t["title"]
-                    is_selected = st.session_state.selected_task == t["id"]
+                if day_tasks:
+                    for t in day_tasks:
+                        dk = t["department"]
+                        color = dept_colors.get(dk, "#6B7280")
+                        label = t["title"][:40] + "..." if len(t["title"]) > 40 else t["title"]
+                        if t.get("series_id"):
+                            label = "🔁 " + label
+                        if dep_graph.is_blocked(t["id"]):
+                            label = "⛓️ " + label
+                        is_selected = st.session_state.selected_task == t["id"]
                     
-                    # Use popover for each task
-                    with st.popover(f"{'✓ ' if is_selected else ''}{label}", use_container_width=True):
-                        # Editable title
-                        edit_title = st.text_input("Title", value=t['title'], key=f"cal_title_{t['id']}")
+                        # Use popover for each task
+                        with st.popover(f"{'✓ ' if is_selected else ''}{label}", use_container_width=True):
+                            # Editable title
+                            edit_title = st.text_input("Title", value=t['title'], key=f"cal_title_{t['id']}")
                         
-                        # Department selector
-                        edit_dept = st.selectbox("Department", list(dept_labels.keys()),
-                            index=list(dept_labels.keys()).index(dk) if dk in dept_labels else 0,
-                            format_func=lambda x: dept_labels.get(x, x),
-                            key=f"cal_dept_{t['id']}")
+                            # Department selector
+                            edit_dept = st.selectbox("Department", list(dept_labels.keys()),
+                                index=list(dept_labels.keys()).index(dk) if dk in dept_labels else 0,
+                                format_func=lambda x: dept_labels.get(x, x),
+                                key=f"cal_dept_{t['id']}")
                         
-                        # Priority
-                        edit_priority = st.selectbox("Priority", ["high", "medium", "low"],
-                            index=["high", "medium", "low"].index(t.get("priority", "medium")),
-                            key=f"cal_pri_{t['id']}")
+                            # Priority
+                            edit_priority = st.selectbox("Priority", ["high", "medium", "low"],
+                                index=["high", "medium", "low"].index(t["priority"]),
+                                key=f"cal_pri_{t['id']}")
                         
-                        # Notes section
-                        current_notes = t.get("notes", "")
-                        new_notes = st.text_area("Notes", value=current_notes, key=f"cal_notes_{t['id']}", height=80, placeholder="Add context, details, links...")
+                            # Notes section
+                            current_notes = t["notes"]
+                            new_notes = st.text_area("Notes", value=current_notes, key=f"cal_notes_{t['id']}", height=80, placeholder="Add context, details, links...")
                         
-                        # Save changes button
-                        if edit_title != t['title'] or edit_dept != dk or edit_priority != t.get("priority", "medium") or new_notes != current_notes:
-                            if st.button("💾 Save Changes", key=f"cal_save_{t['id']}", use_container_width=True):
-                                for task in data["tasks"]:
-                                    if task["id"] == t["id"]:
-                                        task["title"] = edit_title
-                                        task["department"] = edit_dept
-                                        task["priority"] = edit_priority
-                                        task["notes"] = new_notes
-                                save_tasks(data)
-                                st.rerun()
+                            # Save changes button
+                            if edit_title != t['title'] or edit_dept != dk or edit_priority != t["priority"] or new_notes != current_notes:
+                                if st.button("💾 Save Changes", key=f"cal_save_{t['id']}", use_container_width=True):
+                                    update_task(data, t["id"],
+                                        title=edit_title,
+                                        department=edit_dept,
+                                        priority=edit_priority,
+                                        notes=new_notes)
+                                    save_tasks(data)
+                                    st.rerun()
+                        
+                            st.markdown("---")
                         
-                        st.markdown("---")
+                            col_a, col_b = st.columns(2)
+                            with col_a:
+                                if st.button("✅ Done", key=f"pop_done_{t['id']}", use_container_width=True):
+                                    update_task(data, t["id"], done=True, completed_date=today_str)
+                                    save_tasks(data)
+                                    st.rerun()
                         
-                        col_a, col_b = st.columns(2)
-                        with col_a:
-                            if st.button("✅ Done", key=f"pop_done_{t['id']}", use_container_width=True):
-                                for task in data["tasks"]:
-                                    if task["id"] == t["id"]:
-                                        task["done"] = True
-                                        task["completed_date"] = today_str
+                            with col_b:
+                                if st.button("→ Tomorrow", key=f"pop_tmrw_{t['id']}", use_container_width=True):
+                                    update_task(data, t["id"], due_date=(today + timedelta(days=1)).isoformat())
+                                    save_tasks(data)
+                                    st.rerun()
+                        
+                            new_date = st.date_input("Move to", value=d, key=f"pop_date_{t['id']}", label_visibility="collapsed")
+                            if st.button("Move to date", key=f"pop_move_{t['id']}", use_container_width=True):
+                                update_task(data, t["id"], due_date=new_date.isoformat())
                                 save_tasks(data)
                                 st.rerun()
                         
-                        with col_b:
-                            if st.button("→ Tomorrow", key=f"pop_tmrw_{t['id']}", use_container_width=True):
-                                for task in data["tasks"]:
-                                    if task["id"] == t["id"]:
-                                        task["due_date"] = (today + timedelta(days=1)).isoformat()
+                            st.markdown("---")
+                            if st.button("🗑️ Delete Task", key=f"cal_del_{t['id']}", use_container_width=True):
+                                delete_task(data, t["id"])
                                 save_tasks(data)
                                 st.rerun()
-                        
-                        new_date = st.date_input("Move to", value=d, key=f"pop_date_{t['id']}", label_visibility="collapsed")
-                        if st.button("Move to date", key=f"pop_move_{t['id']}", use_container_width=True):
-                            for task in data["tasks"]:
-                                if task["id"] == t["id"]:
-                                    task["due_date"] = new_date.isoformat()
-                            save_tasks(data)
-                            st.rerun()
-                        
-                        st.markdown("---")
-                        if st.button("🗑️ Delete Task", key=f"cal_del_{t['id']}", use_container_width=True):
-                            data["tasks"] = [task for task in data["tasks"] if task["id"] != t["id"]]
-                            save_tasks(data)
+                    if hidden > 0:
+                        if st.button(f"+{hidden} more", key=f"cal_more_{d_str}", use_container_width=True):
+                            st.session_state.cal_show_all_day = d_str
                             st.rerun()
-            else:
-                st.caption("—")
+                else:
+                    st.caption("—")
     
     # Color legend
     st.markdown("---")
     legend_html = "<div style='display:flex; flex-wrap:wrap; gap:8px; align-items:center;'><span style='font-size:0.75rem; color:#888;'>Departments:</span>"
     for dk, dn in dept_labels.items():
         color = dept_colors.get(dk, "#6B7280")
-        count = len([t for t in open_tasks if t.get("department") == dk])
-        if count > 0:
+        if stats["by_dept"].get(dk, 0) > 0:
             legend_html += f"<span style='background:{color}; color:white; padding:3px 8px; border-radius:4px; font-size:0.7rem;'>{dn}</span>"
     legend_html += "</div>"
     st.markdown(legend_html, unsafe_allow_html=True)
     
     # Overdue section
-    overdue_filtered = filter_tasks(overdue)
+    overdue_filtered = query_tasks(due_to=yesterday_str, sort=None)
     if overdue_filtered:
         st.markdown("---")
         st.markdown("**⚠️ Overdue Tasks**")
+        bulk_c1, bulk_c2, _ = st.columns([1, 1, 2])
+        with bulk_c1:
+            if st.button(f"→ Today (all {len(overdue_filtered)})", key="ov_bulk_today", use_container_width=True):
+                apply_changes(data, [("update", t["id"], {"due_date": today_str}) for t in overdue_filtered])
+                save_tasks(data)
+                st.rerun()
+        with bulk_c2:
+            if st.button(f"✅ Done (all {len(overdue_filtered)})", key="ov_bulk_done", use_container_width=True):
+                apply_changes(data, [("update", t["id"], {"done": True, "completed_date": today_str}) for t in overdue_filtered])
+                save_tasks(data)
+                st.rerun()
         ov_cols = st.columns(4)
         for idx, t in enumerate(overdue_filtered[:12]):
-            dk = t.get("department", "quick")
+            dk = t["department"]
             color = dept_colors.get(dk, "#6B7280")
             label = t["title"][:40] + "..." if len(t["title"]) > 40 else t["title"]
             
@@ -944,53 +1234,112 @@ if st.session_state.show_calendar:
                     st.caption(f"Dept: {dept_labels.get(dk, 'Quick')} · Overdue: {t.get('due_date', '')}")
                     
                     # Notes section
-                    current_notes = t.get("notes", "")
+                    current_notes = t["notes"]
                     if current_notes:
                         st.markdown(f"📝 *{current_notes}*")
                     
                     new_notes = st.text_area("Notes", value=current_notes, key=f"ov_notes_{t['id']}", height=60, placeholder="Add context...")
                     if new_notes != current_notes:
                         if st.button("💾 Save", key=f"ov_save_{t['id']}", use_container_width=True):
-                            for task in data["tasks"]:
-                                if task["id"] == t["id"]:
-                                    task["notes"] = new_notes
+                            update_task(data, t["id"], notes=new_notes)
                             save_tasks(data)
                             st.rerun()
                     
                     st.markdown("---")
                     
                     if st.button("✅ Done", key=f"ov_done_{t['id']}", use_container_width=True):
-                        for task in data["tasks"]:
-                            if task["id"] == t["id"]:
-                                task["done"] = True
-                                task["completed_date"] = today_str
+                        update_task(data, t["id"], done=True, completed_date=today_str)
                         save_tasks(data)
                         st.rerun()
                     
                     if st.button("→ Today", key=f"ov_today_{t['id']}", use_container_width=True):
-                        for task in data["tasks"]:
-                            if task["id"] == t["id"]:
-                                task["due_date"] = today_str
+                        update_task(data, t["id"], due_date=today_str)
                         save_tasks(data)
                         st.rerun()
                     
                     if st.button("→ Tomorrow", key=f"ov_tmrw_{t['id']}", use_container_width=True):
-                        for task in data["tasks"]:
-                            if task["id"] == t["id"]:
-                                task["due_date"] = (today + timedelta(days=1)).isoformat()
+                        update_task(data, t["id"], due_date=(today + timedelta(days=1)).isoformat())
                         save_tasks(data)
                         st.rerun()
 
 else:
     # List view
-    view = st.radio("", ["Today", "All", "Done"], horizontal=True, label_visibility="collapsed")
+    view_col, bulk_col = st.columns([3, 1])
+    with view_col:
+        view = st.radio("View", ["Today", "All", "Done"], horizontal=True, label_visibility="collapsed")
+    with bulk_col:
+        bulk_mode = view != "Done" and st.toggle("Select multiple", key="bulk_mode")
+    
+    def clear_bulk_selection(task_list):
+        for t in task_list:
+            st.session_state.pop(f"sel_{t['id']}", None)
+    
+    def run_bulk(changes, task_list):
+        """Apply one batch of changes, save once, rerun once"""
+        n = apply_changes(data, changes)
+        save_tasks(data)
+        clear_bulk_selection(task_list)
+        st.toast(f"Updated {n} tasks")
+        st.rerun()
+    
+    def render_bulk_actions(task_list):
+        """Action bar for the tasks ticked in select mode (rendered above the list)"""
+        selected = [t["id"] for t in task_list if st.session_state.get(f"sel_{t['id']}")]
+        
+        s1, s2, s3 = st.columns([1, 1, 2])
+        with s1:
+            if st.button("Select all", key="bulk_select_all", use_container_width=True):
+                for t in task_list:
+                    st.session_state[f"sel_{t['id']}"] = True
+                st.rerun()
+        with s2:
+            if st.button("Clear", key="bulk_clear", use_container_width=True):
+                clear_bulk_selection(task_list)
+                st.rerun()
+        with s3:
+            st.caption(f"{len(selected)} selected")
+        
+        if not selected:
+            return
+        
+        b1, b2, b3 = st.columns(3)
+        with b1:
+            if st.button("✅ Done", key="bulk_done", use_container_width=True):
+                run_bulk([("update", tid, {"done": True, "completed_date": today_str}) for tid in selected], task_list)
+        with b2:
+            if st.button("→ Today", key="bulk_today", use_container_width=True):
+                run_bulk([("update", tid, {"due_date": today_str}) for tid in selected], task_list)
+        with b3:
+            if st.button("🗑️ Delete", key="bulk_delete", use_container_width=True):
+                run_bulk([("delete", tid, None) for tid in selected], task_list)
+        
+        m1, m2, m3 = st.columns(3)
+        with m1:
+            bulk_date = st.date_input("Move to", value=today, key="bulk_date")
+            if st.button("Move", key="bulk_move", use_container_width=True):
+                run_bulk([("update", tid, {"due_date": bulk_date.isoformat()}) for tid in selected], task_list)
+        with m2:
+            bulk_dept = st.selectbox("Department", list(dept_labels.keys()),
+                format_func=lambda x: dept_labels.get(x, x), key="bulk_dept")
+            if st.button("Set department", key="bulk_set_dept", use_container_width=True):
+                run_bulk([("update", tid, {"department": bulk_dept}) for tid in selected], task_list)
+        with m3:
+            bulk_priority = st.selectbox("Priority", ["high", "medium", "low"], index=1, key="bulk_priority")
+            if st.button("Set priority", key="bulk_set_priority", use_container_width=True):
+                run_bulk([("update", tid, {"priority": bulk_priority}) for tid in selected], task_list)
+        
+        st.markdown("---")
+    
+    # "Waiting on" choices, built once per run; each popover only cuts itself out
+    dep_candidates = list(dep_graph.deps)
+    dep_position = {tid: i for i, tid in enumerate(dep_candidates)}
     
     def render_task(task):
-        dk = task.get("department", "quick")
+        dk = task["department"]
         dept = dept_labels.get(dk, "Quick")
         color = dept_colors.get(dk, "#6B7280")
         due = task.get("due_date")
-        priority = task.get("priority", "medium")
+        priority = task["priority"]
         
         due_text = ""
         if due:
@@ -1001,16 +1350,28 @@ else:
             else:
                 due_text = due
         
+        badges = ""
+        blockers = dep_graph.blockers(task["id"]) if not task["done"] else []
+        if blockers:
+            names = ", ".join(dep_graph.titles.get(b, b)[:25] for b in blockers[:2])
+            badges += f" · ⛓️ waiting on {names}" + (f" +{len(blockers) - 2}" if len(blockers) > 2 else "")
+        slip = dep_graph.slip(task["id"])
+        if slip:
+            badges += f" · ⚠️ slips to {slip.strftime('%b %d')}"
+        
         col1, col2, col3 = st.columns([0.05, 0.8, 0.15])
         
         with col1:
-            done = st.checkbox("", value=task.get("done", False), key=f"done_{task['id']}")
-            if done != task.get("done", False):
-                for t in data["tasks"]:
-                    if t["id"] == task["id"]:
-                        t["done"] = done
-                        if done:
-                            t["completed_date"] = today_str
+            if bulk_mode:
+                st.checkbox("Select", key=f"sel_{task['id']}", label_visibility="collapsed")
+                done = task["done"]
+            else:
+                done = st.checkbox("Done", value=task["done"], key=f"done_{task['id']}", label_visibility="collapsed")
+            if done != task["done"]:
+                if done:
+                    update_task(data, task["id"], done=True, completed_date=today_str)
+                else:
+                    update_task(data, task["id"], done=False)
                 save_tasks(data)
                 st.rerun()
         
@@ -1018,7 +1379,7 @@ else:
             st.markdown(f"""
             <div class="task-card" style="border-left-color: {color};">
                 <strong>{task['title']}</strong><br>
-                <small style="color: #888;">{dept} · {due_text} · {priority}</small>
+                <small style="color: #888;">{dept} · {due_text} · {priority}{' · 🔁' if task.get('series_id') else ''}{badges}</small>
             </div>
             """, unsafe_allow_html=True)
         
@@ -1027,41 +1388,88 @@ else:
                 # Edit title
                 new_title = st.text_input("Title", value=task["title"], key=f"title_{task['id']}")
                 new_dept = st.selectbox("Department", list(dept_labels.keys()),
-                    index=list(dept_labels.keys()).index(task.get("department", "quick")) if task.get("department") in dept_labels else 0,
+                    index=list(dept_labels.keys()).index(task["department"]) if task["department"] in dept_labels else 0,
                     format_func=lambda x: dept_labels.get(x, x),
                     key=f"dept_{task['id']}")
                 new_due = st.date_input("Due", 
                     value=date.fromisoformat(task["due_date"]) if task.get("due_date") else None, 
                     key=f"due_{task['id']}")
                 new_priority = st.selectbox("Priority", ["high", "medium", "low"], 
-                    index=["high", "medium", "low"].index(task.get("priority", "medium")),
+                    index=["high", "medium", "low"].index(task["priority"]),
                     key=f"pri_{task['id']}")
-                new_notes = st.text_area("Notes", value=task.get("notes", ""), 
+                new_notes = st.text_area("Notes", value=task["notes"], 
                     key=f"notes_{task['id']}", height=60)
+                new_deps = None
+                if not task.get("series_id"):
+                    current_deps = [d for d in task.get("depends_on", []) if d in dep_graph.deps]
+                    i = dep_position.get(task["id"])
+                    dep_options = dep_candidates if i is None else dep_candidates[:i] + dep_candidates[i + 1:]
+                    new_deps = st.multiselect("Waiting on", dep_options, default=current_deps,
+                        format_func=lambda x: dep_graph.titles.get(x, x)[:40],
+                        key=f"deps_{task['id']}")
+                    path = dep_graph.critical_path(task["id"])
+                    if len(path) > 1:
+                        st.caption("Critical path: " + " → ".join(dep_graph.titles.get(p, p)[:20] for p in path))
+                    if slip and st.button(f"📆 Shift to {slip.strftime('%b %d')} + downstream", key=f"slip_{task['id']}", use_container_width=True):
+                        apply_changes(data, dep_graph.slip_changes(task["id"]))
+                        save_tasks(data)
+                        st.rerun()
                 
                 col_save, col_del = st.columns(2)
                 with col_save:
                     if st.button("💾 Save", key=f"save_{task['id']}", use_container_width=True):
-                        for t in data["tasks"]:
-                            if t["id"] == task["id"]:
-                                t["title"] = new_title
-                                t["department"] = new_dept
-                                t["due_date"] = new_due.isoformat() if new_due else None
-                                t["priority"] = new_priority
-                                t["notes"] = new_notes
-                        save_tasks(data)
-                        st.rerun()
+                        fields = dict(
+                            title=new_title,
+                            department=new_dept,
+                            due_date=new_due.isoformat() if new_due else None,
+                            priority=new_priority,
+                            notes=new_notes)
+                        if new_deps is not None and new_deps != task.get("depends_on", []):
+                            fields["depends_on"] = new_deps
+                        if "depends_on" in fields and dep_graph.would_cycle(task["id"], new_deps):
+                            st.error("That would make a dependency loop")
+                        else:
+                            update_task(data, task["id"], **fields)
+                            save_tasks(data)
+                            st.rerun()
                 with col_del:
                     if st.button("🗑️ Delete", key=f"del_{task['id']}", use_container_width=True):
-                        data["tasks"] = [t for t in data["tasks"] if t["id"] != task["id"]]
+                        delete_task(data, task["id"])
                         save_tasks(data)
                         st.rerun()
+                recent = snapshot.history.for_task(task.get("series_id") or task["id"], limit=5)
+                if recent:
+                    st.markdown("**History**")
+                    for entry, before, after in recent:
+                        if before is None:
+                            what = "created"
+                        elif after is None:
+                            what = "deleted"
+                        else:
+                            what = "; ".join(f"{k}: {old} → {new}" if k not in ("notes", "exceptions") else f"{k} changed"
+                                             for k, old, new in field_changes(before, after))
+                        st.caption(f"{entry.at:%b %d %H:%M} · {who(entry.source)}{f' ({entry.action[0]})' if entry.action else ''} · {what}")
+                if task.get("series_id"):
+                    # Delete above skips this occurrence only
+                    col_end, col_delseries = st.columns(2)
+                    with col_end:
+                        if st.button("⏹ End series after this", key=f"endseries_{task['id']}", use_container_width=True):
+                            series = task_index.get(task["series_id"])
+                            update_task(data, task["series_id"], recurrence=end_series(series, task["occurrence_date"]))
+                            save_tasks(data)
+                            st.rerun()
+                    with col_delseries:
+                        if st.button("🗑️ Delete whole series", key=f"delseries_{task['id']}", use_container_width=True):
+                            delete_task(data, task["series_id"])
+                            save_tasks(data)
+                            st.rerun()
     
     if view == "Today":
-        all_today = filter_tasks(overdue + today_tasks)
-        all_today = sorted(all_today, key=lambda x: (x.get("order", 999), x.get("priority") != "high"))
+        all_today = query_tasks(due_to=today_str, sort="board")
         
         if all_today:
+            if bulk_mode:
+                render_bulk_actions(all_today)
             st.markdown('<div class="section-head">Today</div>', unsafe_allow_html=True)
             for task in all_today:
                 render_task(task)
@@ -1069,19 +1477,23 @@ else:
             st.info("Nothing due today")
     
     elif view == "All":
-        filtered = filter_tasks(open_tasks)
-        sorted_tasks = sorted(filtered, key=lambda x: (x.get("due_date") or "9999", x.get("priority") != "high"))
+        sorted_tasks = query_tasks(sort="due")
         
         if sorted_tasks:
+            if bulk_mode:
+                render_bulk_actions(sorted_tasks)
             st.markdown('<div class="section-head">All Tasks</div>', unsafe_allow_html=True)
             for task in sorted_tasks:
                 render_task(task)
     
     elif view == "Done":
-        filtered = filter_tasks(done_tasks)
+        filtered = query_tasks(status="done", sort=None)
         if filtered:
             st.markdown('<div class="section-head">Completed</div>', unsafe_allow_html=True)
             for task in filtered[:30]:
                 st.markdown(f"~~{task['title']}~~")
         else:
             st.info("No completed tasks")
+
+if memory_monitor:
+    render_memory_panel(memory_monitor)
@@ -0,0 +1,61 @@
+"""
+Time-to-first-render benchmark for GTF Command Center
+Runs app.py headless through streamlit.testing and reports the cold first
+render (fresh process) and warm reruns (modules already imported).
+
+Usage:
+    python bench_startup.py [--runs 5] [--app app.py]
+
+Compare against an older checkout by pointing --app at its app.py.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+
+def time_renders(app_path, reruns):
+    """Render app_path once cold, then `reruns` more times in the same process"""
+    from streamlit.testing.v1 import AppTest
+
+    timings = []
+    for _ in range(reruns + 1):
+        at = AppTest.from_file(app_path, default_timeout=60)
+        started = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - started) * 1000)
+        if at.exception:
+            raise SystemExit(f"App raised: {at.exception}")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes to start")
+    parser.add_argument("--app", default="app.py")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(" ".join(f"{t:.1f}" for t in time_renders(args.app, reruns=3)))
+        return
+
+    cold, warm = [], []
+    for _ in range(args.runs):
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", "--app", args.app],
+            capture_output=True, text=True, check=True,
+        ).stdout.split()
+        timings = [float(t) for t in out]
+        cold.append(timings[0])
+        warm.extend(timings[1:])
+
+    print(f"{args.app}: {args.runs} processes")
+    print(f"  first render  median {statistics.median(cold):7.1f} ms  (min {min(cold):.1f})")
+    print(f"  warm rerun    median {statistics.median(warm):7.1f} ms  (min {min(warm):.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Calendar windows for GTF Command Center
+Week, two-week and month layouts as rows of dates, plus navigation and
+per-day bucketing. A view fetches its whole window with one due-range query
+and caps how many cards each day cell renders.
+"""
+
+from datetime import timedelta
+
+SPANS = ("Week", "2 weeks", "Month")
+
+# Cards rendered per day before "+N more"; the dense views use compact cards
+CELL_LIMITS = {"Week": 8, "2 weeks": 5, "Month": 3}
+
+
+def default_anchor(span, today):
+    """Where a view starts when nobody has navigated: the week view keeps
+    yesterday as its first column"""
+    return today - timedelta(days=1) if span == "Week" else today
+
+
+def window(span, anchor):
+    """Rows of dates (each a list of 7) covering the view around anchor"""
+    if span == "Week":
+        return [[anchor + timedelta(days=i) for i in range(7)]]
+    monday = anchor - timedelta(days=anchor.weekday())
+    if span == "2 weeks":
+        return [[monday + timedelta(days=7 * w + i) for i in range(7)] for w in range(2)]
+    first = anchor.replace(day=1)
+    last = (first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    start = first - timedelta(days=first.weekday())
+    weeks = (last - start).days // 7 + 1
+    return [[start + timedelta(days=7 * w + i) for i in range(7)] for w in range(weeks)]
+
+
+def shift(span, anchor, step):
+    """Anchor moved one view forward (step=1) or back (step=-1)"""
+    if span == "Week":
+        return anchor + timedelta(days=7 * step)
+    if span == "2 weeks":
+        return anchor + timedelta(days=14 * step)
+    month = anchor.month - 1 + step
+    return anchor.replace(year=anchor.year + month // 12, month=month % 12 + 1, day=1)
+
+
+def title(span, rows):
+    first, last = rows[0][0], rows[-1][-1]
+    if span == "Month":
+        return rows[1][0].strftime("%B %Y")
+    if first.month == last.month:
+        return f"{first.strftime('%b')} {first.day} – {last.day}, {last.year}"
+    return f"{first.strftime('%b')} {first.day} – {last.strftime('%b')} {last.day}, {last.year}"
+
+
+def by_day(tasks):
+    """{due date string: [tasks]} keeping the query's order within each day"""
+    days = {}
+    for t in tasks:
+        days.setdefault(t.get("due_date"), []).append(t)
+    return days
@@ -0,0 +1,171 @@
+"""
+Change history for GTF Command Center
+Every published change is kept as the before / after task dicts it touched.
+Tasks are copy-on-write, so these are the very objects the snapshots held:
+history costs references, not copies, and field diffs are only worked out
+when someone looks.
+
+Each source (browser session, Zoya queue) has its own undo / redo stack.
+Undo turns an entry into reverse changes for task_store.apply_changes.
+"""
+
+import threading
+from collections import deque, namedtuple
+from datetime import datetime
+
+# tasks: {task_id: (before, after)}, None where the task did not / no longer exists
+# action: None for an ordinary edit, ("undo", version) or ("redo", version)
+Entry = namedtuple("Entry", ["version", "at", "source", "tasks", "action"])
+
+
+def field_changes(before, after):
+    """[(field, old, new)] between two versions of a task"""
+    before, after = before or {}, after or {}
+    return [(k, before.get(k), after.get(k)) for k in sorted(before.keys() | after.keys())
+            if k != "id" and before.get(k) != after.get(k)]
+
+
+def reverse_changes(tasks, get):
+    """Changes that take each task from `after` back to `before`.
+
+    get(task_id) returns the current task or None. Tasks edited again since
+    only have the fields reverted that still hold this entry's value.
+    """
+    changes = []
+    for tid, (before, after) in tasks.items():
+        current = get(tid)
+        if before is None:
+            if current is not None:
+                changes.append(("delete", tid, None))
+        elif after is None:
+            if current is None:
+                changes.append(("add", None, before))
+        elif current is None:
+            continue    # deleted since; nothing left to revert
+        elif current == after:
+            changes.append(("replace", tid, before))
+        else:
+            fields = {k: old for k, old, new in field_changes(before, after) if current.get(k) == new}
+            if fields:
+                changes.append(("update", tid, fields))
+    return changes
+
+
+def summarize(entry):
+    """One line for an undo / redo button"""
+    if len(entry.tasks) > 1:
+        return f"{len(entry.tasks)} tasks"
+    before, after = next(iter(entry.tasks.values()))
+    title = (after or before or {}).get("title", "task")[:40]
+    if before is None:
+        return f"Add '{title}'"
+    if after is None:
+        return f"Delete '{title}'"
+    return f"Edit '{title}' ({', '.join(k for k, _, _ in field_changes(before, after))})"
+
+
+# Sources that are not someone at a browser; their edits are never undone
+BACKGROUND_SOURCES = (None, "remote", "zoya-queue")
+
+
+class History:
+    """Recent entries (bounded), newest last, indexed by task, plus per-session undo / redo stacks"""
+
+    def __init__(self, maxlen=500, background=BACKGROUND_SOURCES):
+        self.maxlen = maxlen
+        self.background = frozenset(background)
+        self._entries = deque()
+        self._by_version = {}
+        self._by_task = {}  # task id -> deque of entries, oldest first
+        self._undo = {}     # source -> [entry versions]
+        self._redo = {}
+        self._lock = threading.Lock()
+
+    def record(self, version, source, old_tasks, new_tasks, changed, action=None):
+        """Add an entry for one published change; returns it, or None if nothing differed"""
+        before = {t["id"]: t for t in old_tasks if t["id"] in changed}
+        after = {t["id"]: t for t in new_tasks if t["id"] in changed}
+        tasks = {tid: (before.get(tid), after.get(tid)) for tid in changed
+                 if before.get(tid) is not after.get(tid)}
+        with self._lock:
+            if action:
+                self._move(source, *action)
+            if not tasks:
+                return None
+            entry = Entry(version, datetime.now(), source, tasks, action)
+            self._entries.append(entry)
+            self._by_version[version] = entry
+            for tid in tasks:
+                self._by_task.setdefault(tid, deque()).append(entry)
+            while len(self._entries) > self.maxlen:
+                self._evict(self._entries.popleft())
+            if source not in self.background and not action:
+                self._undo.setdefault(source, []).append(version)
+                self._redo.pop(source, None)
+        return entry
+
+    def _evict(self, entry):
+        """Forget the oldest entry everywhere, so stacks of closed sessions empty out too"""
+        del self._by_version[entry.version]
+        for tid in entry.tasks:
+            entries = self._by_task[tid]
+            entries.popleft()
+            if not entries:
+                del self._by_task[tid]
+        for stacks in (self._undo, self._redo):
+            stack = stacks.get(entry.source)
+            if stack and entry.version in stack:
+                stack.remove(entry.version)
+            if stack == []:
+                del stacks[entry.source]
+
+    def _move(self, source, kind, version):
+        src, dst = (self._undo, self._redo) if kind == "undo" else (self._redo, self._undo)
+        stack = src.get(source, [])
+        if version in stack:
+            stack.remove(version)
+            dst.setdefault(source, []).append(version)
+            if not stack:
+                del src[source]
+
+    def _top(self, stacks, source):
+        """Newest entry on a stack, dropping versions that have aged out"""
+        stack = stacks.get(source, [])
+        while stack and stack[-1] not in self._by_version:
+            stack.pop()
+        return self._by_version[stack[-1]] if stack else None
+
+    def _next(self, kind, source, get):
+        stacks = self._undo if kind == "undo" else self._redo
+        with self._lock:
+            while True:
+                entry = self._top(stacks, source)
+                if entry is None:
+                    return None, []
+                tasks = entry.tasks if kind == "undo" else {
+                    tid: (after, before) for tid, (before, after) in entry.tasks.items()}
+                changes = reverse_changes(tasks, get)
+                if changes:
+                    return entry.version, changes
+                # Already reverted by someone else - skip it
+                self._move(source, kind, entry.version)
+
+    def undo_changes(self, source, get):
+        """(entry version, changes) undoing the source's latest edit, or (None, [])"""
+        return self._next("undo", source, get)
+
+    def redo_changes(self, source, get):
+        """(entry version, changes) re-applying the source's latest undo, or (None, [])"""
+        return self._next("redo", source, get)
+
+    def label(self, source, kind):
+        """What the next undo / redo would do, or None if there is nothing"""
+        with self._lock:
+            entry = self._top(self._undo if kind == "undo" else self._redo, source)
+        return summarize(entry) if entry else None
+
+    def for_task(self, task_id, limit=10):
+        """[(entry, before, after)] touching this task, newest first"""
+        with self._lock:
+            entries = list(self._by_task.get(task_id, ()))[-limit:]
+        return [(entry, *entry.tasks[task_id]) for entry in reversed(entries)]
@@ -0,0 +1,119 @@
+"""
+Due-date bucket index for GTF Command Center
+Buckets keyed by date ordinal in a sorted list, so "overdue", "due today"
+and "due in the next N days" are bisect range queries. Day rollover only
+moves the today boundary; no task is re-classified.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from datetime import date
+
+
+def to_ordinal(value):
+    """Ordinal for a date or ISO date string, None if unparseable"""
+    if isinstance(value, date):
+        return value.toordinal()
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+class DueIndex:
+    """Multiset of keys bucketed by due ordinal.
+
+    Keys are whatever the caller tracks (task ids, list positions); a key
+    added n times counts n times, so a date->count map loads directly.
+    """
+
+    def __init__(self, today=None):
+        self._ords = []          # sorted distinct ordinals with a non-empty bucket
+        self._buckets = {}       # ordinal -> Counter of keys
+        self._totals = {}        # ordinal -> bucket size
+        self.today = None
+        self._t = None
+        self.set_today(today or date.today())
+
+    @classmethod
+    def from_counts(cls, counts, today=None):
+        """Build from a {"YYYY-MM-DD": n} map (see task_counters)"""
+        index = cls(today)
+        for due, n in counts.items():
+            index.add(None, due, n)
+        return index
+
+    def set_today(self, today):
+        """Move the today boundary; returns True if the day changed"""
+        changed = self.today is not None and today != self.today
+        self.today = today
+        self._t = today.toordinal()
+        return changed
+
+    def add(self, key, due_date, n=1):
+        o = to_ordinal(due_date)
+        if o is None:
+            return
+        bucket = self._buckets.get(o)
+        if bucket is None:
+            bucket = self._buckets[o] = Counter()
+            self._totals[o] = 0
+            insort(self._ords, o)
+        bucket[key] += n
+        self._totals[o] += n
+
+    def remove(self, key, due_date, n=1):
+        o = to_ordinal(due_date)
+        bucket = self._buckets.get(o)
+        if bucket is None or bucket[key] <= 0:
+            return
+        n = min(n, bucket[key])
+        bucket[key] -= n
+        if bucket[key] <= 0:
+            del bucket[key]
+        self._totals[o] -= n
+        if self._totals[o] <= 0:
+            del self._buckets[o]
+            del self._totals[o]
+            del self._ords[bisect_left(self._ords, o)]
+
+    def move(self, key, old_due, new_due):
+        self.remove(key, old_due)
+        self.add(key, new_due)
+
+    def _slice(self, lo, hi):
+        """Ordinals in [lo, hi]; None leaves that side open"""
+        i = bisect_left(self._ords, lo) if lo is not None else 0
+        j = bisect_right(self._ords, hi) if hi is not None else len(self._ords)
+        return self._ords[i:j]
+
+    def keys_between(self, lo, hi):
+        """Keys due in the inclusive ordinal range"""
+        result = set()
+        for o in self._slice(lo, hi):
+            result.update(self._buckets[o])
+        return result
+
+    def count_between(self, lo, hi):
+        return sum(self._totals[o] for o in self._slice(lo, hi))
+
+    # Today-relative windows
+
+    def overdue(self):
+        return self.keys_between(None, self._t - 1)
+
+    def due_today(self):
+        return self.keys_between(self._t, self._t)
+
+    def upcoming(self, days=7):
+        """Due after today, within the next `days` days"""
+        return self.keys_between(self._t + 1, self._t + days)
+
+    def overdue_count(self):
+        return self.count_between(None, self._t - 1)
+
+    def today_count(self):
+        return self.count_between(self._t, self._t)
+
+    def upcoming_count(self, days=7):
+        return self.count_between(self._t + 1, self._t + days)
@@ -0,0 +1,227 @@
+"""
+Sharded GitHub storage for GTF Command Center
+Instead of one ever-growing tasks.json written through the Contents API,
+tasks are split into shard files (by due month or by department) under a
+directory, optionally gzip-compressed, and described by a small manifest:
+
+    tasks/manifest.json       departments, labels, shard list
+    tasks/2026-10.json.gz     tasks due that month
+    tasks/undated.json.gz     tasks without a due date
+
+Saves go through the Git Data API: only shards whose bytes changed get a
+new blob, and all of them land in one commit, so readers never see half a
+save. The "sha" handed to the rest of the app is the branch head commit,
+but a save only conflicts when the manifest or a shard changed since that
+commit; unrelated pushes to the branch are simply built on top of.
+"""
+
+import base64
+import gzip
+import json
+import re
+import threading
+
+import requests
+
+from task_schema import blob_sha
+
+FORMAT_VERSION = 1
+SHARD_BY = ("month", "department")
+UNDATED = "undated"
+
+
+def shard_name(task, shard_by):
+    """Shard a task belongs to"""
+    if shard_by == "department":
+        return "dept-" + re.sub(r"[^a-z0-9_-]+", "-", str(task.get("department") or "quick").lower())
+    due = task.get("due_date")
+    return str(due)[:7] if due else UNDATED
+
+
+def split_document(data, shard_by="month"):
+    """(meta, {shard: [tasks]}) - meta is every top-level key except tasks"""
+    meta = {k: v for k, v in data.items() if k not in ("tasks", "counters")}
+    shards = {}
+    for t in data.get("tasks", []):
+        shards.setdefault(shard_name(t, shard_by), []).append(t)
+    return meta, shards
+
+
+def encode_shard(tasks, compress=True):
+    raw = json.dumps(tasks, separators=(",", ":"), default=str).encode("utf-8")
+    # mtime=0 keeps the bytes (and so the blob SHA) stable for equal content
+    return gzip.compress(raw, mtime=0) if compress else raw
+
+
+def decode_shard(content, path):
+    if path.endswith(".gz"):
+        content = gzip.decompress(content)
+    return json.loads(content)
+
+
+class GitHubShardStore:
+    """Load and save a sharded tasks document in one GitHub repo branch.
+
+    Remembers the blob SHA of every file under root as of the last head it
+    saw, so a save can tell locally which shards changed and a load can
+    reuse shards it has already decoded.
+    """
+
+    def __init__(self, repo, token, branch="main", root="tasks", shard_by="month", compress=True):
+        if shard_by not in SHARD_BY:
+            raise ValueError(f"shard_by must be one of {SHARD_BY}")
+        self.repo = repo
+        self.token = token
+        self.branch = branch
+        self.root = root.strip("/")
+        self.shard_by = shard_by
+        self.compress = compress
+        self.head = None
+        self._base_tree = None
+        self._files = {}        # path -> blob sha, as of self.head
+        self._decoded = {}      # blob sha -> decoded JSON
+        self._lock = threading.RLock()
+
+    @property
+    def manifest_path(self):
+        return f"{self.root}/manifest.json"
+
+    def _api(self, method, path, **kwargs):
+        url = f"https://api.github.com/repos/{self.repo}/{path}"
+        headers = {"Authorization": f"token {self.token}", "Accept": "application/vnd.github.v3+json"}
+        return requests.request(method, url, headers=headers, timeout=15, **kwargs)
+
+    def _get(self, path, **kwargs):
+        resp = self._api("GET", path, **kwargs)
+        resp.raise_for_status()
+        return resp.json()
+
+    def _list(self, commit):
+        """(tree sha, {path: blob sha} under root) at a commit"""
+        tree = self._get(f"git/commits/{commit}")["tree"]["sha"]
+        listing = self._get(f"git/trees/{tree}", params={"recursive": "1"})
+        prefix = self.root + "/"
+        return tree, {e["path"]: e["sha"] for e in listing.get("tree", [])
+                      if e["type"] == "blob" and e["path"].startswith(prefix)}
+
+    def _read_head(self):
+        head = self._get(f"git/ref/heads/{self.branch}")["object"]["sha"]
+        if head != self.head:
+            self._base_tree, self._files = self._list(head)
+            self.head = head
+        return head
+
+    def _decode(self, sha, path):
+        if sha not in self._decoded:
+            content = base64.b64decode(self._get(f"git/blobs/{sha}")["content"])
+            self._decoded[sha] = decode_shard(content, path)
+        return self._decoded[sha]
+
+    def _blob(self, path):
+        return self._decode(self._files[path], path)
+
+    def _managed(self, files):
+        """Manifest plus the shards it lists - the only paths a save may touch"""
+        if self.manifest_path not in files:
+            return set()
+        manifest = self._decode(files[self.manifest_path], self.manifest_path)
+        return {self.manifest_path, *(shard["path"] for shard in manifest["shards"])}
+
+    def _conflicts(self, base, current):
+        """True if a managed file differs between two {path: blob sha} listings"""
+        return any(base.get(p) != current.get(p) for p in self._managed(base) | self._managed(current))
+
+    def load(self):
+        """(data, head) - data is None if the branch has no manifest yet"""
+        with self._lock:
+            head = self._read_head()
+            if self.manifest_path not in self._files:
+                return None, head
+            manifest = self._blob(self.manifest_path)
+            tasks = []
+            for shard in manifest["shards"]:
+                tasks.extend(self._blob(shard["path"]))
+            # Forget decoded shards that are no longer part of the head
+            live = set(self._files.values())
+            self._decoded = {sha: doc for sha, doc in self._decoded.items() if sha in live}
+            return {**manifest["meta"], "tasks": tasks}, head
+
+    def _render(self, data):
+        """{path: bytes} for every file the document needs"""
+        meta, shards = split_document(data, self.shard_by)
+        ext = ".json.gz" if self.compress else ".json"
+        files = {}
+        entries = []
+        for name in sorted(shards):
+            path = f"{self.root}/{name}{ext}"
+            files[path] = encode_shard(shards[name], self.compress)
+            entries.append({"name": name, "path": path, "count": len(shards[name])})
+        manifest = {
+            "format": FORMAT_VERSION,
+            "shard_by": self.shard_by,
+            "compressed": self.compress,
+            "meta": meta,
+            "shards": entries,
+        }
+        files[self.manifest_path] = json.dumps(manifest, indent=2, default=str).encode("utf-8")
+        return files
+
+    def save(self, data, sha=None, message="Dashboard update"):
+        """Commit changed shards on top of head `sha`; returns (new head, error message).
+
+        If the branch moved past `sha` the save still goes through on the new
+        head, unless the manifest or a shard changed in between - then it
+        fails like the Contents API would.
+        """
+        with self._lock:
+            try:
+                if sha is None:
+                    sha = self._read_head()
+                if sha != self.head:
+                    self._read_head()
+                base = self._files if sha == self.head else self._list(sha)[1]
+                for _ in range(3):
+                    if self.head != sha and self._conflicts(base, self._files):
+                        return None, "Save failed: remote changed"
+                    result = self._commit(data, message)
+                    if result is not None:
+                        return result
+                    # Someone pushed between reading the head and moving it
+                    self._read_head()
+                return None, "Save failed: remote kept changing"
+            except Exception as e:
+                return None, f"Save error: {e}"
+
+    def _commit(self, data, message):
+        """Commit on top of self.head; (head, error), or None if the branch moved meanwhile"""
+        files = self._render(data)
+        changed = {p: b for p, b in files.items() if self._files.get(p) != blob_sha(b)}
+        # Only shards this store wrote; anything else under root is left alone
+        removed = [p for p in self._managed(self._files) if p not in files and p in self._files]
+        if not changed and not removed:
+            return self.head, None
+
+        tree = []
+        new_files = {p: s for p, s in self._files.items() if p not in removed}
+        for path, content in changed.items():
+            resp = self._api("POST", "git/blobs", json={
+                "content": base64.b64encode(content).decode("ascii"), "encoding": "base64"})
+            resp.raise_for_status()
+            new_files[path] = resp.json()["sha"]
+            self._decoded[new_files[path]] = decode_shard(content, path)
+            tree.append({"path": path, "mode": "100644", "type": "blob", "sha": new_files[path]})
+        tree.extend({"path": p, "mode": "100644", "type": "blob", "sha": None} for p in removed)
+
+        resp = self._api("POST", "git/trees", json={"base_tree": self._base_tree, "tree": tree})
+        resp.raise_for_status()
+        new_tree = resp.json()["sha"]
+        resp = self._api("POST", "git/commits", json={"message": message, "tree": new_tree, "parents": [self.head]})
+        resp.raise_for_status()
+        commit = resp.json()["sha"]
+        resp = self._api("PATCH", f"git/refs/heads/{self.branch}", json={"sha": commit, "force": False})
+        if resp.status_code == 422:
+            return None     # not a fast-forward any more
+        if resp.status_code != 200:
+            return None, f"Save failed: {resp.status_code}"
+        self.head, self._base_tree, self._files = commit, new_tree, new_files
+        return commit, None
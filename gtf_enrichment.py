@@ -0,0 +1,203 @@
+"""
+GTF attribute enrichment for GTF Command Center
+Fills the blank GTF Attribute Schema v2 columns of converter output. Parent
+products go to an extractor in batches on a small worker pool, and results
+are cached on disk per product key ("title|color") and extractor version,
+so re-running a catalog only sends new products.
+
+An extractor is any object with `name`, `version` and
+extract_batch(products) -> [{gtf column: value}], one dict per product.
+RuleExtractor, the default, parses keywords and colours out of titles and
+descriptions and needs nothing but this file.
+"""
+
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+CACHE_FILE = Path(__file__).parent / ".cache" / "gtf_attributes.json"
+
+TAGS = re.compile(r"<[^>]+>")
+
+# (column, [(value, keywords)]) - first match wins, so specific terms go first
+RULES = [
+    ("gtf_silhouette", [
+        ("mermaid", ["mermaid", "fishtail"]), ("ballgown", ["ballgown", "ball gown"]),
+        ("wrap", ["wrap"]), ("bodycon", ["bodycon"]), ("fit and flare", ["fit and flare", "skater"]),
+        ("a-line", ["a-line", "a line"]), ("empire", ["empire"]), ("slip", ["slip"]),
+        ("shift", ["shift"]), ("sheath", ["sheath", "pencil"]), ("peplum", ["peplum"]),
+        ("kaftan", ["kaftan", "caftan"]), ("tiered", ["tiered"]), ("shirt dress", ["shirt dress", "shirtdress"]),
+    ]),
+    ("gtf_neckline", [
+        ("off-shoulder", ["off shoulder", "off-shoulder", "off the shoulder", "bardot"]),
+        ("one-shoulder", ["one shoulder", "one-shoulder", "asymmetric"]),
+        ("sweetheart", ["sweetheart"]), ("halter", ["halter"]), ("plunge", ["plunge", "plunging"]),
+        ("v-neck", ["v-neck", "v neck", "vneck"]), ("square", ["square neck", "square-neck"]),
+        ("cowl", ["cowl"]), ("boat", ["boat neck", "bateau"]), ("high neck", ["high neck", "turtleneck", "mock neck"]),
+        ("scoop", ["scoop"]), ("crew", ["crew neck", "round neck"]), ("strapless", ["strapless", "bandeau", "tube"]),
+    ]),
+    ("gtf_sleeve_length", [
+        ("sleeveless", ["sleeveless", "strapless", "spaghetti", "strappy", "halter", "cami", "tank"]),
+        ("cap", ["cap sleeve"]), ("puff", ["puff sleeve", "puffed"]), ("bell", ["bell sleeve", "flared sleeve"]),
+        ("short", ["short sleeve", "short-sleeve"]), ("three-quarter", ["3/4", "three quarter", "elbow"]),
+        ("long", ["long sleeve", "long-sleeve", "full sleeve"]),
+    ]),
+    ("gtf_pattern", [
+        ("sequin", ["sequin", "sequined", "sparkle", "glitter"]), ("floral", ["floral", "flower", "botanical"]),
+        ("striped", ["stripe", "striped", "pinstripe"]), ("polka dot", ["polka", "dotted"]),
+        ("animal", ["leopard", "zebra", "snake", "animal print"]), ("check", ["check", "plaid", "gingham", "tartan"]),
+        ("embroidered", ["embroidered", "embroidery"]), ("lace", ["lace"]), ("tie-dye", ["tie dye", "tie-dye"]),
+        ("printed", ["print", "printed"]), ("solid", ["solid", "plain"]),
+    ]),
+    ("gtf_length", [
+        ("maxi", ["maxi", "floor length", "floor-length", "gown"]), ("midi", ["midi", "tea length"]),
+        ("knee", ["knee length", "knee-length"]), ("mini", ["mini", "short dress"]),
+    ]),
+]
+
+# Soft attributes from what the hard ones and fabric words suggest
+VIBES = [
+    ("glam", ["sequin", "satin", "velvet", "metallic", "gown", "silk"]),
+    ("romantic", ["floral", "lace", "ruffle", "sweetheart", "puff", "bow"]),
+    ("boho", ["kaftan", "crochet", "tiered", "tassel", "embroidered", "linen"]),
+    ("edgy", ["leather", "cut out", "cutout", "asymmetric", "animal", "mesh"]),
+    ("minimal", ["solid", "shift", "slip", "sheath", "plain"]),
+]
+OCCASIONS = [
+    ("wedding guest", ["wedding", "bridal", "bridesmaid", "sweetheart", "lace"]),
+    ("evening", ["sequin", "gown", "satin", "velvet", "cocktail", "mermaid"]),
+    ("vacation", ["linen", "kaftan", "beach", "resort", "floral", "crochet"]),
+    ("work", ["shirt dress", "sheath", "blazer", "pencil", "tailored"]),
+    ("everyday", ["cotton", "jersey", "t-shirt", "denim", "casual"]),
+]
+COLOURS = [
+    "black", "white", "ivory", "cream", "beige", "nude", "brown", "tan", "grey", "gray", "silver",
+    "gold", "red", "burgundy", "wine", "maroon", "pink", "blush", "rose", "fuchsia", "coral",
+    "orange", "rust", "yellow", "mustard", "green", "olive", "sage", "emerald", "mint", "teal",
+    "turquoise", "blue", "navy", "cobalt", "sky", "lilac", "lavender", "purple", "plum",
+]
+HARD_COLUMNS = [column for column, _ in RULES]
+
+
+def _pattern(words):
+    # Plurals count too: "puff sleeves", "ruffles"
+    return re.compile(r"\b(?:" + "|".join(re.escape(w) for w in words) + r")s?\b")
+
+
+COMPILED_RULES = [(column, [(value, _pattern(words)) for value, words in choices]) for column, choices in RULES]
+COMPILED_VIBES = [(value, _pattern(words)) for value, words in VIBES]
+COMPILED_OCCASIONS = [(value, _pattern(words)) for value, words in OCCASIONS]
+COLOUR_WORDS = _pattern(COLOURS)
+
+
+class RuleExtractor:
+    """Keyword and colour parsing of title, description and category"""
+
+    name = "rules"
+    version = "1"
+
+    def extract_batch(self, products):
+        return [self.extract(p) for p in products]
+
+    def extract(self, product):
+        text = " ".join([product.get("title", ""), product.get("category", ""),
+                         TAGS.sub(" ", product.get("description", ""))]).lower()
+        fields = {}
+        for column, choices in COMPILED_RULES:
+            value = next((v for v, pattern in choices if pattern.search(text)), None)
+            if value:
+                fields[column] = value
+        hints = " ".join([text, *fields.values()])
+        vibes = [v for v, pattern in COMPILED_VIBES if pattern.search(hints)]
+        occasions = [v for v, pattern in COMPILED_OCCASIONS if pattern.search(hints)]
+        if vibes:
+            fields["gtf_vibe"] = vibes[0]
+            fields["gtf_overall_aesthetic"] = ", ".join(vibes[:2])
+        if occasions:
+            fields["gtf_occasion"] = ", ".join(occasions[:2])
+            fields["gtf_event_suitability"] = ", ".join(occasions)
+
+        primary = (product.get("color") or "").lower()
+        others = [c for c in dict.fromkeys(COLOUR_WORDS.findall(text)) if c not in primary]
+        if others:
+            fields["gtf_secondary_color"] = others[0]
+            fields["gtf_color_palette"] = ", ".join([primary, *others] if primary else others)
+
+        matched = [fields[c] for c in HARD_COLUMNS if c in fields]
+        if matched:
+            fields["gtf_key_attributes_to_match"] = ", ".join(matched)
+        # Text rules can't see a face
+        fields["gtf_celebrity_detected"] = "FALSE"
+        fields["gtf_confidence"] = f"{len(matched) / len(HARD_COLUMNS):.2f}"
+        return fields
+
+
+class AttributeCache:
+    """{"name:version": {product key: fields}} in one JSON file"""
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = Path(path)
+        try:
+            self._entries = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self._entries = {}
+        self._dirty = False
+
+    def bucket(self, extractor):
+        return self._entries.setdefault(f"{extractor.name}:{extractor.version}", {})
+
+    def put(self, extractor, key, fields):
+        self.bucket(extractor)[key] = fields
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(self._entries))
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except OSError:
+            pass
+
+
+def _product(key, row):
+    title, _, color = key.partition("|")
+    return {"key": key, "title": title, "color": color, "category": row.get("Type", ""),
+            "description": row.get("Description", ""), "image_url": row.get("Product image URL", "")}
+
+
+def enrich(products, extractor=None, batch_size=25, workers=4, cache=None):
+    """Fill blank gtf_* columns of parent rows in place.
+
+    products is convert()'s {product key: parent row}. Values the converter
+    already set are kept. Returns (products sent to the extractor, products
+    served from cache).
+    """
+    extractor = extractor or RuleExtractor()
+    cache = cache if cache is not None else AttributeCache()
+    known = cache.bucket(extractor)
+    todo = [key for key in products if key not in known]
+    batches = [todo[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+
+    def run(batch):
+        return batch, extractor.extract_batch([_product(k, products[k]) for k in batch])
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch, results in pool.map(run, batches):
+            for key, fields in zip(batch, results):
+                cache.put(extractor, key, fields)
+    cache.save()
+
+    for key, row in products.items():
+        fields = known.get(key, {})
+        for column, value in fields.items():
+            if not row.get(column):
+                row[column] = value
+        if fields:
+            row["gtf_extraction_mode"] = extractor.name
+    return len(todo), len(products) - len(todo)
@@ -0,0 +1,175 @@
+"""
+Image link checks for GTF Command Center
+Optional pass over converter output: Google Drive share links are turned
+into direct-download links, every image URL is fetched concurrently
+(asyncio, bounded) and results plus small thumbnails are cached on disk by
+URL, so re-converting the same supplier sheet only fetches new links.
+
+The fetcher is pluggable: any async callable url -> (status, content_type,
+body) works, e.g. one pointed at a local stand-in server.
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import os
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+CACHE_DIR = Path(__file__).parent / ".cache" / "image_links"
+CACHE_SECONDS = 7 * 24 * 3600       # a good link is trusted for a week
+FAILED_CACHE_SECONDS = 3600         # a broken one is retried after an hour
+MAX_BYTES = 8 * 1024 * 1024
+THUMB_SIZE = (160, 160)
+# Threads are only started as fetches need them; check_links' semaphore is the real limit
+FETCH_POOL = ThreadPoolExecutor(max_workers=32, thread_name_prefix="image-links")
+
+DRIVE_ID = re.compile(r"drive\.google\.com/(?:file/d/|open\?id=|uc\?(?:.*&)?id=)([\w-]{10,})")
+DRIVE_DOWNLOAD = "https://drive.google.com/uc?export=download&id={}"
+
+LinkCheck = namedtuple("LinkCheck", ["url", "ok", "status", "content_type", "error", "thumbnail"])
+
+
+def direct_link(url):
+    """Direct-download form of a Google Drive share link; other URLs unchanged"""
+    m = DRIVE_ID.search(url or "")
+    return DRIVE_DOWNLOAD.format(m.group(1)) if m else url
+
+
+async def fetch_with_requests(url, timeout=10):
+    """Default fetcher: requests in a worker thread; reads at most MAX_BYTES"""
+    def get():
+        with requests.get(url, timeout=timeout, stream=True, allow_redirects=True) as resp:
+            body = resp.raw.read(MAX_BYTES + 1, decode_content=True) if resp.ok else b""
+            return resp.status_code, resp.headers.get("Content-Type", ""), body
+    # Own pool: the default executor can be smaller than the concurrency asked for
+    return await asyncio.get_running_loop().run_in_executor(FETCH_POOL, get)
+
+
+def _key(url):
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+def _make_thumbnail(body, path):
+    """Save a small JPEG; Pillow is optional, so no thumbnail without it"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        img = Image.open(io.BytesIO(body))
+        img.thumbnail(THUMB_SIZE)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        img.convert("RGB").save(path, "JPEG", quality=80)
+        return str(path)
+    except Exception:
+        return None
+
+
+class LinkCache:
+    """{url: check result} in CACHE_DIR/links.json, thumbnails beside it"""
+
+    def __init__(self, directory=CACHE_DIR):
+        self.dir = Path(directory)
+        self.path = self.dir / "links.json"
+        try:
+            self._entries = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self._entries = {}
+        self._dirty = False
+
+    def get(self, url, now):
+        entry = self._entries.get(url)
+        if not entry:
+            return None
+        max_age = CACHE_SECONDS if entry["ok"] else FAILED_CACHE_SECONDS
+        if now - entry["checked_at"] > max_age:
+            return None
+        if entry.get("thumbnail") and not os.path.exists(entry["thumbnail"]):
+            return None
+        return LinkCheck(url, entry["ok"], entry["status"], entry["content_type"],
+                         entry["error"], entry.get("thumbnail"))
+
+    def put(self, check, now):
+        self._entries[check.url] = {**check._asdict(), "checked_at": now}
+        self._dirty = True
+
+    def thumbnail_path(self, url):
+        return self.dir / "thumbs" / f"{_key(url)}.jpg"
+
+    def save(self):
+        if not self._dirty:
+            return
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(self._entries))
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except OSError:
+            pass
+
+
+async def _check(url, fetch, cache, limit, timeout):
+    async with limit:
+        try:
+            status, content_type, body = await asyncio.wait_for(fetch(url), timeout)
+        except Exception as e:
+            return LinkCheck(url, False, None, "", f"unreachable: {e.__class__.__name__}", None)
+    if status != 200:
+        return LinkCheck(url, False, status, content_type, f"HTTP {status}", None)
+    if not content_type.startswith("image/"):
+        # Drive answers private or oversized files with an HTML page
+        return LinkCheck(url, False, status, content_type,
+                         f"not an image ({content_type or 'unknown type'}) - is it shared publicly?", None)
+    thumb = _make_thumbnail(body, cache.thumbnail_path(url)) if len(body) <= MAX_BYTES else None
+    return LinkCheck(url, True, status, content_type, None, thumb)
+
+
+async def check_links(urls, fetch=None, concurrency=8, timeout=15, cache=None):
+    """{url: LinkCheck} for the distinct non-empty URLs, cached ones not refetched"""
+    fetch = fetch or fetch_with_requests
+    cache = cache if cache is not None else LinkCache()
+    now = time.time()
+    results = {}
+    todo = []
+    for url in dict.fromkeys(u for u in urls if u):
+        cached = cache.get(url, now)
+        if cached:
+            results[url] = cached
+        else:
+            todo.append(url)
+    limit = asyncio.Semaphore(concurrency)
+    for check in await asyncio.gather(*(_check(u, fetch, cache, limit, timeout) for u in todo)):
+        results[check.url] = check
+        cache.put(check, now)
+    cache.save()
+    return results
+
+
+def validate_rows(shopify_rows, fetch=None, concurrency=8, cache=None):
+    """Normalize and check image links in converter output, in place.
+
+    "Product image URL" gets the direct link; gtf_google_drive_link keeps
+    the share link people open. Returns [(row number, SKU, url, error)]
+    for broken links and {url: LinkCheck} for all of them.
+    """
+    for row in shopify_rows:
+        if row.get("Product image URL"):
+            row["Product image URL"] = direct_link(row["Product image URL"])
+    urls = [row["Product image URL"] for row in shopify_rows if row.get("Product image URL")]
+    checks = asyncio.run(check_links(urls, fetch=fetch, concurrency=concurrency, cache=cache))
+    broken = []
+    for n, row in enumerate(shopify_rows, start=2):     # row 1 is the CSV header
+        check = checks.get(row.get("Product image URL"))
+        if check and not check.ok:
+            broken.append((n, row["SKU"], row["Product image URL"], check.error))
+            notes = [row.get("gtf_extraction_notes"), f"image link: {check.error}"]
+            row["gtf_extraction_notes"] = "; ".join(part for part in notes if part)
+    return broken, checks
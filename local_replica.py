@@ -0,0 +1,233 @@
+"""
+Offline-first local replica for GTF Command Center
+With GitHub storage configured, tasks are read from a replica on local disk
+and every commit lands there first, with the touched tasks appended to a
+pending journal. SyncLoop pulls the remote document in the background,
+lays the pending tasks over it by id, pushes the result and publishes it,
+so GitHub being slow or down never blocks the UI or forks the data.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from shared_store import diff_task_ids
+from task_counters import build_counters
+from task_schema import load_document
+
+REPLICA_FILE = "replica.json"
+JOURNAL_FILE = "pending.jsonl"
+MAX_BACKOFF = 300
+
+
+def merge_pending(doc, entries):
+    """doc with the journal's tasks laid over it by id (None deletes).
+
+    Later entries win; tasks the remote no longer has are re-added unless
+    the journal deleted them.
+    """
+    overrides = {}
+    for entry in entries:
+        overrides.update(entry["tasks"])
+    if not overrides:
+        return doc
+    tasks = []
+    placed = set()
+    for t in doc.get("tasks", []):
+        if t["id"] not in overrides:
+            tasks.append(t)
+        elif t["id"] not in placed:
+            placed.add(t["id"])
+            if overrides[t["id"]] is not None:
+                tasks.append(overrides[t["id"]])
+    tasks.extend(t for tid, t in overrides.items() if tid not in placed and t is not None)
+    merged = {**doc, "tasks": tasks}
+    merged["counters"] = build_counters(tasks)
+    return merged
+
+
+def _write_atomic(path, text):
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+class LocalReplica:
+    """The last known document plus the journal of commits not yet pushed"""
+
+    def __init__(self, directory):
+        self.dir = Path(directory)
+        self.replica_path = self.dir / REPLICA_FILE
+        self.journal_path = self.dir / JOURNAL_FILE
+        self.sha = None
+        self.issues = []
+        self._lock = threading.Lock()
+        self._entries = self._read_journal()
+        self._seq = self._entries[-1]["seq"] if self._entries else 0
+
+    def _read_journal(self):
+        entries = []
+        try:
+            with open(self.journal_path) as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        break   # torn final line from a crash mid-append
+        except OSError:
+            pass
+        return entries
+
+    def load(self):
+        """(document with pending changes applied, remote sha) or (None, None).
+
+        Goes through task_schema's pickle cache, keyed by the replica file's
+        hash, so a warm start skips parsing and normalization; the journal
+        is laid over afterwards. Normalization messages end up in issues.
+        """
+        try:
+            saved, self.issues = load_document(self.replica_path.read_bytes(), field="document")
+        except (OSError, ValueError, KeyError, TypeError):
+            return None, None
+        self.sha = saved.get("sha")
+        return merge_pending(saved["document"], self.pending()), self.sha
+
+    def save(self, doc, sha=None):
+        """Overwrite the replica; sha=None keeps the remote sha it is based on.
+
+        Returns an error message or None.
+        """
+        if sha is not None:
+            self.sha = sha
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            _write_atomic(self.replica_path, json.dumps({"sha": self.sha, "document": doc}, default=str))
+            return None
+        except OSError as e:
+            return f"Local save failed: {e}"
+
+    def record(self, old_doc, doc):
+        """Journal the tasks that differ from old_doc, then save the replica"""
+        old_tasks = old_doc.get("tasks", []) if old_doc else []
+        changed = diff_task_ids(old_tasks, doc.get("tasks", []))
+        if changed:
+            by_id = {t["id"]: t for t in doc.get("tasks", []) if t["id"] in changed}
+            with self._lock:
+                self._seq += 1
+                entry = {"seq": self._seq, "at": datetime.now().isoformat(),
+                         "tasks": {tid: by_id.get(tid) for tid in changed}}
+                try:
+                    self.dir.mkdir(parents=True, exist_ok=True)
+                    with open(self.journal_path, "a") as f:
+                        f.write(json.dumps(entry, default=str) + "\n")
+                except OSError as e:
+                    self._seq -= 1
+                    return f"Local save failed: {e}"
+                self._entries.append(entry)
+        return self.save(doc)
+
+    def pending(self, after=0):
+        """Journal entries with seq > after, oldest first"""
+        with self._lock:
+            return [e for e in self._entries if e["seq"] > after]
+
+    def pending_count(self):
+        """Distinct tasks waiting to be pushed"""
+        return len({tid for e in self.pending() for tid in e["tasks"]})
+
+    def acknowledge(self, seq):
+        """Drop journal entries up to seq once they are on the remote"""
+        with self._lock:
+            self._entries = [e for e in self._entries if e["seq"] > seq]
+            text = "".join(json.dumps(e, default=str) + "\n" for e in self._entries)
+            try:
+                _write_atomic(self.journal_path, text)
+            except OSError:
+                pass    # replayed next time; merging the same tasks again is harmless
+
+
+class SyncLoop:
+    """Background push/pull between the replica and the remote.
+
+    pull() returns (data, sha) or (None, None); push(data, sha, message)
+    returns (new_sha, error). Runs every `interval` seconds, sooner after
+    wake(), and backs off while the remote is unreachable.
+    """
+
+    def __init__(self, snapshot, replica, pull, push, interval=30):
+        self.snapshot = snapshot
+        self.replica = replica
+        self.pull = pull
+        self.push = push
+        self.interval = interval
+        self.online = None          # unknown until the first attempt
+        self.last_sync = None
+        self.last_error = None
+        self._failures = 0
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="gtf-sync", daemon=True)
+            self._thread.start()
+        return self
+
+    def wake(self):
+        """Sync soon - called after a local commit"""
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.sync_once()
+                self.online, self.last_error, self._failures = True, None, 0
+                self.last_sync = time.time()
+            except Exception as e:
+                self.online, self.last_error = False, str(e)
+                self._failures += 1
+                # Unreachable: commits still pile up in the journal, retried after the backoff
+                time.sleep(min(self.interval * 2 ** (self._failures - 1), MAX_BACKOFF))
+                continue
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def sync_once(self):
+        """One pull, merge, push, publish round; raises when the remote is unreachable"""
+        remote, sha = self.pull()
+        if remote is None:
+            raise ConnectionError("GitHub unreachable")
+        entries = self.replica.pending()
+        upto = entries[-1]["seq"] if entries else 0
+        if not entries and sha == self.snapshot.sha:
+            return
+        self.snapshot.repair_ids(remote)
+        merged = merge_pending(remote, entries)
+        if entries:
+            sha, error = self.push(merged, sha, f"Sync {self.replica.pending_count()} offline change(s)")
+            if error:
+                raise ConnectionError(error)
+
+        def rebuild(current):
+            # Commits made while we were talking to GitHub stay pending on top
+            doc = merge_pending(merged, self.replica.pending(upto))
+            self.replica.save(doc, sha)
+            return doc
+
+        self.snapshot.adopt_remote(rebuild, sha)
+        if upto:
+            self.replica.acknowledge(upto)
+
+    def status(self):
+        """Short sidebar text"""
+        pending = self.replica.pending_count()
+        if self.online is False:
+            return f"📴 Offline - {pending} change(s) waiting" if pending else "📴 Offline - showing local copy"
+        if pending:
+            return f"⏳ Syncing {pending} change(s)"
+        if self.last_sync:
+            return f"☁️ Synced {datetime.fromtimestamp(self.last_sync):%H:%M}"
+        return "☁️ Connecting..."
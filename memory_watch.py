@@ -0,0 +1,116 @@
+"""
+Memory instrumentation for GTF Command Center
+The server runs for days, so growth matters more than any one number.
+MemoryMonitor (one per process, opt-in because tracemalloc slows every
+allocation) samples traced memory over time, lists the top allocation
+sites and the ones that grew most since the first sample, and keeps the
+latest session_state size reported by each browser session.
+"""
+
+import gc
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque, namedtuple
+
+Sample = namedtuple("Sample", ["at", "current", "peak"])
+SessionSize = namedtuple("SessionSize", ["at", "keys", "task_keys", "bytes"])
+
+# Frames that only describe the profiler or the import system
+IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>",
+                 "<unknown>")
+SESSION_TTL = 24 * 3600
+
+
+def deep_size(obj, seen=None, depth=6):
+    """Rough bytes reachable from obj: containers and their contents, not code or modules"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen or depth < 0 or isinstance(obj, (type, type(sys), type(deep_size))):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj, 0)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen, depth - 1) + deep_size(v, seen, depth - 1) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_size(v, seen, depth - 1) for v in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_size(vars(obj), seen, depth - 1)
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_size(getattr(obj, s), seen, depth - 1) for s in obj.__slots__ if hasattr(obj, s))
+    return size
+
+
+def state_size(state, task_prefixes=()):
+    """(total bytes, task widget key count, [(key, bytes)] largest first) for a session_state"""
+    seen = set()
+    sizes = []
+    task_keys = 0
+    for key in list(state.keys()):
+        try:
+            sizes.append((key, deep_size(state[key], seen)))
+        except KeyError:
+            continue    # removed by a concurrent rerun
+        if key.startswith(task_prefixes):
+            task_keys += 1
+    sizes.sort(key=lambda kv: kv[1], reverse=True)
+    return sum(s for _, s in sizes), task_keys, sizes
+
+
+class MemoryMonitor:
+    """tracemalloc samples and per-session state sizes for one process"""
+
+    def __init__(self, frames=1, interval=60, history=720):
+        self.interval = interval
+        self.samples = deque(maxlen=history)     # 12 hours at one sample a minute
+        self.sessions = {}                       # session id -> SessionSize
+        self.pruned = 0
+        self._baseline = None
+        self._last = 0.0
+        self._lock = threading.Lock()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, f) for f in IGNORED_FILES])
+
+    def sample(self, force=False):
+        """Record traced memory at most once per interval"""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last < self.interval:
+                return
+            self._last = now
+            current, peak = tracemalloc.get_traced_memory()
+            self.samples.append(Sample(now, current, peak))
+            if self._baseline is None:
+                self._baseline = self._snapshot()
+
+    def top_sites(self, limit=10):
+        """[(file:line, KiB, blocks)] holding the most memory right now"""
+        stats = self._snapshot().statistics("lineno")[:limit]
+        return [(f"{s.traceback[0].filename}:{s.traceback[0].lineno}", s.size / 1024, s.count) for s in stats]
+
+    def growth(self, limit=10):
+        """[(file:line, KiB grown, blocks grown)] since profiling started - leak candidates"""
+        if self._baseline is None:
+            return []
+        diff = self._snapshot().compare_to(self._baseline, "lineno")
+        diff = [d for d in diff if d.size_diff > 0][:limit]
+        return [(f"{d.traceback[0].filename}:{d.traceback[0].lineno}", d.size_diff / 1024, d.count_diff)
+                for d in diff]
+
+    def record_session(self, session_id, keys, task_keys, size):
+        now = time.time()
+        with self._lock:
+            self.sessions[session_id] = SessionSize(now, keys, task_keys, size)
+            # Closed tabs stop reporting; forget them after a day
+            for sid in [s for s, v in self.sessions.items() if now - v.at > SESSION_TTL]:
+                del self.sessions[sid]
+
+    def collect(self):
+        """Run the garbage collector and sample straight away; returns objects collected"""
+        found = gc.collect()
+        self.sample(force=True)
+        return found
@@ -0,0 +1,250 @@
+"""
+Recurring tasks for GTF Command Center
+A series is one task with a "recurrence" rule; its due_date is the first
+occurrence. Occurrences are never stored - they are expanded on demand for
+the window being shown. Per-occurrence state (done, moved, edited, skipped)
+lives sparsely in the series' "exceptions" map, keyed by occurrence date.
+
+Occurrences carry the id "<series id>@<YYYY-MM-DD>", and task_store turns
+changes to such ids into exception updates on the series.
+"""
+
+import calendar
+from datetime import date, timedelta
+
+OCCURRENCE_SEP = "@"
+FREQUENCIES = ("daily", "weekly", "monthly")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+# Choices offered when creating a task
+REPEAT_PRESETS = {
+    "daily": {"freq": "daily"},
+    "weekdays": {"freq": "weekly", "byweekday": [0, 1, 2, 3, 4]},
+    "weekly": {"freq": "weekly"},
+    "monthly": {"freq": "monthly"},
+}
+
+# Fields of a series that occurrences do not inherit
+SERIES_ONLY = ("recurrence", "exceptions")
+
+
+def _to_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def parse_rule(rule):
+    """Normalized rule dict from a rule dict or an RRULE subset string.
+
+    Supported: FREQ (DAILY/WEEKLY/MONTHLY), INTERVAL, BYDAY (weekly),
+    BYMONTHDAY (monthly), UNTIL, COUNT. Raises ValueError otherwise.
+    """
+    if isinstance(rule, str):
+        parts = {}
+        for item in rule.upper().removeprefix("RRULE:").split(";"):
+            if item:
+                key, _, value = item.partition("=")
+                parts[key] = value
+        rule = {"freq": parts.get("FREQ", "").lower()}
+        if "INTERVAL" in parts:
+            rule["interval"] = int(parts["INTERVAL"])
+        if "BYDAY" in parts:
+            rule["byweekday"] = [WEEKDAYS.index(d[-2:]) for d in parts["BYDAY"].split(",")]
+        if "BYMONTHDAY" in parts:
+            rule["bymonthday"] = int(parts["BYMONTHDAY"])
+        if "UNTIL" in parts:
+            u = parts["UNTIL"][:8]
+            rule["until"] = f"{u[:4]}-{u[4:6]}-{u[6:8]}"
+        if "COUNT" in parts:
+            rule["count"] = int(parts["COUNT"])
+    if not isinstance(rule, dict) or rule.get("freq") not in FREQUENCIES:
+        raise ValueError(f"unsupported recurrence {rule!r}")
+
+    parsed = {"freq": rule["freq"], "interval": max(1, int(rule.get("interval", 1)))}
+    if rule.get("byweekday"):
+        days = sorted({int(d) for d in rule["byweekday"]})
+        if any(d < 0 or d > 6 for d in days):
+            raise ValueError(f"bad weekday in {rule!r}")
+        parsed["byweekday"] = days
+    if rule.get("bymonthday"):
+        parsed["bymonthday"] = int(rule["bymonthday"])
+    if rule.get("until"):
+        parsed["until"] = _to_date(rule["until"]).isoformat()
+    if rule.get("count"):
+        parsed["count"] = int(rule["count"])
+    return parsed
+
+
+def _month_day(year, month, day):
+    return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+def _periods(rule, start, first):
+    """Candidate dates period by period, from period index `first`"""
+    step = rule["interval"]
+    p = first
+    if rule["freq"] == "daily":
+        while True:
+            yield start + timedelta(days=p)
+            p += step
+    elif rule["freq"] == "weekly":
+        week0 = start - timedelta(days=start.weekday())
+        days = rule.get("byweekday") or [start.weekday()]
+        while True:
+            for wd in days:
+                yield week0 + timedelta(days=7 * p + wd)
+            p += step
+    else:
+        day = rule.get("bymonthday") or start.day
+        while True:
+            y, m = divmod(start.month - 1 + p, 12)
+            yield _month_day(start.year + y, m + 1, day)
+            p += step
+
+
+def _first_period(rule, start, lo):
+    """Period index to start scanning from so the first yield is not after lo"""
+    if rule.get("count") or lo <= start:
+        return 0        # COUNT needs numbering from the series start
+    step = rule["interval"]
+    if rule["freq"] == "daily":
+        n = (lo - start).days
+    elif rule["freq"] == "weekly":
+        n = (lo - (start - timedelta(days=start.weekday()))).days // 7
+    else:
+        n = (lo.year - start.year) * 12 + lo.month - start.month
+    return max(0, (n // step - 1) * step)
+
+
+def occurrence_dates(rule, start, lo):
+    """Occurrence dates on or after lo, in order (unbounded unless UNTIL/COUNT)"""
+    until = _to_date(rule["until"]) if rule.get("until") else None
+    count = rule.get("count")
+    n = 0
+    for d in _periods(rule, start, _first_period(rule, start, lo)):
+        if d < start:
+            continue
+        n += 1
+        if (count and n > count) or (until and d > until):
+            return
+        if d >= lo:
+            yield d
+
+
+def is_occurrence(rule, start, d):
+    return next(occurrence_dates(rule, start, d), None) == d
+
+
+def occurrence_id(series_id, occurrence_date):
+    return f"{series_id}{OCCURRENCE_SEP}{occurrence_date}"
+
+
+def split_occurrence_id(task_id):
+    """(series id, occurrence date) - the date is None for an ordinary task id"""
+    series_id, sep, occurrence_date = str(task_id).rpartition(OCCURRENCE_SEP)
+    return (series_id, occurrence_date) if sep else (task_id, None)
+
+
+def is_series(task):
+    return bool(task.get("recurrence"))
+
+
+def make_occurrence(series, occurrence_date, exception=None):
+    """The virtual task for one occurrence"""
+    occ = {k: v for k, v in series.items() if k not in SERIES_ONLY}
+    occ.update(
+        id=occurrence_id(series["id"], occurrence_date),
+        series_id=series["id"],
+        occurrence_date=occurrence_date,
+        due_date=occurrence_date,
+        done=False,
+    )
+    occ.pop("completed_date", None)
+    if exception:
+        occ.update(exception)
+    return occ
+
+
+def pending_since(series):
+    """Date of the earliest occurrence still to do, or None if none is left.
+
+    The watermark only moves past occurrences done (or skipped) in an
+    unbroken run from the series start, so ticking off today's occurrence
+    never hides an older one that is still open.
+    """
+    rule = parse_rule(series["recurrence"])
+    start = _to_date(series["due_date"])
+    exceptions = series.get("exceptions") or {}
+    for d in occurrence_dates(rule, start, start):
+        exc = exceptions.get(d.isoformat())
+        if not (exc and (exc.get("done") or exc.get("deleted"))):
+            return d
+    return None
+
+
+def expand(series, lo, hi=None):
+    """Occurrences of a series whose (possibly moved) due date is in [lo, hi].
+
+    With hi=None only the next pending occurrence on or after lo is returned.
+    """
+    if series.get("done") or not series.get("due_date"):
+        return []
+    rule = parse_rule(series["recurrence"])
+    start = _to_date(series["due_date"])
+    lo, hi = _to_date(lo), _to_date(hi) if hi else None
+    exceptions = series.get("exceptions") or {}
+    result = []
+    for d in occurrence_dates(rule, start, lo):
+        if hi and d > hi:
+            break
+        ds = d.isoformat()
+        exc = exceptions.get(ds)
+        if exc and exc.get("deleted"):
+            continue
+        occ = make_occurrence(series, ds, exc)
+        if hi is None:
+            if not occ["done"]:
+                return [occ]
+            continue
+        if occ["due_date"] and lo.isoformat() <= occ["due_date"] <= hi.isoformat():
+            result.append(occ)
+    if hi is None:
+        return result
+    # Occurrences moved into the window from outside it
+    for ds, exc in exceptions.items():
+        moved = exc.get("due_date")
+        if (moved and not exc.get("deleted") and not lo.isoformat() <= ds <= hi.isoformat()
+                and lo.isoformat() <= moved <= hi.isoformat() and is_occurrence(rule, start, _to_date(ds))):
+            result.append(make_occurrence(series, ds, exc))
+    return result
+
+
+def update_exceptions(series, changes):
+    """New exceptions map after applying {occurrence date: fields} changes.
+
+    Values that match what the occurrence would inherit anyway are dropped,
+    so un-doing or moving back leaves nothing behind.
+    """
+    exceptions = dict(series.get("exceptions") or {})
+    for ds, fields in changes.items():
+        exc = {**exceptions.get(ds, {}), **fields}
+        if exc.get("due_date") == ds:
+            del exc["due_date"]
+        if not exc.get("done"):
+            exc.pop("done", None)
+            exc.pop("completed_date", None)
+        for key in list(exc):
+            if key not in ("done", "due_date", "deleted") and series.get(key) == exc[key]:
+                del exc[key]
+        if exc:
+            exceptions[ds] = exc
+        else:
+            exceptions.pop(ds, None)
+    return exceptions
+
+
+def end_series(series, last_date):
+    """Recurrence rule that stops after last_date"""
+    rule = parse_rule(series["recurrence"])
+    rule.pop("count", None)
+    rule["until"] = _to_date(last_date).isoformat()
+    return rule
@@ -0,0 +1,271 @@
+"""
+Process-wide task snapshot for GTF Command Center
+Every browser session reads the same copy of tasks.json. Nobody edits it in
+place: task_store builds new lists and dicts (copy-on-write), publish()
+swaps the new document in, bumps the version and notifies subscribers.
+"""
+
+import threading
+import weakref
+from collections import deque, namedtuple
+
+from change_history import History
+from task_counters import build_counters, ensure_counters
+from task_ids import ensure_unique_ids
+from task_query import TaskIndex
+from task_deps import DependencyGraph
+
+Change = namedtuple("Change", ["version", "task_ids", "source"])
+
+
+def diff_task_ids(old_tasks, new_tasks):
+    """Ids added, removed or replaced between two task lists.
+
+    Copy-on-write keeps untouched task dicts identical, so identity is
+    enough - no field comparison needed.
+    """
+    old = {id(t): t["id"] for t in old_tasks}
+    seen = set()
+    changed = set()
+    for t in new_tasks:
+        if id(t) not in old:
+            changed.add(t["id"])
+        seen.add(id(t))
+    for ident, task_id in old.items():
+        if ident not in seen:
+            changed.add(task_id)
+    return changed
+
+
+def diff_task_content(old_tasks, new_tasks):
+    """Ids whose content differs - for documents that came from outside the process"""
+    old = {t["id"]: t for t in old_tasks}
+    new = {t["id"]: t for t in new_tasks}
+    changed = {tid for tid, t in new.items() if old.get(tid) != t}
+    changed.update(tid for tid in old if tid not in new)
+    return changed
+
+
+def rebase(base, mine, current):
+    """Replay a writer's changes (base -> mine) onto a newer snapshot.
+
+    Tasks are merged by id: the writer's version of each task it touched
+    wins, everything else comes from the current snapshot.
+    """
+    changed = diff_task_ids(base.get("tasks", []), mine.get("tasks", []))
+    mine_by_id = {t["id"]: t for t in mine.get("tasks", []) if t["id"] in changed}
+    tasks = []
+    placed = set()
+    for t in current.get("tasks", []):
+        if t["id"] not in changed:
+            tasks.append(t)
+        elif t["id"] in mine_by_id and t["id"] not in placed:
+            tasks.append(mine_by_id[t["id"]])
+            placed.add(t["id"])
+    tasks.extend(t for tid, t in mine_by_id.items() if tid not in placed)
+    merged = {**current, "tasks": tasks}
+    merged["counters"] = build_counters(tasks)
+    return merged, changed
+
+
+def _meta(doc):
+    return {k: v for k, v in doc.items() if k not in ("tasks", "counters")}
+
+
+def _repair_messages(repairs):
+    return [f"{old or '(no id)'}: duplicate id, now {new}" for old, new in repairs]
+
+
+class Subscriber:
+    """One session's inbox of change notifications"""
+
+    def __init__(self, source):
+        self.source = source
+        self._events = deque(maxlen=100)
+
+    def notify(self, change):
+        self._events.append(change)
+
+    def pending(self):
+        """True if someone else changed something since the last drain()"""
+        return any(c.source != self.source and c.task_ids != frozenset() for c in list(self._events))
+
+    def drain(self):
+        """Pending changes committed by someone else"""
+        events = []
+        while self._events:
+            change = self._events.popleft()
+            if change.source != self.source:
+                events.append(change)
+        return events
+
+
+class SharedSnapshot:
+    """The current tasks document plus its version and change history.
+
+    Reads are lock-free: (version, data) is swapped as one tuple. Writers
+    serialize on a lock so persistence and publish happen in order.
+    """
+
+    def __init__(self, history=1000):
+        self._current = (0, None)
+        self._write_lock = threading.RLock()
+        self._changed = threading.Condition()
+        self._changes = deque(maxlen=history)
+        self._subscribers = weakref.WeakSet()
+        self._index = None
+        self._deps = None
+        self.sha = None
+        self.using_github = False
+        self.load_issues = []
+        self.history = History()
+
+    @property
+    def version(self):
+        return self._current[0]
+
+    @property
+    def data(self):
+        return self._current[1]
+
+    def read(self):
+        """(version, data) - treat data as read-only"""
+        return self._current
+
+    def index(self, version, data):
+        """TaskIndex for a (version, data) pair from read().
+
+        Built once per version and shared by all sessions; an index for a
+        version that has already been superseded is not kept.
+        """
+        index = self._index
+        if index is None or index.version != version:
+            index = TaskIndex(data.get("tasks", []), version)
+            if version == self.version:
+                self._index = index
+        return index
+
+    def dependencies(self, version, data):
+        """DependencyGraph for a (version, data) pair from read().
+
+        Derived from the previous version's graph by replaying only the
+        tasks changed since, when the change history allows it.
+        """
+        graph = self._deps
+        if graph is not None and graph.version == version:
+            return graph
+        changes = None
+        if graph is not None and version == self.version:
+            changes = self.changes_since(graph.version)
+        if changes and changes[-1].version == version and all(c.task_ids is not None for c in changes):
+            changed = set().union(*(c.task_ids for c in changes))
+            graph = graph.advance(self.index(version, data).get, changed, version)
+        else:
+            graph = DependencyGraph.build(data.get("tasks", []), version)
+        if version == self.version:
+            self._deps = graph
+        return graph
+
+    def publish(self, data, changed=None, source=None, sha=None, using_github=None, action=None):
+        """Swap in a new document and notify subscribers.
+
+        changed is the set of touched task ids, or None for "everything";
+        only the former is recorded in history. action marks an undo / redo.
+        """
+        ensure_counters(data)
+        with self._write_lock:
+            version, old = self._current[0] + 1, self._current[1]
+            if changed is not None and old is not None:
+                self.history.record(version, source, old.get("tasks", []), data.get("tasks", []),
+                                    changed, action)
+            self._current = (version, data)
+            if sha is not None:
+                self.sha = sha
+            if using_github is not None:
+                self.using_github = using_github
+            change = Change(version, frozenset(changed) if changed is not None else None, source)
+            self._changes.append(change)
+            for sub in list(self._subscribers):
+                sub.notify(change)
+        with self._changed:
+            self._changed.notify_all()
+        return version
+
+    def load_once(self, loader):
+        """Populate the snapshot on first use; loader returns (data, sha, using_github)"""
+        if self.data is not None:
+            return
+        with self._write_lock:
+            if self.data is None:
+                data, sha, using_github = loader()
+                self.repair_ids(data)
+                self.publish(data, sha=sha, using_github=using_github)
+
+    def commit(self, data, base, writer, source=None, action=None):
+        """Persist and publish a session's edited copy of `base`.
+
+        If another writer got in first, the session's changes are rebased
+        onto the current snapshot by task id. writer(data, sha) persists and
+        returns (ok, new_sha). Returns the new version, or None on failure.
+        """
+        with self._write_lock:
+            current = self.data
+            if base is current:
+                changed = diff_task_ids(base.get("tasks", []), data.get("tasks", []))
+            else:
+                data, changed = rebase(base, data, current)
+            ok, sha = writer(data, self.sha)
+            if not ok:
+                return None
+            return self.publish(data, changed, source=source, sha=sha, action=action)
+
+    def adopt_remote(self, build, sha):
+        """Publish a document derived from the remote one (see local_replica).
+
+        build(current) runs under the write lock, so no local commit can land
+        between merging and publishing.
+
+        Our own push coming back changes only the SHA; that is recorded
+        without a new version, so sessions don't rerun and the per-version
+        caches survive.
+        """
+        with self._write_lock:
+            current = self.data
+            data = build(current)
+            changed = diff_task_content(current.get("tasks", []), data.get("tasks", []))
+            if changed:
+                self.publish(data, changed, source="remote", sha=sha)
+            elif _meta(data) != _meta(current):
+                # Departments or labels edited on GitHub: no task ids to name
+                self.publish(data, None, source="remote", sha=sha)
+            else:
+                self.sha = sha
+
+    def repair_ids(self, data):
+        """Re-id duplicate task ids in a loaded document, noting new repairs in load_issues.
+
+        Repaired ids are deterministic, so repairing the same remote document
+        again gives the same ids and adds no messages.
+        """
+        for message in _repair_messages(ensure_unique_ids(data)):
+            if message not in self.load_issues:
+                self.load_issues.append(message)
+
+    def subscribe(self, source):
+        """Register a session; it stays subscribed while the caller holds the Subscriber"""
+        sub = Subscriber(source)
+        self._subscribers.add(sub)
+        return sub
+
+    def changes_since(self, version):
+        """Changes after `version`, oldest first; None if history no longer reaches back"""
+        changes = [c for c in list(self._changes) if c.version > version]
+        if changes and changes[0].version != version + 1:
+            return None
+        return changes
+
+    def wait_for_change(self, version, timeout):
+        """Block until the version moves past `version` or timeout; returns current version"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version > version, timeout)
+        return self.version
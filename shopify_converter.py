@@ -0,0 +1,201 @@
+"""
+CSV -> Shopify converter for GTF Command Center
+Official Shopify 2024 format (57 cols) + GTF Attribute Schema v2 (32 cols) = 89 total
+
+Imported lazily from app.py the first time File Tools converts a file;
+schemas and regexes are built once per process.
+"""
+
+import csv
+import io
+import re
+
+# Official Shopify columns (2024 format) - 57 columns
+SHOPIFY_COLUMNS = [
+    "Title", "URL handle", "Description", "Vendor", "Product category", "Type", "Tags",
+    "Published on online store", "Status", "SKU", "Barcode", "Option1 name", "Option1 value",
+    "Option1 Linked To", "Option2 name", "Option2 value", "Option2 Linked To", "Option3 name",
+    "Option3 value", "Option3 Linked To", "Price", "Compare-at price", "Cost per item",
+    "Charge tax", "Tax code", "Unit price total measure", "Unit price total measure unit",
+    "Unit price base measure", "Unit price base measure unit", "Inventory tracker",
+    "Inventory quantity", "Continue selling when out of stock", "Weight value (grams)",
+    "Weight unit for display", "Requires shipping", "Fulfillment service", "Product image URL",
+    "Image position", "Image alt text", "Variant image URL", "Gift card", "SEO title",
+    "SEO description", "Color (product.metafields.shopify.color-pattern)",
+    "Google Shopping / Google product category", "Google Shopping / Gender",
+    "Google Shopping / Age group", "Google Shopping / Manufacturer part number (MPN)",
+    "Google Shopping / Ad group name", "Google Shopping / Ads labels",
+    "Google Shopping / Condition", "Google Shopping / Custom product",
+    "Google Shopping / Custom label 0", "Google Shopping / Custom label 1",
+    "Google Shopping / Custom label 2", "Google Shopping / Custom label 3",
+    "Google Shopping / Custom label 4",
+]
+
+# GTF Attribute Schema v2 columns - 32 columns
+GTF_ATTRIBUTE_COLUMNS = [
+    # Hard attributes (factual)
+    "gtf_category", "gtf_primary_color", "gtf_secondary_color", "gtf_silhouette",
+    "gtf_length", "gtf_neckline", "gtf_sleeve_length", "gtf_pattern",
+    # Soft attributes (subjective/vibe)
+    "gtf_vibe", "gtf_occasion", "gtf_style_references", "gtf_destination",
+    "gtf_style_persona", "gtf_pinterest_aesthetic", "gtf_event_suitability",
+    "gtf_shopper_mindset", "gtf_key_selling_point",
+    # Celebrity reference
+    "gtf_celebrity_detected", "gtf_celebrity_name", "gtf_celebrity_type",
+    "gtf_celebrity_style_context",
+    # Search intent
+    "gtf_primary_piece", "gtf_secondary_pieces", "gtf_overall_aesthetic",
+    "gtf_color_palette", "gtf_key_attributes_to_match",
+    # Meta
+    "gtf_extraction_mode", "gtf_confidence", "gtf_extraction_notes",
+    # Additional useful
+    "gtf_google_drive_link", "gtf_hs_code", "gtf_care_instructions",
+]
+
+ALL_COLUMNS = SHOPIFY_COLUMNS + GTF_ATTRIBUTE_COLUMNS
+
+NON_NUMERIC = re.compile(r'[^0-9.]')
+HANDLE_SEPARATORS = re.compile(r'[^a-z0-9]+')
+
+
+def convert(content, vendor_name):
+    """Convert a supplier CSV (text) to Shopify rows.
+
+    Returns (shopify_rows, products) where products maps product_key
+    ("title|color") to that product's parent row.
+    """
+    reader = csv.DictReader(io.StringIO(content))
+    rows = list(reader)
+
+    shopify_rows = []
+    products = {}
+
+    for row in rows:
+        sku = (row.get('SKU Code') or row.get('SKU') or row.get('Style Code') or '').strip()
+        if not sku:
+            continue
+
+        title = (row.get('Dress Name') or row.get('Product Name') or row.get('Title') or '').strip()
+        color = (row.get('Colour') or row.get('Color') or '').strip().title()
+        size = (row.get('Size') or '').strip()
+        length = (row.get('Lenght') or row.get('Length') or '').strip()
+        material = (row.get('Material') or row.get('Fabric') or '').replace('-', ' ').replace('100 ', '100% ').title()
+        price = row.get('Final Price') or row.get('Price') or '0'
+        category = (row.get('Category') or row.get('Type') or 'Clothing').strip()
+        wash_care = (row.get('Wash care') or row.get('Care Instructions') or '').strip()
+        weight_raw = (row.get('Average Weight (kg)') or row.get('Weight (kg)') or '').strip()
+        hs_code = (row.get('HS Code') or row.get('Hs Code') or '').strip()
+        image_link = (row.get('Product Link (Google Drive/Shopify)') or row.get('Image URL') or row.get('Google Drive Link') or '').strip()
+
+        # Parse weight
+        try:
+            if 'kg' in weight_raw.lower():
+                weight = int(float(NON_NUMERIC.sub('', weight_raw)) * 1000)
+            else:
+                weight = int(float(weight_raw or 0) * 1000) if weight_raw else 500
+        except:
+            weight = 500
+
+        handle = HANDLE_SEPARATORS.sub('-', f"{title}-{color}".lower()).strip('-')
+        product_key = f"{title}|{color}"
+        option2_value = length.title() if length and length.lower() not in ['', 'nan', 'none'] else ''
+
+        # Description
+        desc_parts = []
+        if material:
+            desc_parts.append(f"<p><strong>Material:</strong> {material}</p>")
+        if wash_care and wash_care.lower() != 'nan':
+            desc_parts.append(f"<p><strong>Care:</strong><br>{wash_care.replace(';', '<br>')}</p>")
+        description = '\n'.join(desc_parts)
+
+        tags = [t for t in [category, color] if t and t.lower() != 'nan']
+        product_category = f"Apparel & Accessories > Clothing > {category}" if category else "Apparel & Accessories > Clothing"
+
+        is_first = product_key not in products
+        shopify_row = {col: "" for col in ALL_COLUMNS}
+
+        if is_first:
+            products[product_key] = shopify_row
+            shopify_row.update({
+                "Title": f"{title} - {color}",
+                "URL handle": handle,
+                "Description": description,
+                "Vendor": vendor_name,
+                "Product category": product_category,
+                "Type": category,
+                "Tags": ', '.join(tags),
+                "Published on online store": "TRUE",
+                "Status": "Draft",
+                "SKU": sku,
+                "Option1 name": "Size",
+                "Option1 value": size,
+                "Option2 name": "Length" if option2_value else "",
+                "Option2 value": option2_value,
+                "Price": price,
+                "Charge tax": "TRUE",
+                "Inventory tracker": "shopify",
+                "Inventory quantity": "1",
+                "Continue selling when out of stock": "DENY",
+                "Weight value (grams)": weight,
+                "Weight unit for display": "g",
+                "Requires shipping": "TRUE",
+                "Fulfillment service": "manual",
+                "Product image URL": image_link,
+                "Image position": "1",
+                "Image alt text": f"{title} {color}",
+                "Gift card": "FALSE",
+                "SEO title": f"{title} - {color} | {vendor_name}",
+                "SEO description": f"Shop {title} in {color}.",
+                "Color (product.metafields.shopify.color-pattern)": color.lower(),
+                "Google Shopping / Google product category": product_category,
+                "Google Shopping / Gender": "Female",
+                "Google Shopping / Age group": "Adult",
+                "Google Shopping / Manufacturer part number (MPN)": sku,
+                "Google Shopping / Condition": "New",
+                "Google Shopping / Custom product": "FALSE",
+                "Google Shopping / Custom label 0": hs_code,
+                # Pre-fill GTF attributes (Schema v2)
+                "gtf_category": category.lower(),
+                "gtf_primary_color": color.lower(),
+                "gtf_secondary_color": "",
+                "gtf_silhouette": "",
+                "gtf_length": option2_value.lower() if option2_value else "",
+                "gtf_neckline": "",
+                "gtf_sleeve_length": "",
+                "gtf_pattern": "",
+                "gtf_primary_piece": category.lower(),
+                "gtf_color_palette": color.lower(),
+                "gtf_extraction_mode": "catalog",
+                "gtf_google_drive_link": image_link,
+                "gtf_hs_code": hs_code,
+                "gtf_care_instructions": wash_care,
+            })
+        else:
+            shopify_row.update({
+                "URL handle": handle,
+                "SKU": sku,
+                "Option1 value": size,
+                "Option2 value": option2_value,
+                "Price": price,
+                "Charge tax": "TRUE",
+                "Inventory tracker": "shopify",
+                "Inventory quantity": "1",
+                "Continue selling when out of stock": "DENY",
+                "Weight value (grams)": weight,
+                "Weight unit for display": "g",
+                "Requires shipping": "TRUE",
+                "Fulfillment service": "manual",
+            })
+
+        shopify_rows.append(shopify_row)
+
+    return shopify_rows, products
+
+
+def to_csv(shopify_rows):
+    """Serialize converter output with the 89-column header"""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=ALL_COLUMNS)
+    writer.writeheader()
+    writer.writerows(shopify_rows)
+    return output.getvalue()
@@ -0,0 +1,150 @@
+"""
+Shopify import file validator for GTF Command Center
+One streaming pass over converter output - rows from convert() inline, or
+an existing CSV from the command line - reporting the problems Shopify
+would otherwise reject the import for, by row number.
+
+Handles and SKUs are remembered as 64-bit digests rather than strings, so
+memory stays small and flat per row even across several large files.
+
+Usage:
+    python shopify_validator.py FILE.csv [FILE.csv ...] [--max-issues 200]
+"""
+
+import argparse
+import csv
+import hashlib
+import sys
+from collections import namedtuple
+
+from shopify_converter import ALL_COLUMNS
+
+# The converter's stand-in when a supplier weight is missing or unreadable
+DEFAULT_WEIGHT = 500
+STATUSES = ("active", "draft", "archived")
+
+Issue = namedtuple("Issue", ["source", "row", "column", "message", "severity"])   # severity: error | warning
+
+
+def _digest(value):
+    return int.from_bytes(hashlib.blake2b(value.strip().lower().encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _number(value):
+    try:
+        return float(str(value).replace(",", ""))
+    except ValueError:
+        return None
+
+
+class Seen:
+    """Handles and SKUs met so far, shared across files to catch clashes between vendors"""
+
+    def __init__(self):
+        self.handles = {}   # digest -> (source, row, vendor)
+        self.skus = {}      # digest -> (source, row)
+
+    @staticmethod
+    def where(source, row, current):
+        return f"row {row}" if source == current else f"{source} row {row}"
+
+
+def validate(rows, source="output", seen=None, header=None):
+    """Yield Issues for an iterable of row dicts, in one pass.
+
+    Row numbers count the header as row 1, as a spreadsheet shows them.
+    header, when given, is the file's column list and is checked first.
+    """
+    seen = seen if seen is not None else Seen()
+    if header is not None:
+        missing = [c for c in ALL_COLUMNS if c not in header]
+        if missing:
+            yield Issue(source, 1, "", f"missing columns: {', '.join(missing[:5])}"
+                        + (f" +{len(missing) - 5}" if len(missing) > 5 else ""), "error")
+
+    def issue(column, message, severity="error"):
+        return Issue(source, n, column, message, severity)
+
+    for n, row in enumerate(rows, start=2):
+        handle = (row.get("URL handle") or "").strip()
+        sku = (row.get("SKU") or "").strip()
+        is_parent = bool((row.get("Title") or "").strip())
+
+        if not handle:
+            yield issue("URL handle", "empty handle")
+        else:
+            key = _digest(handle)
+            first = seen.handles.get(key)
+            if is_parent:
+                vendor = (row.get("Vendor") or "").strip()
+                if first:
+                    other = f" ({first[2]})" if first[2] and first[2] != vendor else ""
+                    yield issue("URL handle", f"handle '{handle}' already used by "
+                                f"{Seen.where(first[0], first[1], source)}{other}")
+                else:
+                    seen.handles[key] = (source, n, vendor)
+            elif not first:
+                yield issue("URL handle", f"variant of '{handle}' has no product row before it")
+
+        if not sku:
+            yield issue("SKU", "empty SKU")
+        else:
+            key = _digest(sku)
+            first = seen.skus.get(key)
+            if first:
+                yield issue("SKU", f"SKU '{sku}' repeats {Seen.where(first[0], first[1], source)}")
+            else:
+                seen.skus[key] = (source, n)
+
+        price = str(row.get("Price") or "").strip()
+        if not price:
+            yield issue("Price", "empty price")
+        elif _number(price) is None:
+            yield issue("Price", f"price '{price}' is not a number")
+        elif _number(price) <= 0:
+            yield issue("Price", f"price {price} is not positive")
+
+        weight = str(row.get("Weight value (grams)") or "").strip()
+        grams = _number(weight) if weight else None
+        if weight and grams is None:
+            yield issue("Weight value (grams)", f"weight '{weight}' is not a number")
+        elif grams == DEFAULT_WEIGHT:
+            yield issue("Weight value (grams)", "500 g is the converter default - supplier weight missing?", "warning")
+
+        if not (row.get("Option1 value") or "").strip():
+            yield issue("Option1 value", "empty size")
+
+        if is_parent:
+            status = (row.get("Status") or "").strip()
+            if status.lower() not in STATUSES:
+                yield issue("Status", f"status '{status}' is not Active, Draft or Archived")
+            if not (row.get("Product image URL") or "").strip():
+                yield issue("Product image URL", "no image", "warning")
+
+
+def validate_file(path, seen=None):
+    """Stream-validate a CSV on disk"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        yield from validate(reader, source=path, seen=seen, header=reader.fieldnames or [])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--max-issues", type=int, default=200, help="stop printing after this many")
+    args = parser.parse_args()
+
+    seen = Seen()
+    counts = {"error": 0, "warning": 0}
+    for path in args.files:
+        for issue in validate_file(path, seen):
+            counts[issue.severity] += 1
+            if sum(counts.values()) <= args.max_issues:
+                print(f"{issue.source}:{issue.row}: {issue.severity}: [{issue.column}] {issue.message}")
+    print(f"{counts['error']} error(s), {counts['warning']} warning(s) in {len(args.files)} file(s)")
+    sys.exit(1 if counts["error"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Dashboard counters for GTF Command Center
+Department x status x priority cells plus open-task due-date buckets,
+updated incrementally on each mutation and persisted with tasks.json
+"""
+
+from datetime import timedelta
+
+COUNTERS_VERSION = 2
+
+
+def _cell(task):
+    status = "done" if task.get("done") else "open"
+    return f"{task.get('department', 'quick')}|{status}|{task.get('priority', 'medium')}"
+
+
+def _bump(bucket, key, delta):
+    n = bucket.get(key, 0) + delta
+    if n:
+        bucket[key] = n
+    else:
+        bucket.pop(key, None)
+
+
+def empty_counters():
+    return {"version": COUNTERS_VERSION, "total": 0, "cells": {}, "due": {}}
+
+
+def count_task(counters, task, delta=1):
+    """Add (delta=1) or remove (delta=-1) one task's contribution"""
+    counters["total"] += delta
+    if task.get("recurrence"):
+        # Series templates are not tasks on their own; occurrences are virtual
+        return
+    _bump(counters["cells"], _cell(task), delta)
+    if not task.get("done") and task.get("due_date"):
+        _bump(counters["due"], task["due_date"], delta)
+
+
+def copy_counters(counters):
+    """Private copy for a writer - the shared snapshot's counters are never mutated"""
+    return {**counters, "cells": dict(counters["cells"]), "due": dict(counters["due"])}
+
+
+def build_counters(tasks):
+    """Full recount - done for every document loaded from disk or GitHub"""
+    counters = empty_counters()
+    for t in tasks:
+        count_task(counters, t)
+    return counters
+
+
+def ensure_counters(data):
+    """Counters of an in-process document, rebuilding if missing or from an older version.
+
+    Only a cheap sanity check: loaded documents get fresh counters from
+    task_schema.normalize_document, and later edits keep them in step.
+    """
+    counters = data.get("counters")
+    tasks = data.get("tasks", [])
+    if (not isinstance(counters, dict)
+            or counters.get("version") != COUNTERS_VERSION
+            or counters.get("total") != len(tasks)):
+        counters = build_counters(tasks)
+        data["counters"] = counters
+    return counters
+
+
+def summary(counters, due_index, occurrences=()):
+    """Header numbers in O(departments x priorities + occurrences).
+
+    due_index is a DueIndex loaded from counters["due"]; its today boundary
+    decides what is overdue. occurrences are undone recurring occurrences
+    (TaskIndex.open_occurrences), counted in every number like stored tasks.
+    """
+    open_by_dept = {}
+    open_total = high = 0
+    for key, n in counters["cells"].items():
+        dept, status, priority = key.split("|")
+        if status != "open":
+            continue
+        open_total += n
+        open_by_dept[dept] = open_by_dept.get(dept, 0) + n
+        if priority == "high":
+            high += n
+    today = due_index.today.isoformat()
+    week_end = (due_index.today + timedelta(days=7)).isoformat()
+    due_today = overdue = week = 0
+    for t in occurrences:
+        dept = t.get("department", "quick")
+        open_total += 1
+        open_by_dept[dept] = open_by_dept.get(dept, 0) + 1
+        if t.get("priority") == "high":
+            high += 1
+        due = t["due_date"][:10]
+        if due < today:
+            overdue += 1
+        elif due == today:
+            due_today += 1
+        elif due <= week_end:
+            week += 1
+    return {
+        "open": open_total,
+        "today": due_index.today_count() + due_today,
+        "overdue": due_index.overdue_count() + overdue,
+        "week": due_index.upcoming_count(7) + week,
+        "high": high,
+        "by_dept": open_by_dept,
+    }
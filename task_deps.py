@@ -0,0 +1,275 @@
+"""
+Task dependencies for GTF Command Center
+A task lists the tasks it waits on in "depends_on". DependencyGraph keeps,
+per data version, which open tasks are blocked and the projected date each
+task can really finish by (its own due date, pushed out by open blockers).
+
+Like TaskIndex the graph is immutable and shared across sessions. A new
+version is derived from the previous one by re-evaluating only the changed
+tasks and whatever sits downstream of them, stopping where nothing moves.
+"""
+
+from collections import deque
+from datetime import date
+
+from due_index import to_ordinal
+
+
+def dependency_ids(task):
+    return tuple(d for d in task.get("depends_on") or () if d != task["id"])
+
+
+def _is_node(task):
+    # Recurring series are templates, not schedulable tasks
+    return not task.get("recurrence")
+
+
+class DependencyGraph:
+    """Blocked-by edges plus blocked / projected-date state for one version"""
+
+    def __init__(self, version=None):
+        self.version = version
+        self.deps = {}          # id -> tuple of ids it waits on
+        self.dependents = {}    # id -> frozenset of ids waiting on it
+        self.due = {}           # id -> due ordinal or None
+        self.done = set()
+        self.projected = {}     # id -> ordinal it can finish by, or None
+        self.titles = {}
+        self._cycles = None
+
+    @classmethod
+    def build(cls, tasks, version=None):
+        graph = cls(version)
+        for t in tasks:
+            if _is_node(t):
+                graph._set_node(t)
+        dependents = {}
+        for tid, deps in graph.deps.items():
+            for d in deps:
+                dependents.setdefault(d, set()).add(tid)
+        graph.dependents = {k: frozenset(v) for k, v in dependents.items()}
+        graph._recompute()
+        return graph
+
+    def _recompute(self):
+        """Projected dates for every task from scratch, in dependency order"""
+        self.projected = {}
+        for tid in self._topological():
+            self.projected[tid] = self._compute(tid)
+
+    def _set_node(self, t):
+        tid = t["id"]
+        self.deps[tid] = dependency_ids(t)
+        self.due[tid] = to_ordinal(t["due_date"]) if t.get("due_date") else None
+        self.titles[tid] = t.get("title", "")
+        if t.get("done"):
+            self.done.add(tid)
+        else:
+            self.done.discard(tid)
+
+    def _remove_node(self, tid):
+        self.deps.pop(tid, None)
+        self.due.pop(tid, None)
+        self.titles.pop(tid, None)
+        self.projected.pop(tid, None)
+        self.done.discard(tid)
+
+    def _compute(self, tid):
+        best = self.due.get(tid)
+        if tid in self.done:
+            return best
+        for d in self.deps.get(tid, ()):
+            p = self.projected.get(d) if d not in self.done else None
+            if p is not None and (best is None or p > best):
+                best = p
+        return best
+
+    def _propagate(self, start):
+        """Re-evaluate projected dates from `start` downstream until stable"""
+        forced = set(start)
+        queue = deque(start)
+        queued = set(queue)
+        budget = 4 * (len(self.deps) + 1) * (len(forced) + 1)   # a cycle must not spin forever
+        while queue and budget:
+            budget -= 1
+            tid = queue.popleft()
+            queued.discard(tid)
+            new = self._compute(tid)
+            if tid not in forced and self.projected.get(tid, new) == new and tid in self.projected:
+                continue
+            forced.discard(tid)
+            self.projected[tid] = new
+            for dep in self.dependents.get(tid, ()):
+                if dep not in queued:
+                    queue.append(dep)
+                    queued.add(dep)
+
+    def _topological(self):
+        """Blockers before the tasks that wait on them; loop members come last"""
+        waiting = {tid: sum(1 for d in deps if d in self.deps) for tid, deps in self.deps.items()}
+        queue = deque(tid for tid, n in waiting.items() if n == 0)
+        order = []
+        while queue:
+            tid = queue.popleft()
+            order.append(tid)
+            for dep in self.dependents.get(tid, ()):
+                waiting[dep] -= 1
+                if waiting[dep] == 0:
+                    queue.append(dep)
+        placed = set(order)
+        # Sorted so a loop resolves the same way however the graph was reached
+        order.extend(sorted(tid for tid in self.deps if tid not in placed))
+        return order
+
+    def advance(self, tasks_by_id, changed_ids, version=None):
+        """Graph for the next version, given the tasks that changed.
+
+        tasks_by_id(task_id) returns the task in the new version or None.
+        Only changed tasks, their neighbours and downstream tasks whose
+        projected date actually moves are re-evaluated - unless a loop is
+        involved, where propagation can't settle; then every date is
+        recomputed as build() would.
+        """
+        graph = DependencyGraph(version)
+        graph.deps = dict(self.deps)
+        graph.due = dict(self.due)
+        graph.done = set(self.done)
+        graph.projected = dict(self.projected)
+        graph.titles = dict(self.titles)
+        dependents = dict(self.dependents)
+
+        start = set()
+        gained = {}
+        for tid in changed_ids:
+            old_deps = graph.deps.get(tid, ())
+            t = tasks_by_id(tid)
+            if t is None or not _is_node(t):
+                graph._remove_node(tid)
+                new_deps = ()
+            else:
+                graph._set_node(t)
+                new_deps = graph.deps[tid]
+            for d in set(old_deps) - set(new_deps):
+                dependents[d] = dependents.get(d, frozenset()) - {tid}
+            for d in set(new_deps) - set(old_deps):
+                dependents[d] = dependents.get(d, frozenset()) | {tid}
+                gained.setdefault(tid, []).append(d)
+            start.add(tid)
+            # A removed or finished task unblocks / un-pushes whatever waited on it
+            start.update(dependents.get(tid, ()))
+        graph.dependents = {k: v for k, v in dependents.items() if v}
+        # Dropping edges can't close a loop, so only new ones need checking
+        if self.cycles() or any(graph.would_cycle(tid, deps) for tid, deps in gained.items()):
+            graph._recompute()
+        else:
+            graph._cycles = set()
+            graph._propagate(start & graph.deps.keys())
+        return graph
+
+    # Queries
+
+    def blockers(self, task_id):
+        """Open tasks this one still waits on"""
+        return [d for d in self.deps.get(task_id, ()) if d in self.deps and d not in self.done]
+
+    def is_blocked(self, task_id):
+        return task_id not in self.done and bool(self.blockers(task_id))
+
+    def slip(self, task_id):
+        """Projected date if blockers push it past its own due date, else None"""
+        due, projected = self.due.get(task_id), self.projected.get(task_id)
+        if task_id in self.done or due is None or projected is None or projected <= due:
+            return None
+        return date.fromordinal(projected)
+
+    def critical_path(self, task_id):
+        """Chain of open blockers that sets this task's projected date, root first"""
+        path = [task_id]
+        seen = {task_id}
+        current = task_id
+        while True:
+            blockers = [d for d in self.blockers(current) if d not in seen]
+            if not blockers:
+                break
+            current = max(blockers, key=lambda d: self.projected.get(d) or 0)
+            seen.add(current)
+            path.append(current)
+        return path[::-1]
+
+    def downstream(self, task_id):
+        """Every task that directly or indirectly waits on this one"""
+        found, queue = set(), deque([task_id])
+        while queue:
+            for dep in self.dependents.get(queue.popleft(), ()):
+                if dep not in found and dep != task_id:
+                    found.add(dep)
+                    queue.append(dep)
+        return found
+
+    def would_cycle(self, task_id, depends_on):
+        """True if making task_id wait on these ids would close a loop"""
+        stack, seen = list(depends_on), set()
+        while stack:
+            tid = stack.pop()
+            if tid == task_id:
+                return True
+            if tid not in seen:
+                seen.add(tid)
+                stack.extend(self.deps.get(tid, ()))
+        return False
+
+    def cycles(self):
+        """Ids that sit on a dependency loop (should only come from outside edits)"""
+        if self._cycles is not None:
+            return self._cycles
+        # Tarjan's strongly connected components, iteratively; every
+        # component of more than one task is a loop (self-edges are dropped)
+        index, low = {}, {}
+        stack, on_stack = [], set()
+        result = set()
+        for root in self.deps:
+            if root in index:
+                continue
+            work = [(root, iter(self.deps[root]))]
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                tid, children = work[-1]
+                child = next(children, None)
+                if child is not None:
+                    if child not in self.deps:
+                        continue
+                    if child not in index:
+                        index[child] = low[child] = len(index)
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self.deps[child])))
+                    elif child in on_stack:
+                        low[tid] = min(low[tid], index[child])
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[tid])
+                if low[tid] == index[tid]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == tid:
+                            break
+                    if len(component) > 1:
+                        result.update(component)
+        self._cycles = result
+        return result
+
+    def slip_changes(self, task_id):
+        """Updates that move this task and everything downstream to their projected dates"""
+        changes = []
+        for tid in [task_id, *self.downstream(task_id)]:
+            new = self.slip(tid)
+            if new:
+                changes.append(("update", tid, {"due_date": new.isoformat()}))
+        return changes
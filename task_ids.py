@@ -0,0 +1,91 @@
+"""
+Task ID allocation for GTF Command Center
+ULID-style ids: 48-bit millisecond timestamp + 80 random bits, Crockford
+base32. Sortable by creation time, monotonic within a process, and safe to
+mint concurrently from several sessions or processes without coordination.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+RANDOM_BITS = 80
+
+_lock = threading.Lock()
+_last_ms = -1
+_last_random = 0
+
+
+def _encode(value, length):
+    chars = []
+    for _ in range(length):
+        chars.append(CROCKFORD[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def new_task_id():
+    """A new 26-character id, strictly increasing within this process"""
+    global _last_ms, _last_random
+    with _lock:
+        ms = int(time.time() * 1000)
+        if ms <= _last_ms:
+            # Same millisecond (or clock went back): bump the random part
+            ms = _last_ms
+            rand = _last_random + 1
+            if rand >> RANDOM_BITS:
+                ms += 1
+                rand = int.from_bytes(os.urandom(10), "big")
+        else:
+            rand = int.from_bytes(os.urandom(10), "big")
+        _last_ms, _last_random = ms, rand
+    return _encode(ms, 10) + _encode(rand, 16)
+
+
+def _repair_id(task, task_id, nth):
+    """Stable id for the nth duplicate of task_id (or a task with no id).
+
+    Derived from what is in the file, not random, so the same document
+    repairs to the same ids on every load until the fix is saved.
+    """
+    if task_id:
+        return f"{task_id}-dup{nth}"
+    content = json.dumps(task, sort_keys=True, default=str).encode("utf-8")
+    return "noid-" + hashlib.blake2b(content, digest_size=6).hexdigest() + (f"-{nth}" if nth > 1 else "")
+
+
+def ensure_unique_ids(data):
+    """Validate task ids on load and repair duplicates in place.
+
+    The first task keeps a duplicated id; later ones get a deterministic
+    id ("<id>-dup<n>") and keep the old one in "legacy_id". Tasks without an
+    id get one derived from their content. Returns a list of
+    (old_id, new_id) repairs for reporting.
+    """
+    tasks = data.get("tasks", [])
+    seen = {t.get("id") for t in tasks if t.get("id")}
+    kept = set()
+    counts = {}
+    repairs = []
+    for i, t in enumerate(tasks):
+        task_id = t.get("id")
+        if task_id and task_id not in kept:
+            kept.add(task_id)
+            continue
+        nth = counts.get(task_id, 0) + 1
+        new_id = _repair_id(t, task_id, nth)
+        while new_id in seen:
+            nth += 1
+            new_id = _repair_id(t, task_id, nth)
+        counts[task_id] = nth
+        fixed = {**t, "id": new_id}
+        if task_id:
+            fixed["legacy_id"] = task_id
+        tasks[i] = fixed
+        seen.add(new_id)
+        kept.add(new_id)
+        repairs.append((task_id, new_id))
+    return repairs
@@ -0,0 +1,259 @@
+"""
+Task query engine for GTF Command Center
+Composable filters over precomputed indexes, memoized per data version
+"""
+
+from collections import namedtuple, defaultdict
+from datetime import date, timedelta
+
+from due_index import DueIndex, to_ordinal
+from recurrence import is_series, expand, split_occurrence_id, make_occurrence, pending_since
+
+# Zoya statuses that take a suggestion off the sidebar
+ZOYA_CLOSED = ("completed", "denied")
+# Statuses the queue owns; these are listed as Zoya's work, not as suggestions
+ZOYA_QUEUED = ("in_progress", "failed")
+
+# Filter values that are not literal zoya_status values
+ZOYA_SUGGESTED = "suggested"
+ZOYA_NONE = "none"
+
+# Reminder states
+REMINDER_SCHEDULED = "scheduled"
+REMINDER_TASK = "reminder_task"
+REMINDER_NONE = "none"
+
+TaskQuery = namedtuple(
+    "TaskQuery",
+    ["status", "departments", "priorities", "due_from", "due_to", "zoya", "reminder", "sort"],
+)
+
+
+def make_query(status="open", departments=(), priorities=(), due_from=None, due_to=None,
+               zoya=(), reminder=(), sort="due"):
+    """Build a hashable query signature.
+
+    Empty collections mean "no filter". Dates are inclusive ISO strings.
+    sort is one of "board", "due" or None (document order).
+    """
+    return TaskQuery(
+        status=status,
+        departments=frozenset(departments or ()),
+        priorities=frozenset(priorities or ()),
+        due_from=due_from or None,
+        due_to=due_to or None,
+        zoya=frozenset(zoya or ()),
+        reminder=frozenset(reminder or ()),
+        sort=sort,
+    )
+
+
+def zoya_state(task):
+    """Filter bucket for a task's Zoya state"""
+    status = task.get("zoya_status")
+    if status:
+        return status
+    if task.get("zoya_can_help"):
+        return ZOYA_SUGGESTED
+    return ZOYA_NONE
+
+
+def reminder_state(task):
+    """Filter bucket for a task's reminder state"""
+    if task.get("is_zoya_reminder"):
+        return REMINDER_TASK
+    if task.get("reminder_scheduled"):
+        return REMINDER_SCHEDULED
+    return REMINDER_NONE
+
+
+def board_key(task, pos):
+    """Calendar/Today ordering: manual order first, high priority before the rest"""
+    return (task.get("order", 999), task.get("priority") != "high", pos)
+
+
+def due_key(task, pos):
+    """All-tasks ordering: earliest due first, undated last"""
+    return (task.get("due_date") or "9999", task.get("priority") != "high", pos)
+
+
+SORT_KEYS = {"board": board_key, "due": due_key}
+
+def _matches(task, query):
+    """Predicate form of a query's filters, for tasks that are not indexed"""
+    if query.status in ("open", "done") and bool(task.get("done")) != (query.status == "done"):
+        return False
+    if query.departments and task.get("department", "quick") not in query.departments:
+        return False
+    if query.priorities and task.get("priority", "medium") not in query.priorities:
+        return False
+    if query.zoya and zoya_state(task) not in query.zoya:
+        return False
+    if query.reminder and reminder_state(task) not in query.reminder:
+        return False
+    due = task.get("due_date") or ""
+    if (query.due_from and due < query.due_from) or (query.due_to and due > query.due_to):
+        return False
+    return True
+
+
+class TaskIndex:
+    """Inverted indexes over one version of the task list.
+
+    Tasks are addressed by their position in the list. The index is
+    immutable; build a new one when the data version changes.
+    """
+
+    def __init__(self, tasks, version=None):
+        self.tasks = tasks
+        self.version = version
+        self.by_status = {"open": set(), "done": set()}
+        self.by_dept = defaultdict(set)
+        self.by_priority = defaultdict(set)
+        self.by_zoya = defaultdict(set)
+        self.by_reminder = defaultdict(set)
+        self.by_id = {}
+        self.series = set()
+        self.rank = {}
+        self.due = DueIndex()
+        self._memo = {}
+
+        for pos, t in enumerate(tasks):
+            self.by_id.setdefault(t["id"], pos)
+            if is_series(t):
+                # Series are templates; only their expanded occurrences are listed
+                self.series.add(pos)
+                continue
+            self.by_status["done" if t.get("done") else "open"].add(pos)
+            self.by_dept[t.get("department", "quick")].add(pos)
+            self.by_priority[t.get("priority", "medium")].add(pos)
+            self.by_zoya[zoya_state(t)].add(pos)
+            if t.get("zoya_can_help") and t.get("zoya_status") not in ZOYA_CLOSED + ZOYA_QUEUED:
+                # A suggestion stays visible while approved / chat_now too
+                self.by_zoya[ZOYA_SUGGESTED].add(pos)
+            self.by_reminder[reminder_state(t)].add(pos)
+            if t.get("due_date"):
+                self.due.add(pos, t["due_date"])
+
+        # Precomputed sort ranks, so a query result sorts by int lookups
+        for name, keyfunc in SORT_KEYS.items():
+            order = sorted(range(len(tasks)), key=lambda p: keyfunc(tasks[p], p))
+            self.rank[name] = {p: r for r, p in enumerate(order)}
+
+    def get(self, task_id):
+        """The task (or recurring occurrence) with this id, or None"""
+        pos = self.by_id.get(task_id)
+        if pos is not None:
+            return self.tasks[pos]
+        series_id, occurrence_date = split_occurrence_id(task_id)
+        pos = self.by_id.get(series_id)
+        if occurrence_date and pos in self.series:
+            series = self.tasks[pos]
+            exc = (series.get("exceptions") or {}).get(occurrence_date)
+            if not (exc and exc.get("deleted")):
+                return make_occurrence(series, occurrence_date, exc)
+        return None
+
+    def occurrences(self, due_from=None, due_to=None):
+        """Recurring occurrences due in a window, expanded lazily and memoized.
+
+        A window open at the bottom starts at each series' earliest undone
+        occurrence (pending_since); one open at the top yields each series'
+        next pending occurrence.
+        """
+        if not self.series:
+            return []
+        today = date.today()
+        key = ("occurrences", due_from, due_to, today if not (due_from and due_to) else None)
+        cached = self._memo.get(key)
+        if cached is not None:
+            return cached
+        result = []
+        for pos in sorted(self.series):
+            series = self.tasks[pos]
+            if due_from:
+                lo = due_from
+            elif due_to and series.get("due_date"):
+                lo = pending_since(series)
+                if lo is None:
+                    continue    # every occurrence done
+            else:
+                lo = today
+            result.extend(expand(series, lo, due_to))
+        self._memo[key] = result
+        return result
+
+    def open_occurrences(self, days=7):
+        """Undone occurrences for the header stats: every one up to `days`
+        ahead, plus each series' next pending one when none falls in that range"""
+        hi = (date.today() + timedelta(days=days)).isoformat()
+        result = [t for t in self.occurrences(None, hi) if not t["done"]]
+        covered = {t["series_id"] for t in result}
+        result.extend(t for t in self.occurrences() if t["series_id"] not in covered)
+        return result
+
+    def _due_range(self, due_from, due_to):
+        lo = to_ordinal(due_from) if due_from else None
+        hi = to_ordinal(due_to) if due_to else None
+        return self.due.keys_between(lo, hi)
+
+    @staticmethod
+    def _union(index, keys):
+        result = set()
+        for k in keys:
+            result |= index.get(k, set())
+        return result
+
+    def positions(self, query):
+        """Matching positions for a query, smallest candidate set first"""
+        sets = []
+        if query.status in self.by_status:
+            sets.append(self.by_status[query.status])
+        if query.departments:
+            sets.append(self._union(self.by_dept, query.departments))
+        if query.priorities:
+            sets.append(self._union(self.by_priority, query.priorities))
+        if query.zoya:
+            sets.append(self._union(self.by_zoya, query.zoya))
+        if query.reminder:
+            sets.append(self._union(self.by_reminder, query.reminder))
+        if query.due_from or query.due_to:
+            sets.append(self._due_range(query.due_from, query.due_to))
+
+        if not sets:
+            return set(range(len(self.tasks))) - self.series
+        sets.sort(key=len)
+        result = set(sets[0])
+        for s in sets[1:]:
+            result &= s
+            if not result:
+                break
+        return result
+
+    def select(self, query):
+        """Tasks matching a query, memoized by query signature"""
+        # Open-ended windows over recurring series move with the date
+        memo_key = (query, date.today()) if self.series else query
+        cached = self._memo.get(memo_key)
+        if cached is not None:
+            return cached
+        positions = self.positions(query)
+        rank = self.rank.get(query.sort)
+        ordered = sorted(positions, key=rank.__getitem__) if rank else sorted(positions)
+        result = [self.tasks[p] for p in ordered]
+        occurrences = [t for t in self.occurrences(query.due_from, query.due_to) if _matches(t, query)]
+        if occurrences:
+            keyfunc = SORT_KEYS.get(query.sort)
+            extra = len(self.tasks)
+            if keyfunc:
+                keyed = [(keyfunc(t, p), t) for p, t in zip(ordered, result)]
+                keyed += [(keyfunc(t, extra + i), t) for i, t in enumerate(occurrences)]
+                keyed.sort(key=lambda kt: kt[0])
+                result = [t for _, t in keyed]
+            else:
+                result = result + occurrences
+        self._memo[memo_key] = result
+        return result
+
+    def count(self, query):
+        return len(self.select(query))
@@ -0,0 +1,106 @@
+"""
+Manual task ordering for GTF Command Center
+Gap-based rank keys: a drag writes only the task that moved, unless its
+neighbours leave no room between them and the column has to be respaced
+"""
+
+ORDER_GAP = 1024.0
+DEFAULT_ORDER = 999  # what board_key uses for tasks that were never ranked
+
+# Zero-width characters for sortable_label's invisible suffix
+LABEL_MARK = "\u2060"
+LABEL_BITS = ("\u200b", "\u200c")
+
+
+def task_rank(task):
+    return task.get("order", DEFAULT_ORDER)
+
+
+def rank_between(before, after):
+    """A rank strictly between two neighbour ranks (None = end of list).
+
+    Returns None when the neighbours are equal or too close for a float
+    midpoint, which means the column needs respacing.
+    """
+    if before is None and after is None:
+        return ORDER_GAP
+    if before is None:
+        return after - ORDER_GAP
+    if after is None:
+        return before + ORDER_GAP
+    mid = (before + after) / 2
+    if before < mid < after:
+        return mid
+    return None
+
+
+def respace(ids, tasks_by_id):
+    """Evenly spaced ranks for a whole column, keeping ranks that already fit"""
+    ranks = {}
+    for i, tid in enumerate(ids):
+        rank = (i + 1) * ORDER_GAP
+        if tasks_by_id[tid].get("order") != rank:
+            ranks[tid] = rank
+    return ranks
+
+
+def find_moved(old_ids, new_ids):
+    """The one item whose move turns old_ids into new_ids, or None"""
+    if old_ids == new_ids:
+        return None
+    for tid in new_ids:
+        if [x for x in new_ids if x != tid] == [x for x in old_ids if x != tid]:
+            return tid
+    return None
+
+
+def place(ids, moved_id, tasks_by_id):
+    """New ranks after moved_id was dropped at its position in ids"""
+    i = ids.index(moved_id)
+    before = task_rank(tasks_by_id[ids[i - 1]]) if i > 0 else None
+    after = task_rank(tasks_by_id[ids[i + 1]]) if i + 1 < len(ids) else None
+    rank = rank_between(before, after)
+    if rank is None:
+        return respace(ids, tasks_by_id)
+    return {moved_id: rank}
+
+
+def sortable_label(text, n):
+    """text plus an invisible suffix encoding n.
+
+    Drag-and-drop items are plain strings, so two tasks with the same title
+    need different labels; number them and map label -> id per render.
+    """
+    return text + LABEL_MARK + "".join(LABEL_BITS[int(bit)] for bit in f"{n:b}")
+
+
+def plan_board_move(old_board, new_board, tasks_by_id):
+    """Changes for one drag on a board of day columns.
+
+    Boards are lists of (due_date, [task ids]) in display order. A drag
+    within a column re-ranks the moved task; a drag across columns also
+    reschedules it to the new day. Returns apply_changes() tuples.
+    """
+    old_day = {tid: day for day, ids in old_board for tid in ids}
+    ranks = {}
+    moved_days = {}
+    for (day, old_ids), (_, new_ids) in zip(old_board, new_board):
+        arrived = [tid for tid in new_ids if old_day.get(tid) != day]
+        if arrived:
+            for tid in arrived:
+                moved_days[tid] = day
+                ranks.update(place(new_ids, tid, tasks_by_id))
+        elif set(old_ids) == set(new_ids):
+            moved = find_moved(old_ids, new_ids)
+            if moved:
+                ranks.update(place(new_ids, moved, tasks_by_id))
+
+    changes = []
+    for tid in set(ranks) | set(moved_days):
+        fields = {}
+        if tid in ranks:
+            fields["order"] = ranks[tid]
+        if tid in moved_days:
+            fields["due_date"] = moved_days[tid]
+        changes.append(("update", tid, fields))
+    return changes
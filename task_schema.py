@@ -0,0 +1,159 @@
+"""
+Task schema and cached loading for GTF Command Center
+Every document is validated and normalized once on load, so the rest of the
+app can index task fields directly instead of sprinkling .get() defaults.
+The normalized document is pickled next to the app, keyed by the source
+blob SHA, so a warm start skips JSON parsing and normalization entirely.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from datetime import date
+from pathlib import Path
+
+from task_counters import build_counters
+from recurrence import parse_rule
+
+SCHEMA_VERSION = 4     # 4: counters always recounted on load
+CACHE_FILE = Path(__file__).parent / ".cache" / "tasks.pickle"
+
+PRIORITIES = ("high", "medium", "low")
+TASK_DEFAULTS = {
+    "department": "quick",
+    "priority": "medium",
+    "notes": "",
+    "done": False,
+}
+
+
+def blob_sha(raw):
+    """Git blob SHA of raw file bytes - same key GitHub reports for the file"""
+    return hashlib.sha1(b"blob %d\0" % len(raw) + raw).hexdigest()
+
+
+def normalize_task(t):
+    """(task, problems) with defaults filled in; task is None if the record is unusable"""
+    if not isinstance(t, dict):
+        return None, ["not an object"]
+    title = t.get("title")
+    if title is None or not str(title).strip():
+        return None, ["missing title"]
+
+    problems = []
+    task = {**TASK_DEFAULTS, **t}
+    task["title"] = str(title)
+    if task.get("id") is not None and not isinstance(task["id"], str):
+        task["id"] = str(task["id"])
+    if not isinstance(task["department"], str) or not task["department"]:
+        problems.append(f"department {task['department']!r} -> quick")
+        task["department"] = "quick"
+    if task["priority"] not in PRIORITIES:
+        problems.append(f"priority {task['priority']!r} -> medium")
+        task["priority"] = "medium"
+    if task["notes"] is None:
+        task["notes"] = ""
+    task["done"] = bool(task["done"])
+    due = task.get("due_date")
+    if due:
+        try:
+            date.fromisoformat(str(due))
+        except ValueError:
+            problems.append(f"due_date {due!r} is not a date; kept as due_date_raw")
+            task["due_date_raw"] = due
+            task["due_date"] = None
+    if "depends_on" in task:
+        deps = task["depends_on"]
+        if not isinstance(deps, list) or not all(isinstance(d, str) for d in deps):
+            problems.append(f"depends_on {deps!r} is not a list of ids; dropped")
+            task.pop("depends_on")
+        elif task.get("id") in deps:
+            problems.append("depends_on itself; removed")
+            task["depends_on"] = [d for d in deps if d != task.get("id")]
+    if task.get("recurrence"):
+        try:
+            task["recurrence"] = parse_rule(task["recurrence"])
+            if not task.get("due_date"):
+                raise ValueError("a recurring task needs a due_date to start from")
+        except (ValueError, TypeError) as e:
+            problems.append(f"recurrence dropped: {e}")
+            task["recurrence_raw"] = task.pop("recurrence")
+    return task, problems
+
+
+def normalize_document(data):
+    """Validate and normalize a loaded tasks document in place; returns issue messages.
+
+    Unusable records move to data["invalid_tasks"] with the reason, so they
+    are reported and kept rather than silently dropped.
+    """
+    issues = []
+    if not isinstance(data, dict):
+        raise ValueError("tasks document must be a JSON object")
+    data.setdefault("departments", [])
+    data.setdefault("department_labels", {})
+    records = data.get("tasks")
+    if not isinstance(records, list):
+        issues.append("tasks is not a list; starting empty")
+        records = []
+
+    tasks = []
+    invalid = list(data.get("invalid_tasks", []))
+    for pos, t in enumerate(records):
+        task, problems = normalize_task(t)
+        label = t.get("id", f"#{pos}") if isinstance(t, dict) else f"#{pos}"
+        if task is None:
+            invalid.append({"record": t, "error": problems[0]})
+            issues.append(f"{label}: {problems[0]} (moved to invalid_tasks)")
+            continue
+        issues.extend(f"{label}: {p}" for p in problems)
+        tasks.append(task)
+    data["tasks"] = tasks
+    if invalid:
+        data["invalid_tasks"] = invalid
+    # Saved counters can't be trusted after an outside edit of the file, and
+    # this pass is O(n) anyway; the pickle cache skips it for unchanged blobs
+    data["counters"] = build_counters(tasks)
+    return issues
+
+
+def _read_cache(key):
+    try:
+        with open(CACHE_FILE, "rb") as f:
+            cached = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    if cached.get("schema") != SCHEMA_VERSION or cached.get("key") != key:
+        return None
+    return cached
+
+
+def _write_cache(key, data, issues):
+    try:
+        CACHE_FILE.parent.mkdir(exist_ok=True)
+        tmp = CACHE_FILE.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({"schema": SCHEMA_VERSION, "key": key, "data": data, "issues": issues},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, CACHE_FILE)
+    except OSError:
+        pass
+
+
+def load_document(raw, sha=None, field=None):
+    """Normalized document for raw JSON bytes; returns (data, issues).
+
+    sha is the source blob SHA when the caller already has it (GitHub);
+    otherwise it is computed from the bytes. field names the key holding
+    the document when the file wraps it (the local replica); data is then
+    the whole wrapper with its document normalized.
+    """
+    key = sha or blob_sha(raw)
+    cached = _read_cache(key)
+    if cached is not None:
+        return cached["data"], cached["issues"]
+    data = json.loads(raw)
+    issues = normalize_document(data[field] if field else data)
+    _write_cache(key, data, issues)
+    return data, issues
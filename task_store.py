@@ -0,0 +1,100 @@
+"""
+Task mutations for GTF Command Center
+Every change to data["tasks"] goes through here so derived state
+(dashboard counters) stays in step with the document.
+
+Mutations are copy-on-write: task dicts, the task list and the counters are
+replaced, never edited in place, so a data dict can share them with the
+process-wide snapshot (see shared_store).
+"""
+
+from task_counters import ensure_counters, count_task, copy_counters
+from recurrence import split_occurrence_id, update_exceptions
+
+
+def apply_changes(data, changes):
+    """Apply a batch of changes in one pass over the task list.
+
+    changes is a list of (op, task_id, payload) tuples:
+        ("add", None, task)
+        ("update", task_id, {field: value})
+        ("replace", task_id, task)
+        ("delete", task_id, None)
+    Updates to the same id are merged in order, on top of a replace (used
+    by undo to put back an earlier version); a delete wins over both.
+    Ids of recurring occurrences ("<series>@<date>") become exception
+    updates on their series; deleting one skips that date.
+    Returns the number of tasks added, changed or removed. The caller
+    saves once afterwards.
+    """
+    counters = copy_counters(ensure_counters(data))
+    updates = {}
+    replaces = {}
+    deletes = set()
+    adds = []
+    occurrences = {}    # series id -> {occurrence date: fields}
+    for op, task_id, payload in changes:
+        series_id, occurrence_date = split_occurrence_id(task_id) if task_id else (None, None)
+        if occurrence_date and op in ("update", "delete"):
+            fields = occurrences.setdefault(series_id, {}).setdefault(occurrence_date, {})
+            fields.update(payload if op == "update" else {"deleted": True})
+            continue
+        if op == "add":
+            adds.append(payload)
+        elif op == "update":
+            updates.setdefault(task_id, {}).update(payload)
+        elif op == "replace":
+            replaces[task_id] = payload
+        elif op == "delete":
+            deletes.add(task_id)
+        else:
+            raise ValueError(f"Unknown task change: {op}")
+
+    touched = 0
+    tasks = []
+    for t in data.get("tasks", []):
+        if t["id"] in deletes:
+            count_task(counters, t, -1)
+            touched += 1
+            continue
+        fields = updates.get(t["id"])
+        base = replaces.get(t["id"], t)
+        if t["id"] in occurrences:
+            series = {**base, **fields} if fields else base
+            fields = {**(fields or {}), "exceptions": update_exceptions(series, occurrences[t["id"]])}
+        if fields or base is not t:
+            count_task(counters, t, -1)
+            t = {**base, **fields} if fields else base
+            count_task(counters, t)
+            touched += 1
+        tasks.append(t)
+
+    if adds:
+        existing = {t["id"] for t in tasks}
+    for task in adds:
+        if task["id"] in existing:
+            raise ValueError(f"Duplicate task id: {task['id']}")
+        existing.add(task["id"])
+        tasks.append(task)
+        count_task(counters, task)
+        touched += 1
+
+    data["tasks"] = tasks
+    data["counters"] = counters
+    return touched
+
+
+def add_task(data, task):
+    """Append a new task"""
+    apply_changes(data, [("add", None, task)])
+    return task
+
+
+def update_task(data, task_id, **changes):
+    """Apply field changes to the task(s) with this id"""
+    apply_changes(data, [("update", task_id, changes)])
+
+
+def delete_task(data, task_id):
+    """Remove the task(s) with this id"""
+    apply_changes(data, [("delete", task_id, None)])
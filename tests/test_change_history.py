@@ -0,0 +1,41 @@
+from change_history import History
+
+
+def _task(tid, title):
+    return {"id": tid, "title": title}
+
+
+def _record(history, version, source, old, new):
+    return history.record(version, source, old, new, {t["id"] for t in old + new})
+
+
+def test_background_sources_get_no_undo_stack():
+    history = History()
+    _record(history, 1, "remote", [], [_task("a", "x")])
+    _record(history, 2, "zoya-queue", [_task("a", "x")], [_task("a", "y")])
+    _record(history, 3, "session-1", [_task("a", "y")], [_task("a", "z")])
+    assert set(history._undo) == {"session-1"}
+    version, changes = history.undo_changes("session-1", lambda tid: _task("a", "z"))
+    assert version == 3 and changes == [("replace", "a", _task("a", "y"))]
+
+
+def test_eviction_trims_stacks_and_task_index():
+    history = History(maxlen=3)
+    for v in range(1, 6):
+        _record(history, v, f"session-{v}", [_task("a", str(v - 1))], [_task("a", str(v))])
+    assert set(history._undo) == {"session-3", "session-4", "session-5"}
+    assert [entry.version for entry, _, _ in history.for_task("a")] == [5, 4, 3]
+    for v in range(6, 9):
+        _record(history, v, "session-9", [_task(f"b{v}", "x")], [])
+    assert set(history._undo) == {"session-9"}
+    assert history.for_task("a") == []
+    assert "a" not in history._by_task
+
+
+def test_for_task_newest_first_with_limit():
+    history = History()
+    for v in range(1, 8):
+        _record(history, v, "s", [_task("a", str(v - 1))], [_task("a", str(v)), _task("b", "x")])
+    found = history.for_task("a", limit=3)
+    assert [entry.version for entry, _, _ in found] == [7, 6, 5]
+    assert found[0][1:] == (_task("a", "6"), _task("a", "7"))
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from image_links import LinkCache, check_links, direct_link, validate_rows
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """/ok* image, /page* HTML, /moved* redirects to an image, /gone* redirects to a 404"""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits.append(self.path)
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        time.sleep(0.05)
+        try:
+            if self.path.startswith("/ok"):
+                self._send(200, "image/png", b"\x89PNG not really")
+            elif self.path.startswith("/page"):
+                self._send(200, "text/html", b"<html></html>")
+            elif self.path.startswith("/moved"):
+                self.send_response(302)
+                self.send_header("Location", "/ok" + self.path[len("/moved"):])
+                self.end_headers()
+            elif self.path.startswith("/gone"):
+                self.send_response(301)
+                self.send_header("Location", "/missing")
+                self.end_headers()
+            else:
+                self._send(404, "text/plain", b"not found")
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    srv.lock = threading.Lock()
+    srv.hits, srv.active, srv.peak = [], 0, 0
+    srv.base = f"http://127.0.0.1:{srv.server_address[1]}"
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_statuses_and_redirects(server, tmp_path):
+    urls = [f"{server.base}/ok1.png", f"{server.base}/missing", f"{server.base}/page",
+            f"{server.base}/moved1.png", f"{server.base}/gone"]
+    checks = asyncio.run(check_links(urls, cache=LinkCache(tmp_path)))
+    assert checks[urls[0]].ok and checks[urls[0]].status == 200
+    assert not checks[urls[1]].ok and checks[urls[1]].error == "HTTP 404"
+    assert not checks[urls[2]].ok and checks[urls[2]].error.startswith("not an image")
+    assert checks[urls[3]].ok
+    assert not checks[urls[4]].ok and checks[urls[4]].status == 404
+
+
+def test_concurrency_is_capped(server, tmp_path):
+    urls = [f"{server.base}/ok{i}.png" for i in range(30)]
+    checks = asyncio.run(check_links(urls, concurrency=8, cache=LinkCache(tmp_path)))
+    assert all(c.ok for c in checks.values())
+    assert len(server.hits) == 30
+    assert server.peak == 8
+
+
+def test_cache_is_reused_from_disk(server, tmp_path):
+    rows = [{"SKU": f"s{i}", "Product image URL": f"{server.base}/{path}"}
+            for i, path in enumerate(["ok1.png", "ok2.png", "missing"])]
+    broken, _ = validate_rows(rows, cache=LinkCache(tmp_path))
+    assert [b[:2] for b in broken] == [(4, "s2")]
+    assert "image link: HTTP 404" in rows[2]["gtf_extraction_notes"]
+    assert len(server.hits) == 3
+
+    # A new cache object reads the file the first one wrote
+    broken, checks = validate_rows([dict(r) for r in rows], cache=LinkCache(tmp_path))
+    assert len(server.hits) == 3
+    assert len(checks) == 3 and len(broken) == 1
+
+
+def test_drive_links_are_normalized(tmp_path):
+    direct = "https://drive.google.com/uc?export=download&id=1AbCdEfGhIjKlMn"
+    for share in ["https://drive.google.com/file/d/1AbCdEfGhIjKlMn/view?usp=sharing",
+                  "https://drive.google.com/open?id=1AbCdEfGhIjKlMn",
+                  "https://drive.google.com/uc?export=view&id=1AbCdEfGhIjKlMn"]:
+        assert direct_link(share) == direct
+    assert direct_link("https://cdn.example.com/a.jpg") == "https://cdn.example.com/a.jpg"
+
+    fetched = []
+
+    async def fetch(url):
+        fetched.append(url)
+        return 200, "image/jpeg", b""
+
+    rows = [{"SKU": "s1", "Product image URL": "https://drive.google.com/file/d/1AbCdEfGhIjKlMn/view"},
+            {"SKU": "s2", "Product image URL": "https://drive.google.com/open?id=1AbCdEfGhIjKlMn"}]
+    broken, checks = validate_rows(rows, fetch=fetch, cache=LinkCache(tmp_path))
+    assert not broken
+    assert fetched == [direct]
+    assert all(r["Product image URL"] == direct for r in rows)
@@ -0,0 +1,93 @@
+from datetime import date, timedelta
+
+import pytest
+
+from recurrence import (
+    end_series, expand, occurrence_dates, parse_rule, pending_since, split_occurrence_id, update_exceptions,
+)
+from task_query import TaskIndex
+
+
+def _series(start, rule, **fields):
+    return {"id": "s1", "title": "Standup", "department": "quick", "priority": "medium",
+            "due_date": start, "recurrence": rule, **fields}
+
+
+def _dates(occurrences):
+    return [o["due_date"] for o in occurrences]
+
+
+def test_parse_rrule_subset():
+    assert parse_rule("RRULE:FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE;COUNT=4") == {
+        "freq": "weekly", "interval": 2, "byweekday": [0, 2], "count": 4}
+    assert parse_rule("FREQ=MONTHLY;UNTIL=20261231")["until"] == "2026-12-31"
+    with pytest.raises(ValueError):
+        parse_rule("FREQ=YEARLY")
+
+
+@pytest.mark.parametrize("rule, lo, hi, expected", [
+    ({"freq": "daily"}, "2026-10-01", "2026-10-03", ["2026-10-01", "2026-10-02", "2026-10-03"]),
+    ({"freq": "daily", "interval": 3}, "2026-10-02", "2026-10-10", ["2026-10-04", "2026-10-07", "2026-10-10"]),
+    ({"freq": "weekly", "byweekday": [0, 4]}, "2026-10-01", "2026-10-12",
+     ["2026-10-02", "2026-10-05", "2026-10-09", "2026-10-12"]),
+    ({"freq": "monthly", "bymonthday": 31}, "2026-10-01", "2027-01-01", ["2026-10-31", "2026-11-30", "2026-12-31"]),
+    ({"freq": "daily", "count": 2}, "2026-10-01", "2026-10-10", ["2026-10-01", "2026-10-02"]),
+    ({"freq": "daily", "until": "2026-10-02"}, "2026-09-01", "2026-10-10", ["2026-10-01", "2026-10-02"]),
+])
+def test_expand_window(rule, lo, hi, expected):
+    assert _dates(expand(_series("2026-10-01", rule), lo, hi)) == expected
+
+
+def test_count_is_numbered_from_the_start():
+    rule = parse_rule({"freq": "weekly", "count": 3})
+    assert [d.isoformat() for d in occurrence_dates(rule, date(2026, 10, 1), date(2026, 10, 10))] == [
+        "2026-10-15"]
+
+
+def test_exceptions_done_skipped_and_moved():
+    series = _series("2026-10-01", {"freq": "daily"}, exceptions={
+        "2026-10-02": {"done": True, "completed_date": "2026-10-02"},
+        "2026-10-03": {"deleted": True},
+        "2026-10-04": {"due_date": "2026-10-09", "title": "Moved standup"},
+    })
+    occurrences = expand(series, "2026-10-01", "2026-10-05")
+    assert [o["id"] for o in occurrences] == ["s1@2026-10-01", "s1@2026-10-02", "s1@2026-10-05"]
+    assert [o["done"] for o in occurrences] == [False, True, False]
+    moved = expand(series, "2026-10-09", "2026-10-09")
+    assert [(o["occurrence_date"], o["title"]) for o in moved] == [
+        ("2026-10-09", "Standup"), ("2026-10-04", "Moved standup")]
+    # Open-ended: the next occurrence not done
+    assert [o["occurrence_date"] for o in expand(series, "2026-10-02")] == ["2026-10-04"]
+    assert split_occurrence_id("s1@2026-10-04") == ("s1", "2026-10-04")
+
+
+def test_update_exceptions_drops_what_matches_the_series():
+    series = _series("2026-10-01", {"freq": "daily"}, exceptions={"2026-10-02": {"done": True}})
+    assert update_exceptions(series, {"2026-10-02": {"done": False}}) == {}
+    assert update_exceptions(series, {"2026-10-03": {"due_date": "2026-10-03", "title": "Standup"}}) == {
+        "2026-10-02": {"done": True}}
+    assert end_series(series, "2026-10-05") == {"freq": "daily", "interval": 1, "until": "2026-10-05"}
+
+
+def test_pending_since_only_passes_contiguous_completions():
+    series = _series("2026-10-01", {"freq": "daily"})
+    assert pending_since(series) == date(2026, 10, 1)
+    series["exceptions"] = {"2026-10-01": {"done": True}, "2026-10-02": {"deleted": True},
+                            "2026-10-04": {"done": True}}
+    assert pending_since(series) == date(2026, 10, 3)
+    series["recurrence"] = {"freq": "daily", "count": 2}
+    assert pending_since(series) is None
+
+
+def test_done_today_keeps_older_occurrences_overdue():
+    today = date.today()
+    start = today - timedelta(days=3)
+    series = _series(start.isoformat(), {"freq": "daily"},
+                     exceptions={today.isoformat(): {"done": True, "completed_date": today.isoformat()}})
+    index = TaskIndex([series])
+    overdue = [o for o in index.occurrences(due_to=today.isoformat()) if not o["done"]]
+    assert _dates(overdue) == [(start + timedelta(days=n)).isoformat() for n in range(3)]
+    window = [o for o in index.occurrences((today - timedelta(days=4)).isoformat(), today.isoformat())
+              if not o["done"]]
+    assert _dates(window) == _dates(overdue)
+    assert len(index.open_occurrences()) == 3 + 7
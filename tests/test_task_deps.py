@@ -0,0 +1,115 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from task_deps import DependencyGraph
+
+TODAY = date(2026, 10, 19)
+
+
+def _state(graph):
+    return graph.deps, graph.dependents, graph.due, graph.done, graph.projected
+
+
+def _on_loops(graph):
+    """Ids that can reach themselves - slow but obviously right"""
+    def reaches(start, target):
+        stack, seen = list(graph.deps[start]), set()
+        while stack:
+            tid = stack.pop()
+            if tid == target:
+                return True
+            if tid in graph.deps and tid not in seen:
+                seen.add(tid)
+                stack.extend(graph.deps[tid])
+        return False
+    return {tid for tid in graph.deps if reaches(tid, tid)}
+
+
+def _assert_same(advanced, tasks):
+    built = DependencyGraph.build(list(tasks.values()))
+    assert _state(advanced) == _state(built)
+    assert advanced.cycles() == built.cycles() == _on_loops(built)
+
+
+def _random_task(rng, tid, ids):
+    task = {"id": tid, "title": tid}
+    if rng.random() < 0.8:
+        task["due_date"] = (TODAY + timedelta(days=rng.randint(-5, 30))).isoformat()
+    if rng.random() < 0.2:
+        task["done"] = True
+    if ids and rng.random() < 0.7:
+        task["depends_on"] = rng.sample(ids, rng.randint(1, min(3, len(ids))))
+    return task
+
+
+def _mutate(rng, tasks, next_id):
+    """One random edit; returns the ids it touched"""
+    ids = list(tasks)
+    kind = rng.choice(["add", "delete", "due", "done", "deps", "deps", "recurring"])
+    if kind == "add" or not ids:
+        tid = f"t{next_id}"
+        tasks[tid] = _random_task(rng, tid, ids)
+        return {tid}
+    tid = rng.choice(ids)
+    task = dict(tasks[tid])
+    if kind == "delete":
+        del tasks[tid]
+        return {tid}
+    if kind == "due":
+        task["due_date"] = (TODAY + timedelta(days=rng.randint(-5, 30))).isoformat()
+    elif kind == "done":
+        task["done"] = not task.get("done")
+    elif kind == "recurring":
+        task["recurrence"] = None if task.get("recurrence") else {"freq": "weekly"}
+    else:
+        # Arbitrary edges, loops included - as an outside edit could write them
+        task["depends_on"] = rng.sample(ids, rng.randint(0, min(3, len(ids))))
+    tasks[tid] = task
+    return {tid}
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_advance_matches_build(seed):
+    rng = random.Random(seed)
+    tasks = {}
+    for n in range(rng.randint(3, 15)):
+        tid = f"t{n}"
+        tasks[tid] = _random_task(rng, tid, list(tasks))
+    graph = DependencyGraph.build(list(tasks.values()))
+    for step in range(60):
+        changed = set()
+        for _ in range(rng.randint(1, 3)):
+            changed |= _mutate(rng, tasks, 100 + step * 3 + len(changed))
+        graph = graph.advance(tasks.get, changed)
+        _assert_same(graph, tasks)
+
+
+def test_cycle_then_repair():
+    tasks = {
+        "a": {"id": "a", "due_date": "2026-10-20"},
+        "b": {"id": "b", "due_date": "2026-10-22", "depends_on": ["a"]},
+        "c": {"id": "c", "due_date": "2026-10-25", "depends_on": ["b"]},
+        "d": {"id": "d", "due_date": "2026-10-21", "depends_on": ["c"]},
+    }
+    graph = DependencyGraph.build(list(tasks.values()))
+    assert graph.cycles() == set()
+
+    # An outside edit closes a -> c -> b -> a
+    tasks["a"] = {**tasks["a"], "depends_on": ["c"]}
+    graph = graph.advance(tasks.get, {"a"})
+    assert graph.cycles() == {"a", "b", "c"}
+    _assert_same(graph, tasks)
+
+    # Edits while the loop is there
+    tasks["b"] = {**tasks["b"], "due_date": "2026-10-23"}
+    graph = graph.advance(tasks.get, {"b"})
+    _assert_same(graph, tasks)
+
+    # Repair: the loop is broken again
+    tasks["a"] = {"id": "a", "due_date": "2026-10-20"}
+    graph = graph.advance(tasks.get, {"a"})
+    assert graph.cycles() == set()
+    _assert_same(graph, tasks)
+    assert graph.slip("d") == date(2026, 10, 25)
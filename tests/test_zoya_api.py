@@ -0,0 +1,54 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from shared_store import SharedSnapshot
+from zoya_api import queue_routes, start_api
+from zoya_queue import WorkQueue
+
+
+@pytest.fixture(scope="module")
+def api():
+    snapshot = SharedSnapshot()
+    snapshot.load_once(lambda: ({"departments": [], "tasks": []}, None, False))
+    queue = WorkQueue()
+    queue.put("t1", "approved", title="Task")
+    server = start_api(snapshot, port=0, routes=queue_routes(queue, lambda: None))
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _post(base, path, raw):
+    req = urllib.request.Request(base + path, method="POST", data=raw)
+    try:
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            return resp.status, json.load(resp)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/queue/lease", b"[1]"),
+    ("/queue/lease", b"\"text\""),
+    ("/queue/lease", b"not json"),
+    ("/queue/lease", b'{"visibility_timeout": "soon"}'),
+    ("/queue/lease", b'{"visibility_timeout": [30]}'),
+    ("/queue/lease", b'{"visibility_timeout": -5}'),
+    ("/queue/ack", b'{"lease_id": ["x"]}'),
+    ("/queue/ack", b"{}"),
+    ("/queue/nack", b'{"lease_id": "x", "delay": {"s": 1}}'),
+])
+def test_bad_requests_get_400(api, path, body):
+    status, result = _post(api, path, body)
+    assert status == 400 and result["error"]
+
+
+def test_lease_and_nack(api):
+    status, result = _post(api, "/queue/lease", b'{"worker": "w1", "visibility_timeout": "30"}')
+    assert status == 200 and result["item"]["task_id"] == "t1"
+    lease_id = result["item"]["lease_id"]
+    status, result = _post(api, "/queue/nack", json.dumps({"lease_id": lease_id, "delay": 0}).encode())
+    assert status == 200 and result["ok"]
@@ -0,0 +1,31 @@
+"""
+Static UI assets for GTF Command Center
+Built once per process - app.py re-executes on every rerun, imported modules do not
+"""
+
+from functools import lru_cache
+from pathlib import Path
+
+ASSETS_DIR = Path(__file__).parent / "assets"
+
+# Department colors
+DEPT_COLORS = {
+    "customers": "#8B5CF6",
+    "customs_shipping": "#0891B2",
+    "brand_outreach": "#059669",
+    "brand_followups": "#10B981",
+    "content": "#EC4899",
+    "legal": "#6366F1",
+    "product": "#3B82F6",
+    "business": "#F59E0B",
+    "fundraising": "#EF4444",
+    "hiring": "#8B5CF6",
+    "finance": "#14B8A6",
+    "quick": "#6B7280"
+}
+
+
+@lru_cache(maxsize=None)
+def style_block():
+    """Global stylesheet wrapped for st.markdown"""
+    return f"<style>\n{(ASSETS_DIR / 'style.css').read_text()}</style>"
@@ -0,0 +1,179 @@
+"""
+Local HTTP/JSON API for Zoya and other agents
+Serves the shared task snapshot plus a "changes since version N" feed, so
+agents poll (or long-poll) for deltas instead of re-downloading tasks.json.
+
+    GET /snapshot                      full document + version
+    GET /changes?since=N[&wait=30]     tasks changed after version N
+        [&zoya=1]                      only tasks with Zoya activity
+    POST /queue/lease {"worker"}       next Zoya work item (see zoya_queue)
+    POST /queue/ack {"lease_id"}       finish it
+    POST /queue/nack {"lease_id", "delay"}
+    GET /queue/metrics                 depth, throughput, latency
+
+Versions are per server process; responses carry an "epoch" that changes on
+restart, and a "reset" flag when the client must re-fetch /snapshot.
+"""
+
+import json
+import math
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+DEFAULT_PORT = 8765
+MAX_WAIT = 60  # seconds a long-poll may hold a connection
+
+
+def has_zoya_activity(task):
+    return bool(task.get("zoya_can_help") or task.get("zoya_status") or task.get("is_zoya_reminder"))
+
+
+def changes_payload(snapshot, since, zoya_only=False):
+    """Delta document for a client at version `since`"""
+    version, data = snapshot.read()
+    changes = snapshot.changes_since(since) if since <= version else None
+    if changes is None or any(c.task_ids is None for c in changes):
+        return {"version": version, "reset": True}
+
+    changed_ids = set()
+    for c in changes:
+        changed_ids.update(c.task_ids)
+    upserts = [t for t in data.get("tasks", []) if t["id"] in changed_ids]
+    present = {t["id"] for t in upserts}
+    if zoya_only:
+        upserts = [t for t in upserts if has_zoya_activity(t)]
+    return {
+        "version": version,
+        "upserts": upserts,
+        "deletes": sorted(changed_ids - present),
+    }
+
+
+def _seconds(body, name, default=None):
+    """A non-negative number of seconds from a request body; ValueError (400) otherwise"""
+    value = body.get(name, default)
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number of seconds") from None
+    if not math.isfinite(seconds) or seconds < 0:
+        raise ValueError(f"{name} must be a number of seconds")
+    return seconds
+
+
+def _lease_id(body):
+    lease_id = body["lease_id"]
+    if not isinstance(lease_id, str):
+        raise ValueError("lease_id must be a string")
+    return lease_id
+
+
+def queue_routes(queue, sync):
+    """API routes for a WorkQueue; sync() brings the queue up to the latest snapshot"""
+
+    def lease(query, body):
+        timeout = _seconds(body, "visibility_timeout")
+        sync()
+        item = queue.lease(str(body.get("worker") or "anonymous"), timeout)
+        return 200, {"item": item}
+
+    def ack(query, body):
+        ok = queue.ack(_lease_id(body))
+        return (200 if ok else 409), {"ok": ok}
+
+    def nack(query, body):
+        ok = queue.nack(_lease_id(body), _seconds(body, "delay", 0))
+        return (200 if ok else 409), {"ok": ok}
+
+    def metrics(query, body):
+        sync()
+        return 200, {**queue.metrics(), "dead_letters": queue.dead_letters()}
+
+    return {
+        ("POST", "/queue/lease"): lease,
+        ("POST", "/queue/ack"): ack,
+        ("POST", "/queue/nack"): nack,
+        ("GET", "/queue/metrics"): metrics,
+    }
+
+
+def make_handler(snapshot, epoch, token=None, routes=None):
+    """Request handler bound to one snapshot; routes maps (method, path) to extra handlers"""
+    routes = routes or {}
+
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "GTFAgentAPI/1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body):
+            payload = json.dumps(body, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _authorized(self):
+            if not token:
+                return True
+            return self.headers.get("Authorization") == f"Bearer {token}"
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if not length:
+                return {}
+            body = json.loads(self.rfile.read(length))
+            if not isinstance(body, dict):
+                raise ValueError("request body must be a JSON object")
+            return body
+
+        def _dispatch(self, method):
+            if not self._authorized():
+                return self._send(401, {"error": "unauthorized"})
+            url = urlparse(self.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            handler = routes.get((method, url.path))
+            try:
+                if handler:
+                    status, result = handler(query, self._body() if method == "POST" else {})
+                elif (method, url.path) == ("GET", "/snapshot"):
+                    version, data = snapshot.read()
+                    status, result = 200, {**data, "version": version}
+                elif (method, url.path) == ("GET", "/changes"):
+                    status, result = 200, self._changes(query)
+                else:
+                    status, result = 404, {"error": "not found"}
+            except (ValueError, KeyError) as e:
+                status, result = 400, {"error": str(e)}
+            result.setdefault("epoch", epoch)
+            self._send(status, result)
+
+        def _changes(self, query):
+            since = int(query.get("since", 0))
+            wait = min(float(query.get("wait", 0)), MAX_WAIT)
+            if wait > 0 and snapshot.version <= since:
+                snapshot.wait_for_change(since, wait)
+            return changes_payload(snapshot, since, zoya_only=query.get("zoya") == "1")
+
+        def do_GET(self):
+            self._dispatch("GET")
+
+        def do_POST(self):
+            self._dispatch("POST")
+
+    return Handler
+
+
+def start_api(snapshot, host="127.0.0.1", port=DEFAULT_PORT, token=None, routes=None):
+    """Serve the API on a daemon thread; returns the server (call shutdown() to stop)"""
+    epoch = uuid.uuid4().hex[:12]
+    server = ThreadingHTTPServer((host, port), make_handler(snapshot, epoch, token, routes))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="gtf-agent-api", daemon=True).start()
+    return server
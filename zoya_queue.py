@@ -0,0 +1,311 @@
+"""
+Zoya work queue for GTF Command Center
+Approved suggestions and "Let's Chat Now" requests become queue items that
+agent workers lease, ack or nack. A lease that is not acked within its
+visibility timeout goes back on the queue; after max_attempts the item is
+dead-lettered. Every transition is mirrored into the task's zoya_status.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+import uuid
+from collections import deque
+
+# zoya_status values that put a task on the queue, most urgent first
+QUEUE_KINDS = {"chat_now": 0, "approved": 1}
+PRIORITY_RANK = {"high": 0, "medium": 1, "low": 2}
+
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+
+class WorkQueue:
+    """Priority queue with lease/ack semantics.
+
+    on_status(updates) receives {task_id: zoya_status} after each
+    transition, outside the queue lock; pass a StatusWriter so lease() and
+    metrics() never wait on storage.
+    """
+
+    def __init__(self, visibility_timeout=300, max_attempts=5, on_status=None, clock=time.monotonic):
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.on_status = on_status
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._heap = []
+        self._seq = itertools.count()
+        self._items = {}        # task_id -> item, queued or leased
+        self._leases = {}       # lease_id -> item
+        self._dead = deque(maxlen=100)
+        self._acked_at = deque(maxlen=1000)
+        self._latencies = deque(maxlen=500)
+        self._waits = deque(maxlen=500)
+        self._synced_version = None
+        self.stats = {"enqueued": 0, "leased": 0, "acked": 0, "nacked": 0, "expired": 0, "dead": 0}
+
+    # Producers
+
+    def put(self, task_id, kind, priority="medium", title=""):
+        """Queue a task unless it is already queued or leased; returns True if added"""
+        with self._lock:
+            return self._put(task_id, kind, priority, title)
+
+    def _put(self, task_id, kind, priority, title, attempts=0, enqueued_at=None):
+        if task_id in self._items:
+            return False
+        item = {
+            "task_id": task_id,
+            "kind": kind,
+            "priority": priority,
+            "title": title,
+            "attempts": attempts,
+            "enqueued_at": enqueued_at if enqueued_at is not None else self.clock(),
+            "available_at": self.clock(),
+            "lease_id": None,
+            "worker": None,
+            "deadline": None,
+            "cancelled": False,
+        }
+        self._items[task_id] = item
+        self._push(item)
+        if attempts == 0:
+            self.stats["enqueued"] += 1
+        return True
+
+    def _push(self, item):
+        rank = (QUEUE_KINDS.get(item["kind"], 9), PRIORITY_RANK.get(item["priority"], 1))
+        heapq.heappush(self._heap, (rank, item["available_at"], next(self._seq), item))
+
+    def sync(self, version, index):
+        """Reconcile with a snapshot version: queue new approvals, drop withdrawn ones.
+
+        index is that version's TaskIndex; only its Zoya buckets are read.
+        """
+        with self._lock:
+            if version == self._synced_version:
+                return
+            first_sync = self._synced_version is None
+            self._synced_version = version
+            wanted = {}
+            for kind in QUEUE_KINDS:
+                for pos in index.by_zoya.get(kind, ()):
+                    t = index.tasks[pos]
+                    if not t.get("done"):
+                        wanted[t["id"]] = (kind, t)
+            in_progress = {index.tasks[pos]["id"]: index.tasks[pos]
+                           for pos in index.by_zoya.get(STATUS_IN_PROGRESS, ())}
+            if first_sync:
+                # Leases held by a previous process died with it
+                for task_id, t in in_progress.items():
+                    if not t.get("done"):
+                        wanted.setdefault(task_id, ("approved", t))
+            for task_id, item in list(self._items.items()):
+                # in_progress may just be lagging behind a nack or expiry
+                if item["lease_id"] is None and task_id not in wanted and task_id not in in_progress:
+                    item["cancelled"] = True
+                    del self._items[task_id]
+            for task_id, (kind, t) in wanted.items():
+                self._put(task_id, kind, t.get("priority", "medium"), t.get("title", ""))
+
+    # Workers
+
+    def lease(self, worker, visibility_timeout=None):
+        """Next available item for this worker, or None"""
+        updates = {}
+        with self._lock:
+            now = self.clock()
+            self._reap(now, updates)
+            item = None
+            deferred = []
+            while self._heap:
+                entry = heapq.heappop(self._heap)
+                candidate = entry[3]
+                if candidate["cancelled"]:
+                    continue
+                if entry[1] > now:
+                    # Backing off after a nack; keep looking at lower ranks
+                    deferred.append(entry)
+                    continue
+                item = candidate
+                break
+            for entry in deferred:
+                heapq.heappush(self._heap, entry)
+            if item is not None:
+                item["lease_id"] = uuid.uuid4().hex
+                item["worker"] = worker
+                item["attempts"] += 1
+                item["deadline"] = now + (visibility_timeout or self.visibility_timeout)
+                self._leases[item["lease_id"]] = item
+                self.stats["leased"] += 1
+                if item["attempts"] == 1:
+                    self._waits.append(now - item["enqueued_at"])
+                updates[item["task_id"]] = STATUS_IN_PROGRESS
+                result = self._public(item)
+            else:
+                result = None
+        self._emit(updates)
+        return result
+
+    def ack(self, lease_id):
+        """Mark a leased item done; False if the lease is unknown or expired"""
+        with self._lock:
+            item = self._leases.pop(lease_id, None)
+            if item is None:
+                return False
+            now = self.clock()
+            del self._items[item["task_id"]]
+            self.stats["acked"] += 1
+            self._acked_at.append(now)
+            self._latencies.append(now - item["enqueued_at"])
+        self._emit({item["task_id"]: STATUS_COMPLETED})
+        return True
+
+    def nack(self, lease_id, delay=0):
+        """Give a leased item back for retry after `delay` seconds"""
+        updates = {}
+        with self._lock:
+            item = self._leases.pop(lease_id, None)
+            if item is None:
+                return False
+            self.stats["nacked"] += 1
+            self._retry(item, self.clock() + delay, updates)
+        self._emit(updates)
+        return True
+
+    def _retry(self, item, available_at, updates):
+        item["lease_id"] = item["worker"] = item["deadline"] = None
+        if item["attempts"] >= self.max_attempts:
+            del self._items[item["task_id"]]
+            self._dead.append(self._public(item))
+            self.stats["dead"] += 1
+            updates[item["task_id"]] = STATUS_FAILED
+            return
+        item["available_at"] = available_at
+        self._push(item)
+        updates[item["task_id"]] = item["kind"]
+
+    def _reap(self, now, updates):
+        """Return expired leases to the queue"""
+        for lease_id, item in list(self._leases.items()):
+            if item["deadline"] <= now:
+                del self._leases[lease_id]
+                self.stats["expired"] += 1
+                self._retry(item, now, updates)
+
+    def _emit(self, updates):
+        if updates and self.on_status:
+            self.on_status(updates)
+
+    # Introspection
+
+    def _public(self, item):
+        public = {k: item[k] for k in ("task_id", "kind", "priority", "title", "attempts", "lease_id", "worker")}
+        # Deadlines are on the monotonic clock; clients get seconds left
+        public["expires_in"] = round(item["deadline"] - self.clock(), 1) if item["deadline"] else None
+        return public
+
+    def queued(self):
+        with self._lock:
+            return [self._public(i) for i in self._items.values() if i["lease_id"] is None]
+
+    def in_flight(self):
+        with self._lock:
+            return [self._public(i) for i in self._leases.values()]
+
+    def dead_letters(self):
+        return list(self._dead)
+
+    def metrics(self):
+        """Counters plus throughput (acks/min) and latency percentiles in seconds"""
+        updates = {}
+        with self._lock:
+            now = self.clock()
+            self._reap(now, updates)
+            latencies = sorted(self._latencies)
+            waits = sorted(self._waits)
+            result = {
+                **self.stats,
+                "depth": len(self._items) - len(self._leases),
+                "in_flight": len(self._leases),
+                "throughput_per_min": sum(1 for t in self._acked_at if now - t <= 60),
+                "latency_p50": _percentile(latencies, 0.5),
+                "latency_p95": _percentile(latencies, 0.95),
+                "wait_p50": _percentile(waits, 0.5),
+            }
+        self._emit(updates)
+        return result
+
+
+class StatusWriter:
+    """on_status callback that persists updates from a background thread.
+
+    write(updates) returns an error message or None. Updates are coalesced
+    per task, latest status winning; a failed write keeps them pending and
+    is retried with backoff, and last_error says why until one succeeds.
+    """
+
+    def __init__(self, write, retry=5, max_backoff=300):
+        self.write = write
+        self.retry = retry
+        self.max_backoff = max_backoff
+        self.last_error = None
+        self._failures = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread = None
+
+    def __call__(self, updates):
+        with self._lock:
+            self._pending.update(updates)
+            self._idle.clear()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="zoya-status", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is written; False on timeout"""
+        return self._idle.wait(timeout)
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                continue
+            try:
+                error = self.write(batch)
+            except Exception as e:
+                error = f"{e.__class__.__name__}: {e}"
+            if error is None:
+                self.last_error, self._failures = None, 0
+                with self._lock:
+                    if not self._pending:
+                        self._idle.set()
+                continue
+            self.last_error = error
+            self._failures += 1
+            with self._lock:
+                # Statuses that arrived meanwhile are newer
+                self._pending = {**batch, **self._pending}
+            time.sleep(min(self.retry * 2 ** (self._failures - 1), self.max_backoff))
+            self._wake.set()
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))], 3)